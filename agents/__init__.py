@@ -1,11 +1,47 @@
-from .query_enhancer import create_query_enhancer_agent
-from .planner import create_planner_agent
-from .summarizer import create_summarizer_agent
-from .scraper_agent import create_scraper_agent
+import importlib
+
+# node name the parallel planner fans out to (here so the api can use it without loading the agents)
+SEARCH_BRANCH_NODE = "search question"
+
+# the agent modules pull in langgraph and the tools; they load on first access, not with the package
+_EXPORTS = {
+    "create_query_enhancer_agent": ".query_enhancer",
+    "create_async_query_enhancer_agent": ".query_enhancer",
+    "create_planner_agent": ".planner",
+    "create_async_planner_agent": ".planner",
+    "create_crawler_agent": ".planner",
+    "create_async_crawler_agent": ".planner",
+    "create_search_branch": ".planner",
+    "create_async_search_branch": ".planner",
+    "fan_out_questions": ".planner",
+    "select_urls": ".planner",
+    "create_summarizer_agent": ".summarizer",
+    "create_async_summarizer_agent": ".summarizer",
+    "create_scraper_agent": ".scraper_agent",
+    "create_async_scraper_agent": ".scraper_agent",
+}
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+
 
 __all__ = [
     "create_query_enhancer_agent",
     "create_planner_agent", 
     "create_summarizer_agent",
-    "create_scraper_agent"
+    "create_scraper_agent",
+    "create_async_query_enhancer_agent",
+    "create_async_planner_agent",
+    "create_async_summarizer_agent",
+    "create_async_scraper_agent",
+    "create_crawler_agent",
+    "create_async_crawler_agent",
+    "create_search_branch",
+    "create_async_search_branch",
+    "fan_out_questions",
+    "select_urls",
+    "SEARCH_BRANCH_NODE",
 ]
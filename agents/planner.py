@@ -1,73 +1,63 @@
-from typing import TypedDict, Annotated, List, Dict, Optional
+from typing import TypedDict, Annotated, List, Dict, Optional, Union
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import SystemMessage, HumanMessage
+from langgraph.types import Send
+from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage
+import asyncio
+import operator
 import re
 import json
 import logging
-from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-from collections import defaultdict
 from utils.prompts import PLANNER_PROMPT
+from utils.urls import domain_of, normalize_url
+from utils.ranking import diversify, rank_candidates
+from utils.budget import ContextBudget, tokens_to_chars
+from utils.retrieval import RETRIEVAL_PAGE_TOKENS, SUMMARIZER_CONTEXT
+from utils.dedup import dedupe_articles
+from tools.extractors import EXTRACTORS, ROUTER, platform_search_sites, route_limits
+from agents import SEARCH_BRANCH_NODE
 
 logger = logging.getLogger(__name__)
 
-def normalize_url(url: str) -> str:
-    """Normalize URL by removing tracking parameters and fragments."""
-    try:
-        parsed = urlparse(url)
-        # Remove common tracking parameters
-        tracking_params = {'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 
-                          'fbclid', 'gclid', 'ref', 'source', 'campaign_id'}
-        query_params = parse_qs(parsed.query)
-        filtered_params = {k: v for k, v in query_params.items() if k not in tracking_params}
-        clean_query = urlencode(filtered_params, doseq=True)
-        
-        # Remove fragment and rebuild URL
-        return urlunparse((parsed.scheme, parsed.netloc, parsed.path, parsed.params, clean_query, ''))
-    except Exception:
-        return url
+def append_unique(left: Optional[list], right: Optional[list]) -> list:
+    """Reducer for fan-in fields: appends new items only, so nodes that
+    return the whole state don't duplicate what is already there."""
+    merged = list(left or [])
+    # keyed, not `item not in merged`: the search fan-in can bring thousands of hits
+    seen = {_unique_key(item) for item in merged}
+    for item in right or []:
+        key = _unique_key(item)
+        if key not in seen:
+            seen.add(key)
+            merged.append(item)
+    return merged
+
+def _unique_key(item):
+    return json.dumps(item, sort_keys=True, default=str) if isinstance(item, (dict, list)) else item
 
 def deduplicate_and_diversify_urls(urls: List[str], max_urls: int = 8, max_per_domain: int = 2) -> List[str]:
-    """Deduplicate URLs and enforce domain diversity."""
-    if not urls:
-        return []
-    
-    # Normalize and deduplicate
-    normalized = {}
+    """Deduplicate URLs and enforce domain diversity, round-robin over domains in the urls' order."""
+    # earlier urls rank higher; diversify takes every domain's first url before any second one,
+    # so the domains listed first can't take every slot
+    ranked = []
+    seen = set()
     for url in urls:
         if not url or not url.startswith(('http://', 'https://')):
             continue
         norm_url = normalize_url(url)
-        if norm_url not in normalized:
-            normalized[norm_url] = url
-    
-    # Group by domain
-    domain_groups = defaultdict(list)
-    for norm_url, orig_url in normalized.items():
-        try:
-            domain = urlparse(norm_url).netloc.lower()
-            # Remove 'www.' prefix for grouping
-            if domain.startswith('www.'):
-                domain = domain[4:]
-            domain_groups[domain].append(orig_url)
-        except Exception:
+        if norm_url in seen:
             continue
-    
-    # Select URLs with domain diversity
-    selected = []
-    for domain, domain_urls in domain_groups.items():
-        # Take up to max_per_domain from each domain
-        selected.extend(domain_urls[:max_per_domain])
-        if len(selected) >= max_urls:
-            break
-    
-    return selected[:max_urls]
+        seen.add(norm_url)
+        ranked.append({"url": url, "domain": domain_of(norm_url), "score": -len(ranked)})
+    return diversify(ranked, max_urls=max_urls, max_per_domain=max_per_domain)
 
 class Article(TypedDict, total=False):
     title: Optional[str]
     url: str
     text: str
     error: Optional[str]
+    mirrors: List[str]  # urls of near-identical copies merged into this one
+    relevance: float  # search ranking score relative to the other selected urls (1.0 = average)
 
 class GraphState(TypedDict):
     # LangGraph plumbing
@@ -85,8 +75,13 @@ class GraphState(TypedDict):
     articles: List[Article]
     reddit_posts: List[str]
     youtube_urls: List[str]
+    extractor_urls: Dict[str, List[str]]  # extractor name -> urls for the scraper agent
+    url_scores: Dict[str, float]  # selected url -> utils.ranking score
     platform_questions: List[str]
     
+    # Parallel planner fan-in (one entry per search hit)
+    search_candidates: Annotated[List[dict], append_unique]
+    
     # Scraper agent outputs
     platform_content: str
     platform_summary: str
@@ -95,35 +90,27 @@ class GraphState(TypedDict):
     report_markdown: str
     
     # Meta
-    errors: List[str]
+    errors: Annotated[List[str], append_unique]
+    dedup_tokens_saved: Annotated[int, operator.add]
     step_info: str
 
-def create_planner_agent(search_tools, llm):
-    # react for url selection, exa crawling outside llm
-    serper_search_tool, exa_crawl_tool = search_tools[0], search_tools[1]
-    react_agent = create_react_agent(
-        model=llm,
-        tools=[serper_search_tool],
-        state_modifier=PLANNER_PROMPT
-    )
+def _prepare_questions(state: GraphState) -> List[str]:
+    followup_questions = state.get("followup_questions", [])
+    original_query = state.get("user_input", "")
+    enhanced_query = state.get("enhanced_query", original_query)
     
-    def planner_agent(state: GraphState) -> GraphState:
-        try:
-            followup_questions = state.get("followup_questions", [])
-            original_query = state.get("user_input", "")
-            enhanced_query = state.get("enhanced_query", original_query)
-            
-            logger.info(f"Planner processing {len(followup_questions)} follow-up questions for: {original_query[:100]}...")
-            
-            # Ensure we have questions to search
-            if not followup_questions:
-                followup_questions = [enhanced_query or original_query]
-                logger.warning("No follow-up questions found, using enhanced/original query")
-            
-            logger.info(f"Searching {len(followup_questions)} questions")
-            
-            # create research prompt
-            research_prompt = f"""
+    logger.info(f"Planner processing {len(followup_questions)} follow-up questions for: {original_query[:100]}...")
+    
+    # Ensure we have questions to search
+    if not followup_questions:
+        followup_questions = [enhanced_query or original_query]
+        logger.warning("No follow-up questions found, using enhanced/original query")
+    
+    logger.info(f"Searching {len(followup_questions)} questions")
+    return followup_questions
+
+def _build_research_prompt(original_query: str, followup_questions: List[str]) -> str:
+    return f"""
 Research these questions about "{original_query}":
 
 {chr(10).join(f"{i+1}. {q}" for i, q in enumerate(followup_questions[:6]))}
@@ -134,143 +121,400 @@ WORKFLOW:
 3. Continue until all questions are searched
 4. Search for Reddit discussions by adding 'site:reddit.com' to 2-3 key questions
 5. Search for YouTube videos by adding 'site:youtube.com' to 2-3 key questions
-6. After all searches, analyze all URLs found
-7. Select 6-8 best URLs for comprehensive coverage
-8. Extract Reddit and YouTube URLs separately for platform scraping
-9. Output selected URLs in JSON format
+6. After all searches, reply with just: DONE
 
 CRITICAL:
 - Search questions ONE BY ONE (don't try to search multiple at once)
 - For Reddit searches: add 'site:reddit.com' to your query (e.g., "AI agents site:reddit.com")
 - For YouTube searches: add 'site:youtube.com' to your query (e.g., "AI agents tutorial site:youtube.com")
-- Look for URLs starting with 'https://www.reddit.com/r/' or 'https://reddit.com/r/'
-- Look for URLs starting with 'https://www.youtube.com/watch' or 'https://youtu.be/'
-- Choose URLs that complement each other, avoid duplicates
-- Prioritize authoritative sources
-- End with JSON: {{"selected_urls": ["url1", "url2", ...], "reddit_urls": ["reddit_url1", "reddit_url2", ...], "youtube_urls": ["youtube_url1", "youtube_url2", ...], "reasoning": "why these URLs"}}
+- Don't list URLs: the best ones are selected from your search results automatically
 
 Start with question 1 now.
 """
+
+def _extract_urls(final_message: str):
+    """Regular and extractor urls in the ReAct agent's final message (when it has no search results to rank)."""
+    listed: List[str] = []
+    try:
+        # a json answer lists its picks first; the urls elsewhere in the text come after them
+        json_match = re.search(r'\{[\s\S]*?"selected_urls"[\s\S]*?\}', final_message)
+        if json_match:
+            parsed = json.loads(json_match.group(0))
+            for value in parsed.values():
+                if isinstance(value, list):
+                    listed += [u for u in value if isinstance(u, str) and u.startswith(('http://', 'https://'))]
+    except Exception as e:
+        logger.warning(f"Failed to parse URLs from JSON: {e}")
+
+    # one pass over every url, each classified once
+    routed = ROUTER.route(listed + [u for urls in ROUTER.find(final_message).values() for u in urls], route_limits())
+    raw_urls = routed.pop(ROUTER.default, [])
+    logger.info(f"Extracted {len(raw_urls)} URLs from text, plus "
+                f"{', '.join(f'{len(urls)} {name}' for name, urls in routed.items()) or 'no extractor URLs'}")
+    return raw_urls, routed
+
+def _crawl_args(selected_urls: List[str], budget: ContextBudget) -> dict:
+    # each page gets its share of the report prompt (the summarizer condenses anything over);
+    # when the summarizer retrieves passages, deeper pages just mean more to choose from
+    page_tokens = budget.page_tokens(len(selected_urls))
+    if SUMMARIZER_CONTEXT == "passages":
+        page_tokens = max(page_tokens, RETRIEVAL_PAGE_TOKENS)
+    return {
+        "urls": selected_urls,
+        "max_urls": len(selected_urls),
+        "max_chars_per_article": tokens_to_chars(page_tokens),
+        "max_total_chars": tokens_to_chars(page_tokens * len(selected_urls)),
+    }
+
+def _parse_crawl_result(crawl_result_str) -> List[Article]:
+    articles: List[Article] = []
+    if isinstance(crawl_result_str, str):
+        crawl_json = json.loads(crawl_result_str)
+        raw_articles = crawl_json.get("articles", [])
+        
+        # Process articles and handle errors
+        for article in raw_articles:
+            if isinstance(article, dict):
+                processed_article: Article = {
+                    "title": article.get("title") or "Untitled",
+                    "url": article.get("url", ""),
+                    "text": article.get("text", "").strip(),
+                }
+                
+                # Skip articles with no meaningful content
+                if processed_article["text"] and len(processed_article["text"]) > 50:
+                    articles.append(processed_article)
+                else:
+                    processed_article["error"] = "No meaningful content extracted"
+                    articles.append(processed_article)
+        
+        logger.info(f"Successfully crawled {len([a for a in articles if not a.get('error')])} articles")
+        if crawl_json.get("error"):
+            # the crawl failed for some urls; cached and shared pages above still came back
+            articles.append(_crawl_error(crawl_json["error"]))
+    return articles
+
+def _crawl_error(crawl_err: Union[Exception, str]) -> Article:
+    logger.error(f"Exa crawl failed: {crawl_err}")
+    return {
+        "title": "Crawl Error",
+        "url": "",
+        "text": "",
+        "error": f"Exa crawl failed: {crawl_err}"
+    }
+
+def _planner_output(state: GraphState, followup_questions: List[str], selected_urls: List[str],
+                    articles: List[Article], extractor_urls: Dict[str, List[str]],
+                    url_scores: Optional[Dict[str, float]] = None) -> GraphState:
+    # Prepare platform questions for scraper agent
+    platform_questions = followup_questions[:3]  # Use first 3 questions for platform search
+    extractor_urls = {name: extractor_urls.get(name, []) for name in EXTRACTORS}
+    
+    logger.info(f"Planner completed research with {len(selected_urls)} URLs, {len(articles)} articles, "
+                f"{', '.join(f'{len(urls)} {name} URLs' for name, urls in extractor_urls.items())}")
+
+    # only the planner's keys (the reducer fields would be counted twice otherwise)
+    return {
+        "selected_urls": selected_urls,
+        "url_scores": url_scores or {},  # the crawler weights each page by it in the report prompt
+        "articles": articles,
+        "extractor_urls": extractor_urls,  # every extractor's urls, for the scraper agent
+        # the reddit and youtube keys predate the extractor registry; api events and old checkpoints read them
+        "reddit_posts": extractor_urls.get("reddit", []),
+        "youtube_urls": extractor_urls.get("youtube", []),
+        "platform_questions": platform_questions,  # Pass questions for platform search
+        "step_info": "Planner",
+    }
+
+def _planner_error(state: GraphState, e: Exception) -> GraphState:
+    logger.error(f"Planner error: {e}")
+    return {
+        "selected_urls": [],
+        "articles": [],
+        "errors": [f"Planner error: {e}"],
+        "step_info": "Planner (error)",
+    }
+
+def _without_snippets(content: str) -> str:
+    # snippets feed the url ranking; titles are enough for the model to plan its next search
+    try:
+        results = json.loads(content)
+        for item in results.get("results", []):
+            item.pop("snippet", None)
+    except (ValueError, AttributeError, TypeError):
+        return content
+    return json.dumps(results, ensure_ascii=False)
+
+def _fit_tool_results(budget: ContextBudget):
+    """pre_model_hook for the react loop: shrink search results so every call fits groq's budget."""
+    def fit_tool_results(state: dict) -> dict:
+        messages = state["messages"]
+        tool_indexes = [i for i, m in enumerate(messages) if isinstance(m, ToolMessage)]
+        fixed = [PLANNER_PROMPT] + [str(m.content) for m in messages if not isinstance(m, ToolMessage)]
+        fixed += [json.dumps(m.tool_calls) for m in messages if getattr(m, "tool_calls", None)]
+        fitted = budget.fit([_without_snippets(str(messages[i].content)) for i in tool_indexes],
+                            total=budget.available(*fixed))
+        llm_messages = list(messages)
+        for i, content in zip(tool_indexes, fitted):
+            if content != messages[i].content:
+                llm_messages[i] = messages[i].model_copy(update={"content": content})
+        # llm_input_messages only changes what the model sees, the loop's history stays intact
+        return {"llm_input_messages": llm_messages}
+
+    return fit_tool_results
+
+def _build_react_agent(search_tools, llm, budget: ContextBudget):
+    # react for url selection only, the crawler node fetches the pages
+    serper_search_tool = search_tools[0]
+    react_agent = create_react_agent(
+        model=llm,
+        tools=[serper_search_tool],
+        state_modifier=PLANNER_PROMPT,
+        pre_model_hook=_fit_tool_results(budget),
+    )
+    return react_agent
+
+def _react_search_hits(messages: list) -> List[dict]:
+    """Every result of the react loop's searches, as rank_candidates hits."""
+    queries = {}
+    for m in messages:
+        for call in getattr(m, "tool_calls", None) or []:
+            queries[call.get("id")] = call.get("args", {}).get("query", "")
+    hits = []
+    for m in messages:
+        if isinstance(m, ToolMessage):
+            hits += _search_hits(queries.get(m.tool_call_id, ""), m.content)
+    return hits
+
+def _react_selection(messages: list):
+    hits = _react_search_hits(messages)
+    if hits:
+        return _rank_hits(hits)
+    # no readable search results: fall back to whatever urls the model's answer has
+    raw_urls, extractor_urls = _extract_urls(str(messages[-1].content))
+    selected_urls = deduplicate_and_diversify_urls(raw_urls, max_urls=8, max_per_domain=2)
+    logger.info(f"Selected {len(selected_urls)} URLs after deduplication and diversity filtering")
+    # nothing was scored, every page weighs the same
+    return selected_urls, extractor_urls, {}
+
+def create_planner_agent(search_tools, llm, budget: Optional[ContextBudget] = None):
+    react_agent = _build_react_agent(search_tools, llm, budget or ContextBudget.for_llm(llm))
+    
+    def planner_agent(state: GraphState) -> GraphState:
+        try:
+            followup_questions = _prepare_questions(state)
+            research_prompt = _build_research_prompt(state.get("user_input", ""), followup_questions)
             
             # run react agent
             messages = [HumanMessage(content=research_prompt)]
             response = react_agent.invoke({"messages": messages})
             
-            # extract urls from response
-            final_message = response["messages"][-1].content
-            raw_urls: List[str] = []
-            reddit_urls: List[str] = []
-            
-            try:
-                # extract json with urls
-                json_match = re.search(r'\{[\s\S]*?"selected_urls"[\s\S]*?\}', final_message)
-                if json_match:
-                    parsed = json.loads(json_match.group(0))
-                    if isinstance(parsed.get("selected_urls"), list):
-                        raw_urls = [u for u in parsed["selected_urls"] if isinstance(u, str) and u.startswith(('http://', 'https://'))]
-                    if isinstance(parsed.get("reddit_urls"), list):
-                        reddit_urls = [u for u in parsed["reddit_urls"] if isinstance(u, str) and u.startswith(('https://www.reddit.com/', 'https://reddit.com/'))]
-                    if isinstance(parsed.get("youtube_urls"), list):
-                        youtube_urls = [u for u in parsed["youtube_urls"] if isinstance(u, str) and u.startswith(('https://www.youtube.com/watch', 'https://youtu.be/'))]
-            except Exception as e:
-                logger.warning(f"Failed to parse URLs from JSON: {e}")
-
-            if not raw_urls:
-                # fallback: find urls in text
-                raw_urls = re.findall(r"https?://\S+", final_message)
-                logger.info(f"Fallback: extracted {len(raw_urls)} URLs from text")
-            
-            # Extract platform URLs from all found URLs
-            youtube_urls = []
-            if not reddit_urls:
-                reddit_pattern = r'https?://(?:www\.)?reddit\.com/r/[^/\s]+/comments/[^/\s]+/[^/\s]+/?'
-                reddit_urls = re.findall(reddit_pattern, final_message)
-                # Also check in raw_urls for Reddit URLs
-                for url in raw_urls:
-                    if re.match(reddit_pattern, url):
-                        reddit_urls.append(url)
-                        raw_urls.remove(url)  # Remove from regular URLs
+            # rank everything the searches returned
+            selected_urls, extractor_urls, url_scores = _react_selection(response["messages"])
+
+            # crawling happens in the crawler node, side by side with the scraper agent
+            return _planner_output(state, followup_questions, selected_urls, [], extractor_urls, url_scores)
+
+        except Exception as e:
+            return _planner_error(state, e)
+    
+    return planner_agent
+
+def create_async_planner_agent(search_tools, llm, budget: Optional[ContextBudget] = None):
+    react_agent = _build_react_agent(search_tools, llm, budget or ContextBudget.for_llm(llm))
+    
+    async def planner_agent(state: GraphState) -> GraphState:
+        try:
+            followup_questions = _prepare_questions(state)
+            research_prompt = _build_research_prompt(state.get("user_input", ""), followup_questions)
             
-            # Extract YouTube URLs
-            youtube_pattern = r'https?://(?:www\.)?(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/|youtube\.com/v/)[^&\s]+'
-            youtube_urls = re.findall(youtube_pattern, final_message)
-            # Also check in raw_urls for YouTube URLs
-            for url in raw_urls:
-                if re.match(youtube_pattern, url):
-                    youtube_urls.append(url)
-                    raw_urls.remove(url)  # Remove from regular URLs
-
-            # Post-process URLs: deduplicate and enforce domain diversity
-            selected_urls = deduplicate_and_diversify_urls(raw_urls, max_urls=8, max_per_domain=2)
-            logger.info(f"Selected {len(selected_urls)} URLs after deduplication and diversity filtering")
-
-            # crawl content with exa
-            articles: List[Article] = []
-            if selected_urls:
-                try:
-                    crawl_result_str = exa_crawl_tool.invoke({
-                        "urls": selected_urls,
-                        "max_urls": len(selected_urls),
-                        "max_chars_per_article": 15000,
-                        "max_total_chars": 100000,
-                    })
-                    
-                    if isinstance(crawl_result_str, str):
-                        crawl_json = json.loads(crawl_result_str)
-                        raw_articles = crawl_json.get("articles", [])
-                        
-                        # Process articles and handle errors
-                        for article in raw_articles:
-                            if isinstance(article, dict):
-                                processed_article: Article = {
-                                    "title": article.get("title") or "Untitled",
-                                    "url": article.get("url", ""),
-                                    "text": article.get("text", "").strip(),
-                                }
-                                
-                                # Skip articles with no meaningful content
-                                if processed_article["text"] and len(processed_article["text"]) > 50:
-                                    articles.append(processed_article)
-                                else:
-                                    processed_article["error"] = "No meaningful content extracted"
-                                    articles.append(processed_article)
-                        
-                        logger.info(f"Successfully crawled {len([a for a in articles if not a.get('error')])} articles")
-                        
-                except Exception as crawl_err:
-                    logger.error(f"Exa crawl failed: {crawl_err}")
-                    articles.append({
-                        "title": "Crawl Error",
-                        "url": "",
-                        "text": "",
-                        "error": f"Exa crawl failed: {crawl_err}"
-                    })
-            else:
-                logger.warning("No URLs to crawl")
-
-            # Prepare platform questions for scraper agent
-            platform_questions = followup_questions[:3]  # Use first 3 questions for platform search
+            # serper calls inside the react loop go through the tool's coroutine
+            messages = [HumanMessage(content=research_prompt)]
+            response = await react_agent.ainvoke({"messages": messages})
             
-            logger.info(f"Planner completed research with {len(selected_urls)} URLs, {len(articles)} articles, {len(reddit_urls)} Reddit URLs, and {len(youtube_urls)} YouTube URLs")
-
-            return {
-                **state,
-                "selected_urls": selected_urls,
-                "articles": articles,
-                "reddit_posts": reddit_urls,  # Pass Reddit URLs to next step
-                "youtube_urls": youtube_urls,  # Pass YouTube URLs to next step
-                "platform_questions": platform_questions,  # Pass questions for platform search
-                "step_info": "Planner",
-            }
+            selected_urls, extractor_urls, url_scores = _react_selection(response["messages"])
+
+            return _planner_output(state, followup_questions, selected_urls, [], extractor_urls, url_scores)
 
         except Exception as e:
-            logger.error(f"Planner error: {e}")
-            return {
-                **state,
-                "selected_urls": [],
-                "articles": [],
-                "errors": state.get("errors", []) + [f"Planner error: {e}"],
-                "step_info": "Planner (error)",
-            }
+            return _planner_error(state, e)
     
     return planner_agent
+
+
+# --- crawler: fetches the selected urls while the scraper agent runs the extractors ---
+
+def _with_relevance(articles: List[Article], url_scores: Dict[str, float]) -> List[Article]:
+    """Each crawled page's ranking score as its relevance, scaled so the selected urls average 1.0."""
+    # the summarizer splits its prompt by these weights next to PLATFORM_WEIGHT, hence the scaling;
+    # a page the crawl returned under another url spelling gets the average
+    mean = sum(url_scores.values()) / len(url_scores) if url_scores else 0.0
+    if mean <= 0:
+        return articles
+    relevance = {normalize_url(url): score / mean for url, score in url_scores.items()}
+    return [article if article.get("error") else
+            {**article, "relevance": round(relevance.get(normalize_url(article.get("url", "")), 1.0), 3)}
+            for article in articles]
+
+def _crawler_output(selected_urls: List[str], articles: List[Article], url_scores: Dict[str, float]) -> dict:
+    logger.info(f"Crawler fetched {len([a for a in articles if not a.get('error')])} of {len(selected_urls)} selected URLs")
+    articles = _with_relevance(articles, url_scores)
+    # mirrors and syndicated copies survive url dedup; merge them so the summarizer reads each text once
+    articles, tokens_saved = dedupe_articles(articles)
+    # runs in parallel with the scraper agent, so only its own keys (no **state, no step_info)
+    return {"articles": articles, "dedup_tokens_saved": tokens_saved}
+
+def create_crawler_agent(exa_crawl_tool, budget: Optional[ContextBudget] = None):
+    """budget is the report model's (the crawled text ends up in the summarizer prompt)."""
+    budget = budget or ContextBudget("gemini-2.0-flash")
+
+    def crawler_agent(state: GraphState) -> dict:
+        selected_urls = state.get("selected_urls", [])
+        articles: List[Article] = []
+        if selected_urls:
+            try:
+                articles = _parse_crawl_result(exa_crawl_tool.invoke(_crawl_args(selected_urls, budget)))
+            except Exception as crawl_err:
+                articles.append(_crawl_error(crawl_err))
+        else:
+            logger.warning("No URLs to crawl")
+        return _crawler_output(selected_urls, articles, state.get("url_scores") or {})
+
+    return crawler_agent
+
+def create_async_crawler_agent(exa_crawl_tool, budget: Optional[ContextBudget] = None):
+    budget = budget or ContextBudget("gemini-2.0-flash")
+
+    async def crawler_agent(state: GraphState) -> dict:
+        selected_urls = state.get("selected_urls", [])
+        articles: List[Article] = []
+        if selected_urls:
+            try:
+                articles = _parse_crawl_result(await exa_crawl_tool.ainvoke(_crawl_args(selected_urls, budget)))
+            except Exception as crawl_err:
+                articles.append(_crawl_error(crawl_err))
+        else:
+            logger.warning("No URLs to crawl")
+        return _crawler_output(selected_urls, articles, state.get("url_scores") or {})
+
+    return crawler_agent
+
+
+# --- parallel planner: one search branch per follow-up question ---
+
+class SearchBranchState(TypedDict):
+    question: str
+    question_index: int
+    include_platforms: bool
+
+def fan_out_questions(state: GraphState) -> List[Send]:
+    """Conditional edge that sends every follow-up question to its own search branch."""
+    followup_questions = _prepare_questions(state)[:6]
+    return [
+        Send(SEARCH_BRANCH_NODE, {
+            "question": question,
+            "question_index": i,
+            # platform searches on the first few questions, like the react prompt asks for
+            "include_platforms": i < 3,
+        })
+        for i, question in enumerate(followup_questions)
+    ]
+
+def _branch_queries(branch: SearchBranchState) -> List[str]:
+    question = branch["question"]
+    queries = [question]
+    if branch.get("include_platforms"):
+        queries += [f"{question} site:{site}" for site in platform_search_sites()]
+    return queries
+
+def _search_hits(query: str, result_str) -> List[dict]:
+    """One search's organic results as rank_candidates hits ({"url", "query", "rank", "title", "snippet"})."""
+    try:
+        results = json.loads(result_str).get("results", [])
+    except (ValueError, AttributeError, TypeError):
+        logger.warning(f"Search failed for '{query[:60]}': {str(result_str)[:200]}")
+        return []
+    hits = []
+    for rank, item in enumerate(results):
+        url = item.get("url") if isinstance(item, dict) else None
+        if isinstance(url, str) and url.startswith(('http://', 'https://')):
+            hits.append({
+                "url": url,
+                "query": query,
+                "rank": rank,
+                "title": item.get("title"),
+                "snippet": item.get("snippet"),
+            })
+    return hits
+
+def _parse_search_hits(branch: SearchBranchState, search_results: List[str]) -> List[dict]:
+    hits = []
+    for query, result_str in zip(_branch_queries(branch), search_results):
+        hits += [{**hit, "question_index": branch["question_index"]} for hit in _search_hits(query, result_str)]
+    return hits
+
+def _branch_output(branch: SearchBranchState, hits: List[dict]) -> dict:
+    logger.info(f"Search branch {branch['question_index'] + 1}: {len(hits)} hits")
+    # only the fan-in field: parallel branches must not write the same plain keys
+    return {"search_candidates": hits}
+
+def create_search_branch(search_tools):
+    """Search one question (plus platform variants) and report its hits."""
+    serper_search_tool = search_tools[0]
+
+    def search_branch(branch: SearchBranchState) -> dict:
+        try:
+            search_results = [serper_search_tool.invoke({"query": q}) for q in _branch_queries(branch)]
+            return _branch_output(branch, _parse_search_hits(branch, search_results))
+
+        except Exception as e:
+            logger.error(f"Search branch error: {e}")
+            return {"search_candidates": []}
+
+    return search_branch
+
+def create_async_search_branch(search_tools):
+    serper_search_tool = search_tools[0]
+
+    async def search_branch(branch: SearchBranchState) -> dict:
+        try:
+            search_results = await asyncio.gather(
+                *(serper_search_tool.ainvoke({"query": q}) for q in _branch_queries(branch))
+            )
+            return _branch_output(branch, _parse_search_hits(branch, list(search_results)))
+
+        except Exception as e:
+            logger.error(f"Search branch error: {e}")
+            return {"search_candidates": []}
+
+    return search_branch
+
+def _rank_hits(hits: List[dict], max_urls: int = 8, max_per_domain: int = 2, max_platform_urls: Optional[int] = None):
+    """(urls to crawl, {extractor: urls}, {url to crawl: score}) picked from all search hits by utils.ranking score."""
+    ranked = rank_candidates(hits)
+    # each url classified once; routing keeps the ranking order, so every group is best first
+    groups: Dict[str, List[dict]] = {}
+    for entry in ranked:
+        groups.setdefault(ROUTER.classify(entry["url"]), []).append(entry)
+    selected_urls = diversify(groups.get(ROUTER.default, []), max_urls=max_urls, max_per_domain=max_per_domain)
+    extractor_urls = {
+        name: [entry["url"] for entry in groups.get(name, [])][:max_platform_urls or extractor.max_urls]
+        for name, extractor in EXTRACTORS.items()
+    }
+    logger.info(f"Ranked {len(ranked)} distinct URLs from {len(hits)} search hits, selected {len(selected_urls)} "
+                f"across {len({domain_of(url) for url in selected_urls})} domains")
+    scores = {entry["url"]: entry["score"] for entry in groups.get(ROUTER.default, [])}
+    return selected_urls, extractor_urls, {url: scores[url] for url in selected_urls}
+
+def select_urls(state: GraphState, max_urls: int = 8, max_per_domain: int = 2,
+                max_platform_urls: Optional[int] = None) -> GraphState:
+    """Join step of the parallel planner: rank the search hits into the urls to crawl and scrape."""
+    try:
+        followup_questions = _prepare_questions(state)
+        selected_urls, extractor_urls, url_scores = _rank_hits(
+            state.get("search_candidates", []), max_urls, max_per_domain, max_platform_urls)
+
+        return _planner_output(state, followup_questions, selected_urls, [], extractor_urls, url_scores)
+
+    except Exception as e:
+        return _planner_error(state, e)
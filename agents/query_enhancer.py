@@ -1,6 +1,5 @@
-from typing import TypedDict, Annotated, List, Optional
+from typing import TYPE_CHECKING, TypedDict, Annotated, List, Optional
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_groq import ChatGroq
 from langgraph.graph.message import add_messages
 from utils.prompts import QUERY_ENHANCER_PROMPT
 import json
@@ -8,6 +7,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
 class Article(TypedDict, total=False):
     title: Optional[str]
     url: str
@@ -41,57 +43,69 @@ class GraphState(TypedDict):
     errors: List[str]
     step_info: str
 
-def create_query_enhancer_agent(llm: ChatGroq):
+def _build_messages(state: GraphState) -> list:
+    return [
+        SystemMessage(content=QUERY_ENHANCER_PROMPT),
+        HumanMessage(content=f"Original user query (preserve terms verbatim): \"{state['user_input']}\""),
+    ]
+
+def _parse_response(state: GraphState, response) -> GraphState:
+    # Parse JSON response
+    try:
+        parsed = json.loads(response.content.strip())
+        enhanced_query = parsed.get("enhanced_query", state["user_input"])
+        followup_questions = parsed.get("followup_questions", [])
+        
+        # Ensure we have at least the original query as a fallback
+        if not followup_questions:
+            followup_questions = [enhanced_query or state["user_input"]]
+            
+        logger.info(f"Enhanced query: {enhanced_query[:100]}...")
+        logger.info(f"Generated {len(followup_questions)} follow-up questions")
+        
+        return {
+            "enhanced_query": enhanced_query,
+            "followup_questions": followup_questions,
+            "step_info": "Query Enhancer",
+        }
+        
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse JSON from query enhancer: {e}")
+        # Fallback: use original query
+        return {
+            "enhanced_query": state["user_input"],
+            "followup_questions": [state["user_input"]],
+            "errors": [f"Query enhancer JSON parse error: {e}"],
+            "step_info": "Query Enhancer (fallback)",
+        }
+
+def _error_state(state: GraphState, e: Exception) -> GraphState:
+    logger.error(f"Query enhancer error: {e}")
+    return {
+        "enhanced_query": state["user_input"],
+        "followup_questions": [state["user_input"]],
+        "errors": [f"Query enhancer error: {e}"],
+        "step_info": "Query Enhancer (error)",
+    }
+
+def create_query_enhancer_agent(llm: "ChatGroq"):
     def query_enhancer_node(state: GraphState) -> GraphState:
         try:
             logger.info(f"Query enhancer processing: {state['user_input'][:100]}...")
-            
-            messages = [
-                SystemMessage(content=QUERY_ENHANCER_PROMPT),
-                HumanMessage(content=f"Original user query (preserve terms verbatim): \"{state['user_input']}\""),
-            ]
+            response = llm.invoke(_build_messages(state))
+            return _parse_response(state, response)
+        except Exception as e:
+            return _error_state(state, e)
+    
+    return query_enhancer_node
 
-            response = llm.invoke(messages)
-            
-            # Parse JSON response
-            try:
-                parsed = json.loads(response.content.strip())
-                enhanced_query = parsed.get("enhanced_query", state["user_input"])
-                followup_questions = parsed.get("followup_questions", [])
-                
-                # Ensure we have at least the original query as a fallback
-                if not followup_questions:
-                    followup_questions = [enhanced_query or state["user_input"]]
-                    
-                logger.info(f"Enhanced query: {enhanced_query[:100]}...")
-                logger.info(f"Generated {len(followup_questions)} follow-up questions")
-                
-                return {
-                    **state,
-                    "enhanced_query": enhanced_query,
-                    "followup_questions": followup_questions,
-                    "step_info": "Query Enhancer",
-                }
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON from query enhancer: {e}")
-                # Fallback: use original query
-                return {
-                    **state,
-                    "enhanced_query": state["user_input"],
-                    "followup_questions": [state["user_input"]],
-                    "errors": state.get("errors", []) + [f"Query enhancer JSON parse error: {e}"],
-                    "step_info": "Query Enhancer (fallback)",
-                }
-                
+def create_async_query_enhancer_agent(llm: "ChatGroq"):
+    async def query_enhancer_node(state: GraphState) -> GraphState:
+        try:
+            logger.info(f"Query enhancer processing: {state['user_input'][:100]}...")
+            response = await llm.ainvoke(_build_messages(state))
+            return _parse_response(state, response)
         except Exception as e:
-            logger.error(f"Query enhancer error: {e}")
-            return {
-                **state,
-                "enhanced_query": state["user_input"],
-                "followup_questions": [state["user_input"]],
-                "errors": state.get("errors", []) + [f"Query enhancer error: {e}"],
-                "step_info": "Query Enhancer (error)",
-            }
+            return _error_state(state, e)
     
     return query_enhancer_node
@@ -1,6 +1,5 @@
-from typing import TypedDict, Annotated, List, Optional
+from typing import TYPE_CHECKING, TypedDict, Annotated, List, Optional
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_groq import ChatGroq
 from langgraph.graph.message import add_messages
 import logging
 import json
@@ -10,6 +9,9 @@ from utils.prompts import REDDIT_PROCESSOR_PROMPT
 
 logger = logging.getLogger(__name__)
 
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
 class Article(TypedDict, total=False):
     title: Optional[str]
     url: str
@@ -43,7 +45,7 @@ class GraphState(TypedDict):
     errors: List[str]
     step_info: str
 
-def create_reddit_processor_agent(llm: ChatGroq):
+def create_reddit_processor_agent(llm: "ChatGroq"):
     """
     Creates a Reddit processor agent that:
     1. Takes Reddit URLs from the planner
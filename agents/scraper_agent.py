@@ -1,16 +1,21 @@
-from typing import TypedDict, Annotated, List, Optional
+from typing import TYPE_CHECKING, TypedDict, Annotated, Any, Dict, List, Optional
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_groq import ChatGroq
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langgraph.graph.message import add_messages
+import asyncio
 import logging
 import json
 
-from tools.reddit_scraper import get_multiple_reddit_posts
-from tools.youtube_transcript import get_multiple_youtube_transcripts
+from tools.extractors import EXTRACTORS, Extractor
 from utils.prompts import SCRAPER_AGENT_PROMPT
+from utils.budget import ContextBudget
+from utils.dedup import dedupe_platform_content
 
 logger = logging.getLogger(__name__)
 
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
 class Article(TypedDict, total=False):
     title: Optional[str]
     url: str
@@ -33,6 +38,7 @@ class GraphState(TypedDict):
     articles: List[Article]
     reddit_posts: List[str]
     youtube_urls: List[str]
+    extractor_urls: Dict[str, List[str]]
     platform_questions: List[str]
     
     # Scraper agent outputs
@@ -47,92 +53,148 @@ class GraphState(TypedDict):
     errors: List[str]
     step_info: str
 
-def create_scraper_agent(llm: ChatGroq):
+def _section(extractor: Extractor, urls: List[str], content=None, error=None) -> str:
+    if error is not None:
+        logger.error(f"Error extracting {extractor.name} content: {error}")
+        return f"## {extractor.heading}\n\nError extracting {extractor.name} content: {error}"
+    logger.info(f"Successfully extracted {extractor.name} content from {len(urls)} URLs")
+    return f"## {extractor.heading}\n\n{content}"
+
+def _scraper_output(routed: Dict[str, List[str]], sections: List[str], failed: List[str]) -> GraphState:
+    # Combine all platform content
+    tokens_saved = 0
+    if sections:
+        platform_content = "\n\n" + "=" * 80 + "\n\n".join(sections)
+        # crossposted threads and re-uploaded videos carry the same text twice
+        platform_content, tokens_saved = dedupe_platform_content(platform_content)
+        logger.info(f"Combined platform content ({len(platform_content)} characters)")
+    else:
+        platform_content = "No platform content found for this query."
+        logger.warning("No platform content to process")
+    
+    # Skip LLM processing to avoid token limits - pass raw content directly
+    platform_summary = "Raw platform content extracted: " + ", ".join(
+        f"{len(urls)} {EXTRACTORS[name].label} URLs ({'failed' if name in failed else 'extracted' if urls else 'none'})"
+        for name, urls in routed.items()
+    )
+    logger.info(f"Passing raw platform content directly to avoid token limits - {len(platform_content)} total characters")
+    
+    # runs side by side with the crawler, so return only the keys this node owns
+    return {
+        "platform_content": platform_content,
+        "platform_summary": platform_summary,
+        "platform_urls": {f"{name}_urls": urls for name, urls in routed.items()},  # for the report's sources
+        "dedup_tokens_saved": tokens_saved,
+        "step_info": "Scraper Agent",
+    }
+
+def _scraper_error(e: Exception) -> dict:
+    logger.error(f"Scraper agent error: {e}")
+    return {
+        "platform_content": "",
+        "platform_summary": f"Error processing platform content: {e}",
+        "errors": [f"Scraper agent error: {e}"],  # appended by the errors reducer
+        "step_info": "Scraper Agent (error)",
+    }
+
+def _extractor_tools(overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Registered tools, with `<extractor>_tool=` overrides (fakes in benchmarks, alternative backends)."""
+    unknown = [key for key in overrides if not (key.endswith("_tool") and key[:-len("_tool")] in EXTRACTORS)]
+    if unknown:
+        raise ValueError(f"Unknown extractor tools: {unknown} (registered: {list(EXTRACTORS)})")
+    return {name: overrides.get(f"{name}_tool") or extractor.tool for name, extractor in EXTRACTORS.items()}
+
+def _routed_urls(state: GraphState) -> Dict[str, List[str]]:
+    routed = state.get("extractor_urls")
+    if routed is None:
+        # checkpoints written before the extractor registry only have the reddit/youtube keys
+        routed = {"reddit": state.get("reddit_posts", []), "youtube": state.get("youtube_urls", [])}
+    routed = {name: list(routed.get(name) or []) for name in EXTRACTORS}
+    logger.info(f"Scraper agent processing {', '.join(f'{len(urls)} {name}' for name, urls in routed.items())} URLs "
+                f"for: {state.get('user_input', '')[:100]}...")
+    return routed
+
+def _questions(state: GraphState) -> List[str]:
+    # what focused extractors (youtube transcripts) pick their excerpts by: everything the report answers
+    questions = [state.get("user_input", "")] + list(state.get("followup_questions") or state.get("platform_questions") or [])
+    return [q for q in questions if q and q.strip()]
+
+def _jobs(routed: Dict[str, List[str]], tools: Dict[str, Any], budget: ContextBudget, questions: List[str]):
+    # every post, video and thread gets an even slice of the report prompt's platform share
+    item_tokens = budget.platform_item_tokens(sum(len(urls) for urls in routed.values()))
+    jobs = []
+    for name, urls in routed.items():
+        if urls:
+            extractor = EXTRACTORS[name]
+            logger.info(f"Extracting {name} content from {len(urls)} URLs: {urls[:3]}...")
+            jobs.append((extractor, urls, tools[name], extractor.args(urls, item_tokens, questions)))
+    return jobs
+
+def _sections(jobs, results):
+    """Sections in registration order, plus the names of the extractors that raised."""
+    sections, failed = [], []
+    for (extractor, urls, _, _), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            failed.append(extractor.name)
+            sections.append(_section(extractor, urls, error=result))
+        else:
+            sections.append(_section(extractor, urls, result))
+    return sections, failed
+
+def _invoke(tool, args):
+    try:
+        return tool.invoke(args)
+    except Exception as e:
+        return e
+
+def create_scraper_agent(llm: "ChatGroq", budget: Optional[ContextBudget] = None, **tools):
     """
     Creates a central scraper agent that:
-    1. Receives platform questions and URLs from the planner
-    2. Performs platform-specific searches if needed
-    3. Extracts content using Reddit and YouTube tools
-    4. Generates a comprehensive summary of all platform content
-    5. Updates the state with platform content and summary
+    1. Receives the urls the planner routed to each registered extractor (runs alongside the crawler)
+    2. Runs every extractor that has urls (Reddit, YouTube, Hacker News, ...) concurrently
+    3. Passes the combined platform content on to the summarizer
+
+    budget is the report model's: every item is sized to fit its prompt.
+    tools overrides registered extractors' tools by keyword, e.g. reddit_tool=...
     """
+    budget = budget or ContextBudget("gemini-2.0-flash")
+    tools = _extractor_tools(tools)
     
-    def scraper_agent(state: GraphState) -> GraphState:
+    def scraper_agent(state: GraphState) -> dict:
         try:
-            reddit_urls = state.get("reddit_posts", [])
-            youtube_urls = state.get("youtube_urls", [])
-            platform_questions = state.get("platform_questions", [])
-            original_query = state.get("user_input", "")
-            
-            logger.info(f"Scraper agent processing {len(reddit_urls)} Reddit URLs, {len(youtube_urls)} YouTube URLs for: {original_query[:100]}...")
-            
-            all_platform_content = []
-            platform_summaries = []
+            routed = _routed_urls(state)
+            jobs = _jobs(routed, tools, budget, _questions(state))
             
-            # Process Reddit content
-            if reddit_urls:
-                try:
-                    logger.info(f"Extracting Reddit content from {len(reddit_urls)} URLs")
-                    reddit_content = get_multiple_reddit_posts.invoke({"urls": reddit_urls})
-                    all_platform_content.append(f"## REDDIT DISCUSSIONS\n\n{reddit_content}")
-                    platform_summaries.append("Reddit: Community discussions and opinions extracted")
-                    logger.info("Successfully extracted Reddit content")
-                except Exception as e:
-                    logger.error(f"Error extracting Reddit content: {e}")
-                    all_platform_content.append(f"## REDDIT DISCUSSIONS\n\nError extracting Reddit content: {e}")
-                    platform_summaries.append("Reddit: Error occurred during extraction")
-            else:
-                logger.info("No Reddit URLs to process")
+            # one thread per extractor, so a new source adds no wall time; map() keeps the section order
+            results = []
+            if jobs:
+                with ContextThreadPoolExecutor(max_workers=len(jobs)) as pool:
+                    results = list(pool.map(lambda job: _invoke(job[2], job[3]), jobs))
             
-            # Process YouTube content
-            if youtube_urls:
-                try:
-                    logger.info(f"Extracting YouTube transcripts from {len(youtube_urls)} URLs: {youtube_urls[:3]}...")
-                    youtube_content = get_multiple_youtube_transcripts.invoke({"urls": youtube_urls})
-                    all_platform_content.append(f"## YOUTUBE TRANSCRIPTS\n\n{youtube_content}")
-                    platform_summaries.append(f"YouTube: {len(youtube_urls)} video transcripts extracted")
-                    logger.info(f"Successfully extracted YouTube content from {len(youtube_urls)} videos")
-                except Exception as e:
-                    logger.error(f"Error extracting YouTube content: {e}")
-                    all_platform_content.append(f"## YOUTUBE TRANSCRIPTS\n\nError extracting YouTube content: {e}")
-                    platform_summaries.append("YouTube: Error occurred during extraction")
-            else:
-                logger.warning("No YouTube URLs found - planner may not have searched for YouTube content properly")
+            return _scraper_output(routed, *_sections(jobs, results))
             
-            # Combine all platform content
-            if all_platform_content:
-                platform_content = "\n\n" + "=" * 80 + "\n\n".join(all_platform_content)
-                logger.info(f"Combined platform content ({len(platform_content)} characters)")
-            else:
-                platform_content = "No platform content found for this query."
-                logger.warning("No platform content to process")
-            
-            # Skip LLM processing to avoid token limits - pass raw content directly
-            platform_summary = f"Raw platform content extracted: {len(reddit_urls)} Reddit posts ({len([c for c in all_platform_content if 'REDDIT' in c])} successful), {len(youtube_urls)} YouTube videos ({len([c for c in all_platform_content if 'YOUTUBE' in c])} successful)"
-            logger.info(f"Passing raw platform content directly to avoid token limits - {len(platform_content)} total characters")
+        except Exception as e:
+            return _scraper_error(e)
+    
+    return scraper_agent
+
+def create_async_scraper_agent(llm: "ChatGroq", budget: Optional[ContextBudget] = None, **tools):
+    """
+    Async variant of create_scraper_agent: the extractors are gathered on the event loop.
+    """
+    budget = budget or ContextBudget("gemini-2.0-flash")
+    tools = _extractor_tools(tools)
+    
+    async def scraper_agent(state: GraphState) -> dict:
+        try:
+            routed = _routed_urls(state)
+            jobs = _jobs(routed, tools, budget, _questions(state))
             
-            # Add platform URLs to state for sources
-            platform_urls = {
-                "reddit_urls": reddit_urls,
-                "youtube_urls": youtube_urls
-            }
+            results = await asyncio.gather(*(tool.ainvoke(args) for _, _, tool, args in jobs), return_exceptions=True)
             
-            return {
-                **state,
-                "platform_content": platform_content,
-                "platform_summary": platform_summary,
-                "platform_urls": platform_urls,
-                "step_info": "Scraper Agent",
-            }
+            return _scraper_output(routed, *_sections(jobs, results))
             
         except Exception as e:
-            logger.error(f"Scraper agent error: {e}")
-            return {
-                **state,
-                "platform_content": "",
-                "platform_summary": f"Error processing platform content: {e}",
-                "errors": state.get("errors", []) + [f"Scraper agent error: {e}"],
-                "step_info": "Scraper Agent (error)",
-            }
+            return _scraper_error(e)
     
     return scraper_agent
@@ -1,18 +1,38 @@
-from typing import TypedDict, Annotated, List, Optional
+from typing import TYPE_CHECKING, TypedDict, Annotated, Dict, List, Optional
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph.message import add_messages
-from utils.prompts import SUMMARIZER_PROMPT
+from langgraph.constants import TAG_NOSTREAM
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from tools.extractors import EXTRACTORS
+from utils.prompts import SUMMARIZER_PROMPT, ARTICLE_NOTES_PROMPT
+from utils.budget import ARTICLES_SHARE, ContextBudget, split_tokens, truncate_tokens
+from utils.retrieval import RETRIEVAL_TOKENS, SUMMARIZER_CONTEXT, select_passages
+import asyncio
+import os
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+# article text is condensed in pieces of at most this many tokens
+MAP_CHUNK_TOKENS = 3000
+# platform content (all reddit posts + transcripts) weighs as much as this many articles
+PLATFORM_WEIGHT = 2.0
+# parallel note-taking calls per report
+MAP_CONCURRENCY = int(os.getenv("SUMMARIZER_MAP_CONCURRENCY", 8))
+# keeps note-taking calls out of the streamed report tokens
+MAP_CONFIG = {"tags": [TAG_NOSTREAM], "run_name": "summarizer_map"}
+
 class Article(TypedDict, total=False):
     title: Optional[str]
     url: str
     text: str
     error: Optional[str]
+    mirrors: List[str]  # urls of near-identical copies merged into this one
+    relevance: float  # search ranking score relative to the other selected urls (1.0 = average)
 
 class GraphState(TypedDict):
     # LangGraph plumbing
@@ -30,6 +50,7 @@ class GraphState(TypedDict):
     articles: List[Article]
     reddit_posts: List[str]
     youtube_urls: List[str]
+    extractor_urls: Dict[str, List[str]]
     platform_questions: List[str]
     
     # Scraper agent outputs
@@ -44,90 +65,55 @@ class GraphState(TypedDict):
     errors: List[str]
     step_info: str
 
-def create_summarizer_agent(gemini: ChatGoogleGenerativeAI):
-    def summarizer_agent(state: GraphState) -> GraphState:
-        try:
-            articles = state.get("articles", [])
-            original_query = state.get("user_input", "")
-            selected_urls = state.get("selected_urls", [])
-            platform_content = state.get("platform_content", "")
-            platform_summary = state.get("platform_summary", "")
-            platform_urls = state.get("platform_urls", {})
-            
-            logger.info(f"Summarizer processing {len(articles)} articles for: {original_query[:100]}...")
-            
-            # Filter out articles with errors and prepare content
-            valid_articles = [a for a in articles if not a.get("error") and a.get("text", "").strip()]
-            
-            if not valid_articles:
-                logger.warning("No valid articles found for summarization")
-                error_msg = "No valid articles were found to create a comprehensive report."
-                if articles:
-                    error_msg += f" ({len(articles)} articles had errors or no content)"
-                
-                return {
-                    **state,
-                    "report_markdown": f"# Research Report\n\n**Query:** {original_query}\n\n## Error\n\n{error_msg}\n\n**Errors encountered:**\n" + 
-                                   "\n".join(f"- {a.get('error', 'Unknown error')}" for a in articles if a.get("error")),
-                    "errors": state.get("errors", []) + ["No valid articles for summarization"],
-                    "step_info": "Summarizer (no content)",
-                }
-            
-            # Create sources mapping for citations with URLs
-            sources = []
-            for i, article in enumerate(valid_articles):
-                url = article.get('url', '')
-                title = article.get('title', 'Untitled')
-                if url and url.startswith(('http://', 'https://')):
-                    sources.append(f"{i+1}. {title} - {url}")
-                else:
-                    sources.append(f"{i+1}. {title} - No URL available")
-            
-            # Add platform URLs to sources
-            reddit_urls = platform_urls.get("reddit_urls", [])
-            youtube_urls = platform_urls.get("youtube_urls", [])
-            
-            for i, url in enumerate(reddit_urls):
-                sources.append(f"{len(sources)+1}. Reddit Discussion - {url}")
-            
-            for i, url in enumerate(youtube_urls):
-                sources.append(f"{len(sources)+1}. YouTube Video - {url}")
-            
-            # Prepare content for the model with article references
-            articles_content = []
-            for i, article in enumerate(valid_articles):
-                article_text = f"[ARTICLE {i+1}]\nTitle: {article.get('title', 'Untitled')}\nURL: {article.get('url', 'No URL')}\nContent: {article.get('text', '')[:12000]}\n"  # Limit per article
-                articles_content.append(article_text)
-            
-            content_for_model = "\n\n".join(articles_content)
-            
-            # Check if content is too large and needs chunking
-            if len(content_for_model) > 80000:  # Conservative token limit
-                logger.info("Content too large, using first batch of articles")
-                # Use first half of articles to stay within limits
-                mid_point = len(valid_articles) // 2
-                valid_articles = valid_articles[:max(1, mid_point)]
-                sources = sources[:len(valid_articles)]
-                
-                articles_content = []
-                for i, article in enumerate(valid_articles):
-                    article_text = f"[ARTICLE {i+1}]\nTitle: {article.get('title', 'Untitled')}\nURL: {article.get('url', 'No URL')}\nContent: {article.get('text', '')[:12000]}\n"
-                    articles_content.append(article_text)
-                
-                content_for_model = "\n\n".join(articles_content)
-
-            # Prepare content including platform discussions
-            all_content = content_for_model
-            
-            if platform_content:
-                # Limit platform content to avoid token limits - use first 8000 chars
-                limited_platform_content = platform_content[:8000]
-                all_content += f"\n\nPLATFORM CONTENT (Reddit & YouTube):\n{limited_platform_content}"
-                logger.info(f"Including limited platform content in final report ({len(limited_platform_content)} chars)")
-            
-            messages = [
-                SystemMessage(content=SUMMARIZER_PROMPT),
-                HumanMessage(content=f"""Original Query: {original_query}
+def _no_content_state(state: GraphState, articles: List[Article]) -> GraphState:
+    logger.warning("No valid articles found for summarization")
+    original_query = state.get("user_input", "")
+    error_msg = "No valid articles were found to create a comprehensive report."
+    if articles:
+        error_msg += f" ({len(articles)} articles had errors or no content)"
+    
+    # only the keys this node owns: returning the whole state would feed the reducer
+    # fields (dedup_tokens_saved, errors) back in and count them twice
+    return {
+        "report_markdown": f"# Research Report\n\n**Query:** {original_query}\n\n## Error\n\n{error_msg}\n\n**Errors encountered:**\n" + 
+                       "\n".join(f"- {a.get('error', 'Unknown error')}" for a in articles if a.get("error")),
+        "errors": ["No valid articles for summarization"],
+        "step_info": "Summarizer (no content)",
+    }
+
+def _build_sources(valid_articles: List[Article], platform_urls: dict) -> List[str]:
+    # Create sources mapping for citations with URLs
+    sources = []
+    for i, article in enumerate(valid_articles):
+        url = article.get('url', '')
+        title = article.get('title', 'Untitled')
+        if url and url.startswith(('http://', 'https://')):
+            sources.append(f"{i+1}. {title} - {url}")
+        else:
+            sources.append(f"{i+1}. {title} - No URL available")
+    
+    # Add platform URLs to sources, in the order their sections appear in the prompt
+    for name, extractor in EXTRACTORS.items():
+        for url in platform_urls.get(f"{name}_urls", []):
+            sources.append(f"{len(sources)+1}. {extractor.label} - {url}")
+    
+    # copies merged into an article by the crawler's dedup stay citable
+    for article in valid_articles:
+        for url in article.get("mirrors", []):
+            sources.append(f"{len(sources)+1}. {article.get('title', 'Untitled')} (mirror) - {url}")
+    
+    return sources
+
+def _format_article(i: int, article: Article) -> str:
+    # article reference block; length is up to the context budget, see _fit_content
+    mirrors = f"\nAlso published at: {', '.join(article['mirrors'])}" if article.get("mirrors") else ""
+    return f"[ARTICLE {i+1}]\nTitle: {article.get('title', 'Untitled')}\nURL: {article.get('url', 'No URL')}{mirrors}\nContent: {article.get('text', '')}\n"
+
+def _platform_block(platform_content: str) -> str:
+    return f"\n\nPLATFORM CONTENT (Reddit & YouTube):\n{platform_content}" if platform_content else ""
+
+def _human_message(original_query: str, all_content: str, sources: List[str]) -> str:
+    return f"""Original Query: {original_query}
 
 RESEARCH ARTICLES:
 {all_content}
@@ -137,44 +123,219 @@ SOURCES FOR CLICKABLE CITATIONS:
 
 IMPORTANT: Create clickable citations using markdown format [1](url), [2](url), etc. that correspond to the sources above. Only cite important claims, specific data, or direct quotes - limit to 1-3 citations per paragraph.
 
-Create a comprehensive markdown report with proper clickable citations. If platform content is included, analyze the raw Reddit discussions and YouTube transcripts to extract community perspectives and insights.""")
-            ]
+Create a comprehensive markdown report with proper clickable citations. If platform content is included, analyze the raw Reddit discussions and YouTube transcripts to extract community perspectives and insights."""
+
+def _content_parts(state: GraphState, valid_articles: List[Article], sources: List[str], budget: ContextBudget):
+    """Article blocks + platform block, their relevance weights, and the tokens they may use."""
+    blocks = [_format_article(i, article) for i, article in enumerate(valid_articles)]
+    weights = [float(article.get("relevance", 1.0)) for article in valid_articles]
+    platform = _platform_block(state.get("platform_content", ""))
+    if platform:
+        blocks.append(platform)
+        weights.append(PLATFORM_WEIGHT)
+    return blocks, weights, _available(state, sources, budget)
+
+def _available(state: GraphState, sources: List[str], budget: ContextBudget) -> int:
+    # room for content once the system prompt, instructions and sources list are in
+    return budget.available(SUMMARIZER_PROMPT, _human_message(state.get("user_input", ""), "", sources))
+
+def _retrieve_passages(state: GraphState, valid_articles: List[Article], sources: List[str], budget: ContextBudget) -> List[Article]:
+    """Swap each article's text for its passages that best match the query and follow-up questions."""
+    available = _available(state, sources, budget)
+    if state.get("platform_content"):
+        available = int(available * ARTICLES_SHARE)
+    queries = [state.get("user_input", ""), state.get("enhanced_query", "")] + list(state.get("followup_questions", []))
+    texts = select_passages(
+        [article.get("text", "") for article in valid_articles],
+        [query for query in dict.fromkeys(queries) if query],
+        min(RETRIEVAL_TOKENS, available),
+        weights=[float(article.get("relevance", 1.0)) for article in valid_articles],
+    )
+    # every article stays (its source number is cited), even if only its best passage made it
+    return [{**article, "text": text} for article, text in zip(valid_articles, texts)]
+
+def _select_articles(state: GraphState):
+    """Valid articles and the sources list, or an early state if there is nothing to summarize."""
+    articles = state.get("articles", [])
+    original_query = state.get("user_input", "")
+    
+    logger.info(f"Summarizer processing {len(articles)} articles for: {original_query[:100]}...")
+    
+    # Filter out articles with errors and prepare content
+    valid_articles = [a for a in articles if not a.get("error") and a.get("text", "").strip()]
+    
+    if not valid_articles:
+        return None, None, _no_content_state(state, articles)
+    
+    return valid_articles, _build_sources(valid_articles, state.get("platform_urls", {})), None
+
+def _needs_map_reduce(state: GraphState, valid_articles: List[Article], sources: List[str], budget: ContextBudget) -> bool:
+    blocks, _, available = _content_parts(state, valid_articles, sources, budget)
+    size = sum(budget.count(block) for block in blocks)
+    if size > available:
+        logger.info(f"Content too large ({size} tokens, {available} available), condensing {len(valid_articles)} articles into notes first")
+        return True
+    return False
+
+def _map_jobs(original_query: str, valid_articles: List[Article]):
+    """(article index, messages) for every chunk of every article."""
+    jobs = []
+    for i, article in enumerate(valid_articles):
+        chunks = split_tokens(article.get("text", ""), MAP_CHUNK_TOKENS)
+        for n, chunk in enumerate(chunks):
+            part = f" (part {n + 1} of {len(chunks)})" if len(chunks) > 1 else ""
+            jobs.append((i, [
+                SystemMessage(content=ARTICLE_NOTES_PROMPT),
+                HumanMessage(content=f"""Research Query: {original_query}
+
+ARTICLE TO CONDENSE{part}:
+Title: {article.get('title', 'Untitled')}
+URL: {article.get('url', 'No URL')}
+Content: {chunk}"""),
+            ]))
+    return jobs
+
+def _reduce_articles(valid_articles: List[Article], jobs, results) -> List[Article]:
+    """Swap each article's text for its notes; a failed chunk falls back to the start of its raw text."""
+    notes = [[] for _ in valid_articles]
+    failed = 0
+    for (i, messages), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            failed += 1
+            chunk = messages[1].content.split("Content: ", 1)[-1]
+            notes[i].append(truncate_tokens(chunk, 500))
+            continue
+        text = result.content.strip() if isinstance(result.content, str) else str(result.content)
+        if text and text != "NO RELEVANT CONTENT":
+            notes[i].append(text)
+    if failed:
+        logger.warning(f"{failed} of {len(jobs)} note-taking calls failed, using raw excerpts for those")
+
+    condensed = []
+    for article, article_notes in zip(valid_articles, notes):
+        # keep every article (and so its source number) even if nothing relevant was found
+        condensed.append({**article, "text": "\n".join(article_notes) or "(no relevant content)"})
+    total = sum(len(a.get("text", "")) for a in valid_articles)
+    logger.info(f"Condensed {len(valid_articles)} articles from {total} to {sum(len(a['text']) for a in condensed)} chars in {len(jobs)} calls")
+    return condensed
+
+def _condense_articles(gemini: "ChatGoogleGenerativeAI", original_query: str, valid_articles: List[Article]) -> List[Article]:
+    jobs = _map_jobs(original_query, valid_articles)
+
+    def take_notes(messages):
+        try:
+            return gemini.invoke(messages, config=MAP_CONFIG)
+        except Exception as e:
+            return e
+
+    # context-copying pool, so the note calls stay attached to this run (tracing, stream filtering)
+    with ContextThreadPoolExecutor(max_workers=MAP_CONCURRENCY) as executor:
+        results = list(executor.map(take_notes, [messages for _, messages in jobs]))
+    return _reduce_articles(valid_articles, jobs, results)
+
+async def _acondense_articles(gemini: "ChatGoogleGenerativeAI", original_query: str, valid_articles: List[Article]) -> List[Article]:
+    jobs = _map_jobs(original_query, valid_articles)
+    semaphore = asyncio.Semaphore(MAP_CONCURRENCY)
+
+    async def take_notes(messages):
+        async with semaphore:
+            return await gemini.ainvoke(messages, config=MAP_CONFIG)
+
+    results = await asyncio.gather(*(take_notes(messages) for _, messages in jobs), return_exceptions=True)
+    return _reduce_articles(valid_articles, jobs, list(results))
+
+def _build_messages(state: GraphState, valid_articles: List[Article], sources: List[str], budget: ContextBudget):
+    """The final (reduce) call: every article, or its notes, plus platform content and sources."""
+    blocks, weights, available = _content_parts(state, valid_articles, sources, budget)
+    
+    # share the room left after prompt + sources between articles and platform content
+    fitted = budget.fit(blocks, weights, available)
+    all_content = "\n\n".join(fitted[:len(valid_articles)]) + "".join(fitted[len(valid_articles):])
+    logger.info(f"Report prompt uses {budget.count(all_content)} of {available} available content tokens")
+    
+    messages = [
+        SystemMessage(content=SUMMARIZER_PROMPT),
+        HumanMessage(content=_human_message(state.get("user_input", ""), all_content, sources)),
+    ]
+    return messages
+
+def _finalize_report(state: GraphState, response, sources: List[str]) -> GraphState:
+    # Append sources section to the report with clickable links
+    report_with_sources = response.content.strip()
+    
+    if not report_with_sources.endswith("## Sources"):
+        # Create clickable sources list
+        clickable_sources = []
+        for source in sources:
+            # Extract URL from source line (format: "1. Title - URL")
+            parts = source.split(" - ", 1)
+            if len(parts) == 2 and parts[1].startswith(('http://', 'https://')):
+                title = parts[0].split(". ", 1)[1] if ". " in parts[0] else parts[0]
+                url = parts[1]
+                clickable_sources.append(f"{len(clickable_sources)+1}. [{title}]({url})")
+            else:
+                clickable_sources.append(source)
+        
+        report_with_sources += f"\n\n## Sources\n\n" + "\n".join(clickable_sources)
+    
+    logger.info(f"Summarizer completed report generation ({len(report_with_sources)} characters)")
+    
+    return {
+        "report_markdown": report_with_sources,
+        "step_info": "Summarizer",
+    }
+
+def _summarizer_error(state: GraphState, e: Exception) -> GraphState:
+    logger.error(f"Summarizer error: {e}")
+    return {
+        "report_markdown": f"# Research Report\n\n**Query:** {state.get('user_input', '')}\n\n## Error\n\nFailed to generate report: {e}",
+        "errors": [f"Summarizer error: {e}"],
+        "step_info": "Summarizer (error)"
+    }
+
+def create_summarizer_agent(gemini: "ChatGoogleGenerativeAI", budget: Optional[ContextBudget] = None):
+    budget = budget or ContextBudget.for_llm(gemini)
+    
+    def summarizer_agent(state: GraphState) -> GraphState:
+        try:
+            valid_articles, sources, early_state = _select_articles(state)
+            if early_state is not None:
+                return early_state
             
-            response = gemini.invoke(messages)
+            # passages: only the parts of each article that answer the questions
+            if SUMMARIZER_CONTEXT == "passages":
+                valid_articles = _retrieve_passages(state, valid_articles, sources, budget)
+            # notes (map): condense every article in parallel instead of dropping the ones that don't fit
+            elif _needs_map_reduce(state, valid_articles, sources, budget):
+                valid_articles = _condense_articles(gemini, state.get("user_input", ""), valid_articles)
             
-            # Append sources section to the report with clickable links
-            report_with_sources = response.content.strip()
+            # reduce: one report from all of it
+            response = gemini.invoke(_build_messages(state, valid_articles, sources, budget))
+            return _finalize_report(state, response, sources)
             
-            if not report_with_sources.endswith("## Sources"):
-                # Create clickable sources list
-                clickable_sources = []
-                for source in sources:
-                    # Extract URL from source line (format: "1. Title - URL")
-                    parts = source.split(" - ", 1)
-                    if len(parts) == 2 and parts[1].startswith(('http://', 'https://')):
-                        title = parts[0].split(". ", 1)[1] if ". " in parts[0] else parts[0]
-                        url = parts[1]
-                        clickable_sources.append(f"{len(clickable_sources)+1}. [{title}]({url})")
-                    else:
-                        clickable_sources.append(source)
-                
-                report_with_sources += f"\n\n## Sources\n\n" + "\n".join(clickable_sources)
+        except Exception as e:
+            return _summarizer_error(state, e)
+    
+    return summarizer_agent
+
+def create_async_summarizer_agent(gemini: "ChatGoogleGenerativeAI", budget: Optional[ContextBudget] = None):
+    budget = budget or ContextBudget.for_llm(gemini)
+    
+    async def summarizer_agent(state: GraphState) -> GraphState:
+        try:
+            valid_articles, sources, early_state = _select_articles(state)
+            if early_state is not None:
+                return early_state
             
-            logger.info(f"Summarizer completed report generation ({len(report_with_sources)} characters)")
+            if SUMMARIZER_CONTEXT == "passages":
+                valid_articles = _retrieve_passages(state, valid_articles, sources, budget)
+            elif _needs_map_reduce(state, valid_articles, sources, budget):
+                valid_articles = await _acondense_articles(gemini, state.get("user_input", ""), valid_articles)
             
-            return {
-                **state,
-                "report_markdown": report_with_sources,
-                "step_info": "Summarizer",
-            }
+            response = await gemini.ainvoke(_build_messages(state, valid_articles, sources, budget))
+            return _finalize_report(state, response, sources)
             
         except Exception as e:
-            logger.error(f"Summarizer error: {e}")
-            return {
-                **state, 
-                "report_markdown": f"# Research Report\n\n**Query:** {state.get('user_input', '')}\n\n## Error\n\nFailed to generate report: {e}",
-                "errors": state.get("errors", []) + [f"Summarizer error: {e}"],
-                "step_info": "Summarizer (error)"
-            }
+            return _summarizer_error(state, e)
     
     return summarizer_agent
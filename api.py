@@ -1,10 +1,21 @@
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import PlainTextResponse
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+import asyncio
+import json
 import os
 from datetime import datetime
 import logging
 
-from main import graph_builder
+from agents import SEARCH_BRANCH_NODE
+from batch import BATCH_MAX_QUERIES, run_batch
+from jobs import JobManager
+from singleflight import Flight, SingleFlight
+from utils.checkpoints import afinish_run, get_checkpointer, new_run_id, run_config, resume_config
+from utils.report_cache import get_report_cache
+from utils.metrics import COALESCED, CONTENT_TYPE_LATEST, METRICS_ENABLED, metrics_callback, render
+from utils.text import strict_key
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -16,65 +27,102 @@ app = FastAPI(
 )
 
 research_agent = None
+checkpointer = None
+job_manager = None
+report_cache = None
+_agent_lock = asyncio.Lock()
+# identical queries in flight share one run, whichever endpoint they came in through
+flights = SingleFlight()
+
+# compile the graph in the background right after startup (0 = on the first request instead)
+WARM_START = os.getenv("WARM_START", "1") != "0"
+
+def _build_agent():
+    # main pulls in langgraph, the agents and the llm sdks - most of the import time - so the
+    # server starts answering before any of it is loaded
+    from main import check_env, get_graph
+    check_env()
+    return get_graph()
+
+async def _get_agent():
+    """The compiled graph, built once on first use (concurrent callers wait for the same build)."""
+    global research_agent
+    if research_agent is None:
+        async with _agent_lock:
+            if research_agent is None:
+                try:
+                    research_agent = await asyncio.to_thread(_build_agent)
+                    logger.info("research agent ready")
+                except Exception as e:
+                    logger.error(f"failed to init agent: {e}")
+                    raise HTTPException(status_code=503, detail=f"agent not ready: {e}")
+    return research_agent
+
+async def _warm_start():
+    try:
+        await _get_agent()
+    except HTTPException:
+        pass  # logged; the next request tries again
 
 @app.on_event("startup")
 async def startup_event():
-    global research_agent
+    global checkpointer, job_manager, report_cache
     try:
         logger.info("initializing research agent...")
-        research_agent = graph_builder()
-        logger.info("research agent ready")
+        # every run is checkpointed under its run id so a failed one can be resumed
+        checkpointer = get_checkpointer()
+        report_cache = get_report_cache()
+        job_manager = JobManager(_run_job)
+        await job_manager.start()
+        if WARM_START:
+            app.state.warm_start = asyncio.create_task(_warm_start())
     except Exception as e:
         logger.error(f"failed to init agent: {e}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if job_manager:
+        await job_manager.stop()
+    await flights.cancel_all()
+
 @app.get("/")
 async def root():
     return {
         "message": "research agent api running",
         "status": "healthy",
+        "agent_ready": research_agent is not None,  # false until the graph is compiled
         "timestamp": datetime.now().isoformat()
     }
 
-@app.get("/research", response_class=PlainTextResponse)
-async def research_endpoint(q: str = Query(..., description="research query")):
-    if not research_agent:
-        raise HTTPException(status_code=503, detail="agent not ready")
-    
-    if not q.strip():
-        raise HTTPException(status_code=400, detail="query cannot be empty")
-    
-    try:
-        logger.info(f"processing: {q}")
-        
-        # Initialize state with defaults
-        initial_state = {
-            "user_input": q,
-            "enhanced_query": "",
-            "followup_questions": [],
-            "selected_urls": [],
-            "articles": [],
-            "reddit_posts": [],
-            "youtube_urls": [],
-            "platform_questions": [],
-            "platform_content": "",
-            "platform_summary": "",
-            "platform_urls": {},
-            "report_markdown": "",
-            "errors": [],
-            "messages": [],
-            "step_info": "",
-        }
-        
-        result = research_agent.invoke(initial_state)
-        final_response = result.get("report_markdown", "<no report generated>")
-        
-        # If the report already has a header, use it as-is; otherwise add header
-        if final_response.startswith("# "):
-            markdown_report = final_response
-        else:
-            timestamp_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            markdown_report = f"""# Research Report
+def _initial_state(q: str) -> dict:
+    # Initialize state with defaults
+    return {
+        "user_input": q,
+        "enhanced_query": "",
+        "followup_questions": [],
+        "selected_urls": [],
+        "articles": [],
+        "reddit_posts": [],
+        "youtube_urls": [],
+        "extractor_urls": {},
+        "url_scores": {},
+        "platform_questions": [],
+        "platform_content": "",
+        "platform_summary": "",
+        "platform_urls": {},
+        "report_markdown": "",
+        "errors": [],
+        "messages": [],
+        "step_info": "",
+    }
+
+def _format_report(final_response: str, q: str) -> str:
+    # If the report already has a header, use it as-is; otherwise add header
+    if final_response.startswith("# "):
+        return final_response
+    timestamp_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return f"""# Research Report
 
 **Generated:** {timestamp_str}  
 **Query:** {q}
@@ -87,17 +135,337 @@ async def research_endpoint(q: str = Query(..., description="research query")):
 
 *Generated by Research Agent*
 """
+
+def _with_metrics(config: dict) -> dict:
+    # every api run reports node, tool and llm timings to /metrics
+    return {**config, "callbacks": [metrics_callback()]}
+
+def _check_request(q: str):
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="query cannot be empty")
+
+def _cached_report(q: str, fresh: bool):
+    # same or nearly the same query answered recently: serve that report instead of a new run
+    if fresh or report_cache is None:
+        return None
+    return report_cache.get(q)
+
+def _cache_headers(response: Response, cached: dict) -> None:
+    response.headers["X-Cache"] = "hit"
+    response.headers["X-Cache-Match"] = cached["match"]
+    response.headers["X-Cache-Age"] = str(int(datetime.now().timestamp() - cached["created_at"]))
+
+def _store_report(q: str, result: dict, markdown_report: str) -> None:
+    if report_cache is not None:
+        report_cache.store_result(q, result, markdown_report)
+
+def _join_flight(q: str, run_id: str, endpoint: str, resume: bool = False):
+    """(flight, started): the run already in flight for this query, or a new one under `run_id`."""
+    # only the same query typed again shares a run: case, punctuation and spacing don't matter, but unlike
+    # the report cache's keys every word does ("how does X work" and "why does X work" are two runs)
+    key = strict_key(q) or q.strip()
+    flight, started = flights.join(key, run_id, q, lambda f: _run_flight(f, resume))
+    if not started:
+        COALESCED.labels(endpoint).inc()
+    return flight, started
+
+@app.get("/research", response_class=PlainTextResponse)
+async def research_endpoint(
+    response: Response,
+    q: str = Query(..., description="research query"),
+    fresh: bool = Query(False, description="skip the report cache and run the full pipeline"),
+):
+    _check_request(q)
+    cached = _cached_report(q, fresh)
+    if cached:
+        logger.info(f"cache hit ({cached['match']}): {q}")
+        _cache_headers(response, cached)
+        return cached["report"]
+
+    await _get_agent()
+    flight, started = _join_flight(q, new_run_id(), "research")
+    response.headers["X-Run-Id"] = flight.run_id
+    response.headers["X-Cache"] = "bypass" if fresh else "miss"
+    response.headers["X-Coalesced"] = "false" if started else "true"
+    
+    try:
+        logger.info(f"processing: {q} (run {flight.run_id})")
+        
+        async with flight.attached():
+            markdown_report = await flight.wait()
         
         logger.info(f"completed: {q}")
         return markdown_report
         
+    except Exception as e:
+        logger.error(f"error: {e}")
+        raise HTTPException(status_code=500, detail=f"server error: {str(e)}", headers={"X-Run-Id": flight.run_id})
+
+@app.post("/research/{run_id}/resume", response_class=PlainTextResponse)
+async def resume_endpoint(run_id: str, response: Response):
+    """Re-run a checkpointed run from the node that failed, reusing the state saved before it."""
+    if checkpointer is None:
+        raise HTTPException(status_code=503, detail="checkpointing is disabled")
+    agent = await _get_agent()
+    try:
+        config = await asyncio.to_thread(resume_config, agent, run_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="run not found")
+    if config is None:
+        raise HTTPException(status_code=409, detail="run already completed without errors")
+    response.headers["X-Run-Id"] = run_id
+
+    try:
+        snapshot = await agent.aget_state(config)
+        q = snapshot.values.get("user_input", "")
+        logger.info(f"resuming run {run_id} at {', '.join(snapshot.next)}: {q}")
+        result = await agent.ainvoke(None, _with_metrics(config))
+        markdown_report = _format_report(result.get("report_markdown", "<no report generated>"), q)
+        _store_report(q, result, markdown_report)
+        await afinish_run(checkpointer, run_id, result)
+        return markdown_report
     except Exception as e:
         logger.error(f"error: {e}")
         raise HTTPException(status_code=500, detail=f"server error: {str(e)}")
 
+# seconds between keep-alive comments while no event is ready
+SSE_HEARTBEAT = 15
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _node_event(node: str, update: dict) -> dict:
+    """Progress payload for a finished graph node: its step label plus the counts that node produced."""
+    update = update or {}
+    # nodes running in parallel branches (search question, crawler) don't set step_info
+    event = {"node": node, "step": update.get("step_info") or node.title()}
+    if node == "query enhancer":
+        event["followup_questions"] = len(update.get("followup_questions") or [])
+    if node == SEARCH_BRANCH_NODE:
+        event["search_hits"] = len(update.get("search_candidates") or [])
+    if node == "planner":
+        event["urls_selected"] = len(update.get("selected_urls") or [])
+        event["reddit_urls"] = len(update.get("reddit_posts") or [])
+        event["youtube_urls"] = len(update.get("youtube_urls") or [])
+        event.update({f"{name}_urls": len(urls) for name, urls in (update.get("extractor_urls") or {}).items()})
+    if node == "crawler":
+        event["articles_crawled"] = len([a for a in update.get("articles") or [] if not a.get("error")])
+        event["duplicates_merged"] = sum(len(a.get("mirrors", [])) for a in update.get("articles") or [])
+    if node == "scraper agent":
+        platform_urls = update.get("platform_urls") or {}
+        event["reddit_posts"] = len(platform_urls.get("reddit_urls", []))
+        event["youtube_videos"] = len(platform_urls.get("youtube_urls", []))
+        # every extractor's url count, keyed by extractor name
+        event["platform_items"] = {key[:-len("_urls")]: len(urls) for key, urls in platform_urls.items()}
+        event["platform_chars"] = len(update.get("platform_content") or "")
+    if node in ("crawler", "scraper agent"):
+        event["dedup_tokens_saved"] = update.get("dedup_tokens_saved", 0)
+    if node == "summarizer":
+        event["report_chars"] = len(update.get("report_markdown") or "")
+    return event
+
+async def _run_flight(flight: Flight, resume: bool = False) -> str:
+    """
+    Run the graph for a flight and return the formatted report. Publishes a "node"
+    event per finished node and the summarizer's "token" events, which every
+    caller attached to the flight (sync, stream or job) gets.
+    """
+    agent = await _get_agent()
+    q = flight.query
+    config = run_config(flight.run_id)
+    run_input = _initial_state(q)
+    if resume and checkpointer is not None:
+        # a job cut off by a restart continues from its last checkpoint
+        snapshot = await agent.aget_state(config)
+        if snapshot.next:
+            logger.info(f"run {flight.run_id} continues from {', '.join(snapshot.next)}")
+            run_input = None
+
+    report = ""
+    # enough of the final state to tell whether the report is worth caching
+    outcome = {"step_info": "", "errors": []}
+    async for mode, payload in agent.astream(run_input, _with_metrics(config), stream_mode=["updates", "messages"]):
+        if mode == "updates":
+            for node, update in payload.items():
+                if node == "summarizer" and update:
+                    report = update.get("report_markdown", "")
+                    outcome["step_info"] = update.get("step_info", "")
+                if update and update.get("errors"):
+                    outcome["errors"] = update["errors"]
+                flight.publish("node", _node_event(node, update))
+        elif mode == "messages":
+            chunk, metadata = payload
+            # only the final report is worth streaming token by token
+            if metadata.get("langgraph_node") == "summarizer" and isinstance(chunk.content, str) and chunk.content:
+                flight.publish("token", {"text": chunk.content})
+    markdown_report = _format_report(report or "<no report generated>", q)
+    _store_report(q, outcome, markdown_report)
+    await afinish_run(checkpointer, flight.run_id, outcome)
+    return markdown_report
+
+async def _research_events(q: str, fresh: bool = False):
+    """Yield SSE frames for a run (ours, or the identical one already in flight): start, node events, summarizer tokens, done."""
+    cached = _cached_report(q, fresh)
+    if cached:
+        logger.info(f"cache hit ({cached['match']}): {q}")
+        yield _sse("start", {"query": q, "run_id": None, "cached": True, "timestamp": datetime.now().isoformat()})
+        yield _sse("done", {"report_markdown": cached["report"], "cached": True, "match": cached["match"]})
+        return
+
+    flight, started = _join_flight(q, new_run_id(), "stream")
+    # a client that disconnects detaches; the run is cancelled once nobody is left on it
+    async with flight.attached():
+        yield _sse("start", {"query": q, "run_id": flight.run_id, "coalesced": not started,
+                             "timestamp": datetime.now().isoformat()})
+        # a late joiner gets the events published so far first, then the live ones
+        async for event in flight.stream(heartbeat=SSE_HEARTBEAT):
+            if event is None:
+                # comment line, ignored by clients but keeps proxies from timing out
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse(*event)
+        error = flight.result.exception()
+        if error is not None:
+            logger.error(f"stream error: {error}")
+            yield _sse("error", {"detail": f"server error: {error}"})
+            return
+        yield _sse("done", {"report_markdown": flight.result.result(), "cached": False})
+        logger.info(f"completed stream: {q}")
+
+@app.get("/research/stream")
+async def research_stream_endpoint(
+    q: str = Query(..., description="research query"),
+    fresh: bool = Query(False, description="skip the report cache and run the full pipeline"),
+):
+    _check_request(q)
+    logger.info(f"streaming: {q}")
+    return StreamingResponse(
+        _research_events(q, fresh),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class BatchRequest(BaseModel):
+    queries: List[str]
+    fresh: bool = False
+    concurrency: Optional[int] = None  # runs in flight at once, BATCH_CONCURRENCY by default
+
+async def _batch_query(q: str, fresh: bool) -> dict:
+    """One line of a batch: the cached report, or the run for q (joining one already in flight)."""
+    cached = _cached_report(q, fresh)
+    if cached:
+        return {"status": "done", "cached": True, "match": cached["match"], "run_id": None,
+                "report_markdown": cached["report"]}
+    flight, started = _join_flight(q, new_run_id(), "batch")
+    async with flight.attached():
+        report = await flight.wait()
+    return {"status": "done", "cached": False, "coalesced": not started, "run_id": flight.run_id,
+            "report_markdown": report}
+
+async def _batch_lines(request: BatchRequest):
+    async for item in run_batch(request.queries, lambda q: _batch_query(q, request.fresh), request.concurrency):
+        yield json.dumps(item) + "\n"
+
+@app.post("/research/batch")
+async def research_batch_endpoint(request: BatchRequest):
+    """
+    Research many queries in one request. Streams JSONL: a line per query as it
+    finishes (with its "index" in the request), then a "summary" line.
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="queries cannot be empty")
+    if len(request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"at most {BATCH_MAX_QUERIES} queries per batch")
+    await _get_agent()
+    logger.info(f"batch: {len(request.queries)} queries")
+    return StreamingResponse(
+        _batch_lines(request),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _run_job(job_id: str, q: str, on_progress) -> str:
+    """Job runner for the worker pool: records a progress event per node, returns the formatted report."""
+    # a job that starts the run uses its id as the run id, so one cut off by a restart continues
+    # from its last checkpoint, and one that failed can be retried through /research/{job_id}/resume.
+    # one that finds the same query in flight follows that run instead
+    flight, started = _join_flight(q, job_id, "job", resume=True)
+    if not started:
+        logger.info(f"job {job_id} follows run {flight.run_id}")
+    async with flight.attached():
+        async for name, data in flight.stream():
+            if name == "node":
+                await on_progress(data)
+        return await flight.wait()
+
+class JobRequest(BaseModel):
+    q: str
+    priority: Literal["interactive", "batch"] = "interactive"
+    fresh: bool = False
+
+async def _get_job(job_id: str) -> dict:
+    job = await job_manager.store.aget(job_id) if job_manager else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    _check_request(request.q)
+    if not job_manager:
+        raise HTTPException(status_code=503, detail="agent not ready")
+    cached = _cached_report(request.q, request.fresh)
+    if cached:
+        # answered from the cache: the job is born finished, no worker needed
+        job_id = await job_manager.store.aadd(request.q, request.priority)
+        await job_manager.store.afinish(job_id, report=cached["report"])
+        return {"job_id": job_id, "status": "done", "priority": request.priority, "cached": True}
+    job_id = await job_manager.submit(request.q, request.priority)
+    return {"job_id": job_id, "status": "queued", "priority": request.priority, "cached": False}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-node, per-tool and per-llm latency histograms, errors, runs in flight."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=503, detail="metrics need prometheus-client (pip install prometheus-client)")
+    return Response(content=render(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/jobs/metrics")
+async def job_metrics():
+    if not job_manager:
+        raise HTTPException(status_code=503, detail="agent not ready")
+    return await job_manager.metrics()
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await _get_job(job_id)
+    return {
+        "job_id": job["id"],
+        "query": job["query"],
+        "priority": job["priority"],
+        "status": job["status"],
+        "step_info": job["step_info"],
+        "progress": job["progress"],  # one event per finished node, same shape as /research/stream
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+    }
+
+@app.get("/jobs/{job_id}/report", response_class=PlainTextResponse)
+async def job_report(job_id: str):
+    job = await _get_job(job_id)
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"job failed: {job['error']}")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"job is {job['status']}")
+    return job["report"]
+
 if __name__ == "__main__":
     import uvicorn
     print(" starting api...")
     print(" docs: http://localhost:8000/docs")
     print(" test: http://localhost:8000/research?q=your-query")
+    print(" stream: http://localhost:8000/research/stream?q=your-query")
+    print(" batch: POST http://localhost:8000/research/batch {\"queries\": [...]}")
     uvicorn.run(app, host="0.0.0.0", port=8000)
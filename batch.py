@@ -0,0 +1,88 @@
+import asyncio
+import os
+import time
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from utils.text import strict_key
+
+logger = logging.getLogger(__name__)
+
+# research runs in flight per batch; llm calls are further paced by the shared llm limiter
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+BATCH_MAX_CONCURRENCY = 32
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", 1000))
+
+# run_query(query) -> {"status", "cached", "run_id", "report_markdown", ...} for one query
+RunQuery = Callable[[str], Awaitable[dict]]
+
+
+def _shared_fetches() -> Dict[str, int]:
+    # searches, page crawls and transcripts answered by a fetch another query already had in flight
+    from tools.exa_search import CRAWLS
+    from tools.serper_search import SEARCHES
+    from tools.youtube_transcript import TRANSCRIPTS
+
+    return {"searches_shared": SEARCHES.shared, "crawls_shared": CRAWLS.shared,
+            "transcripts_shared": TRANSCRIPTS.shared}
+
+
+async def run_batch(queries: List[str], run_query: RunQuery, concurrency: Optional[int] = None) -> AsyncIterator[dict]:
+    """
+    Run many research queries side by side and yield one result per query as
+    it finishes ({"index", "query", "status", ...}), then a {"summary": ...}.
+
+    At most `concurrency` runs are in flight. Queries that differ only in case,
+    punctuation or spacing run once and every copy gets that result. Identical searches, crawls
+    of the same canonical url and transcripts of the same video go out once
+    across the batch: the tool caches answer repeats, and fetches still in
+    flight are shared (tools' SEARCHES / CRAWLS / TRANSCRIPTS).
+    """
+    concurrency = max(1, min(concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    start = time.perf_counter()
+    before = _shared_fetches()
+
+    # index positions per query (by strict_key, like the api's in-flight runs), in first-seen order
+    groups: Dict[str, List[int]] = {}
+    results: asyncio.Queue = asyncio.Queue()
+    for i, query in enumerate(queries):
+        if not query.strip():
+            results.put_nowait({"index": i, "query": query, "status": "failed", "error": "query cannot be empty"})
+            continue
+        groups.setdefault(strict_key(query) or query.strip(), []).append(i)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_group(indexes: List[int]) -> None:
+        query = queries[indexes[0]]
+        async with semaphore:
+            try:
+                outcome = await run_query(query)
+            except Exception as e:
+                logger.error(f"batch query failed: {query}: {e}")
+                outcome = {"status": "failed", "error": str(e)}
+        for i in indexes:
+            await results.put({"index": i, "query": queries[i], **outcome})
+
+    logger.info(f"batch of {len(queries)} queries ({len(groups)} distinct), {concurrency} at a time")
+    tasks = [asyncio.create_task(run_group(indexes)) for indexes in groups.values()]
+    failed = 0
+    try:
+        for _ in range(len(queries)):
+            item = await results.get()
+            failed += item["status"] == "failed"
+            yield item
+    finally:
+        # the caller stopped reading (client disconnected): don't finish the batch for nobody
+        for task in tasks:
+            task.cancel()
+
+    after = _shared_fetches()
+    yield {"summary": {
+        "queries": len(queries),
+        "distinct": len(groups),
+        "done": len(queries) - failed,
+        "failed": failed,
+        **{name: after[name] - before[name] for name in after},
+        "seconds": round(time.perf_counter() - start, 2),
+    }}
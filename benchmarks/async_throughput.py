@@ -0,0 +1,74 @@
+"""
+Throughput of the research graph under concurrent clients, with stubbed
+llm/tool latencies.
+
+Compares the old blocking path (graph.invoke called from the event loop, as
+api.research_endpoint used to do) with graph.ainvoke. Blocking throughput
+stays flat no matter how many clients are waiting; async throughput scales
+with the number of concurrent runs.
+
+    python -m benchmarks.async_throughput --llm-latency 0.2 --tool-latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# main reads these at import time; the fakes never use them
+for key in ("GROQ_API_KEY", "GOOGLE_API_KEY", "SERPER_API_KEY", "EXA_API_KEY", "LANGSMITH_API_KEY"):
+    os.environ.setdefault(key, "benchmark")
+
+import main  # noqa: E402
+from benchmarks.fakes import FakeChatModel, make_platform_tools, make_search_tools  # noqa: E402
+
+os.environ["LANGSMITH_TRACING"] = "false"
+
+
+def build_graph(llm_latency: float, tool_latency: float, planner_mode: str = "react"):
+    return main.graph_builder(
+        llm=FakeChatModel(latency=llm_latency),
+        gemini=FakeChatModel(latency=llm_latency),
+        search_tools=make_search_tools(tool_latency),
+        platform_tools=make_platform_tools(tool_latency),
+        planner_mode=planner_mode,
+    )
+
+
+def initial_state(i: int) -> dict:
+    return {"user_input": f"benchmark query {i}", "messages": [], "errors": []}
+
+
+async def run_clients(graph, clients: int, blocking: bool) -> float:
+    async def one(i: int):
+        if blocking:
+            # what the endpoint used to do: a sync call inside async def
+            return graph.invoke(initial_state(i))
+        return await graph.ainvoke(initial_state(i))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    assert all(r.get("report_markdown", "").startswith("# Research Report") for r in results)
+    return elapsed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per llm call")
+    parser.add_argument("--tool-latency", type=float, default=0.1, help="seconds per tool call")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--planner-mode", choices=["react", "parallel"], default="react")
+    args = parser.parse_args()
+
+    graph = build_graph(args.llm_latency, args.tool_latency, args.planner_mode)
+
+    print(f"llm latency {args.llm_latency}s, tool latency {args.tool_latency}s, planner mode {args.planner_mode}")
+    print(f"{'clients':>8} {'blocking runs/s':>16} {'async runs/s':>14} {'speedup':>8}")
+    for clients in args.clients:
+        blocking = asyncio.run(run_clients(graph, clients, blocking=True))
+        concurrent = asyncio.run(run_clients(graph, clients, blocking=False))
+        print(f"{clients:>8} {clients / blocking:>16.2f} {clients / concurrent:>14.2f} {blocking / concurrent:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
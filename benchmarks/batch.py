@@ -0,0 +1,94 @@
+"""
+Batch research against the stub providers: --queries related queries run one
+after another, then through batch.run_batch at each --concurrency.
+
+The stand-in query enhancer gives every query the same follow-up questions,
+so like a real batch on one topic the runs overlap in what they search and
+crawl. Both setups start with cold caches; sequential runs still get cache
+hits from earlier queries, the batch additionally shares searches, crawls and
+transcripts that are still in flight. Reports wall time, stub requests per
+provider and how many fetches were shared. Reddit's per-host rate limit
+(REDDIT_RATE_LIMIT) ends up setting the batch's pace.
+
+    python -m benchmarks.batch --queries 8 --concurrency 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.stubs import DEFAULT_LATENCY, PROVIDERS, StubProviders
+
+
+async def run_sequential(graph, queries) -> int:
+    failed = 0
+    for query in queries:
+        result = await graph.ainvoke({"user_input": query, "messages": [], "errors": []})
+        failed += not result.get("report_markdown")
+    return failed
+
+
+async def run_batched(graph, queries, concurrency: int) -> dict:
+    from batch import run_batch
+
+    async def run_query(query: str) -> dict:
+        result = await graph.ainvoke({"user_input": query, "messages": [], "errors": []})
+        return {"status": "done" if result.get("report_markdown") else "failed"}
+
+    summary = {}
+    async for item in run_batch(queries, run_query, concurrency):
+        summary = item.get("summary", summary)
+    return summary
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--planner-mode", choices=["react", "parallel"], default="parallel")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per llm call")
+    for provider in PROVIDERS:
+        parser.add_argument(f"--{provider}-latency", type=float, default=DEFAULT_LATENCY[provider])
+    args = parser.parse_args()
+
+    stubs = StubProviders(latency={p: getattr(args, f"{p}_latency") for p in PROVIDERS}).start()
+    for key in ("GROQ_API_KEY", "GOOGLE_API_KEY", "LANGSMITH_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="batch-bench-")
+    stubs.route()
+
+    import main
+    from benchmarks.fakes import FakeChatModel
+    from utils.cache import clear_caches
+
+    os.environ["LANGSMITH_TRACING"] = "false"
+    graph = main.graph_builder(llm=FakeChatModel(latency=args.llm_latency),
+                               gemini=FakeChatModel(latency=args.llm_latency), planner_mode=args.planner_mode)
+    queries = [f"MCP servers in ai agents, angle {i}" for i in range(args.queries)]
+    # untimed: pays the lazy imports
+    asyncio.run(run_sequential(graph, ["warm up"]))
+
+    print(f"{args.queries} queries, {args.planner_mode} planner, llm {args.llm_latency}s, stub latency {stubs.latency}")
+    print(f"{'setup':<12} {'wall s':>7} {'failed':>6} {'shared searches':>15} {'shared crawls':>13} "
+          f"{'shared videos':>13}  stub requests")
+    setups = [("sequential", None)] + [(f"batch x{c}", c) for c in args.concurrency]
+    for name, concurrency in setups:
+        clear_caches()
+        before = stubs.stats()["requests"]
+        start = time.perf_counter()
+        if concurrency is None:
+            failed, shared = asyncio.run(run_sequential(graph, queries)), {}
+        else:
+            shared = asyncio.run(run_batched(graph, queries, concurrency))
+            failed = shared["failed"]
+        wall = time.perf_counter() - start
+        after = stubs.stats()["requests"]
+        requests = {p: after[p] - before[p] for p in PROVIDERS if after[p] - before[p]}
+        print(f"{name:<12} {wall:>7.2f} {failed:>6} {shared.get('searches_shared', 0):>15} "
+              f"{shared.get('crawls_shared', 0):>13} {shared.get('transcripts_shared', 0):>13}  {requests}")
+    stubs.stop()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,65 @@
+"""
+Near-duplicate article elimination on synthetic crawls.
+
+Builds N distinct pages of ~`--words` words plus mirrored copies of some of
+them (same text with a different header/footer and a few edited sentences,
+like syndicated news or docs mirrors), then times utils.dedup.dedupe_articles
+and reports how many copies were merged and how many tokens that saved.
+
+    python -m benchmarks.dedup --articles 100 300 --mirrors 0.3
+"""
+import argparse
+import random
+import time
+
+from utils.dedup import dedupe_articles
+
+
+def _page(rng: random.Random, vocab, words: int) -> str:
+    sentences = []
+    while sum(len(s.split()) for s in sentences) < words:
+        sentences.append(" ".join(rng.choices(vocab, k=rng.randint(8, 20))) + ".")
+    return " ".join(sentences)
+
+
+def _mirror(rng: random.Random, text: str) -> str:
+    # new boilerplate around the same body, plus a couple of edited sentences
+    sentences = text.split(". ")
+    for _ in range(2):
+        i = rng.randrange(len(sentences))
+        sentences[i] = sentences[i] + " (updated)"
+    return "Originally published elsewhere. Subscribe for more. " + ". ".join(sentences) + " Share this article."
+
+
+def make_articles(n: int, mirror_share: float, words: int, seed: int = 0):
+    rng = random.Random(seed)
+    vocab = [f"term{i}" for i in range(5000)]
+    originals = [{"title": f"page {i}", "url": f"https://site{i}.example/post", "text": _page(rng, vocab, words)}
+                 for i in range(int(n * (1 - mirror_share)))]
+    articles = list(originals)
+    while len(articles) < n:
+        source = rng.choice(originals)
+        articles.append({"title": source["title"], "url": f"https://mirror{len(articles)}.example/copy", "text": _mirror(rng, source["text"])})
+    rng.shuffle(articles)
+    return articles, len(originals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, nargs="+", default=[50, 100, 300])
+    parser.add_argument("--mirrors", type=float, default=0.3, help="share of articles that are copies")
+    parser.add_argument("--words", type=int, default=3000)
+    args = parser.parse_args()
+
+    print(f"{'articles':>8} {'distinct':>8} {'kept':>6} {'mirrors':>8} {'tokens saved':>13} {'seconds':>8}")
+    for n in args.articles:
+        articles, distinct = make_articles(n, args.mirrors, args.words)
+        start = time.perf_counter()
+        deduped, saved = dedupe_articles(articles)
+        elapsed = time.perf_counter() - start
+        mirrors = sum(len(a.get("mirrors", [])) for a in deduped)
+        print(f"{n:>8} {distinct:>8} {len(deduped):>6} {mirrors:>8} {saved:>13} {elapsed:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
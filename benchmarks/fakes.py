@@ -0,0 +1,167 @@
+"""
+Stand-in llms and tools for benchmarking the pipeline offline.
+
+Each fake sleeps for a configurable latency (time.sleep on the sync path,
+asyncio.sleep on the async path) and returns payloads shaped like the real
+providers, so the agents in agents/ run unchanged.
+"""
+import asyncio
+import json
+import random
+import time
+import zlib
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import StructuredTool
+
+
+def _respond(messages: List[BaseMessage]) -> AIMessage:
+    # pick a canned answer based on which agent is asking
+    last = messages[-1]
+    text = last.content if isinstance(last.content, str) else str(last.content)
+
+    if "ARTICLE TO CONDENSE" in text:
+        return AIMessage(content="- stand-in evidence note\n- another stand-in note with a figure: 42%")
+
+    if "RESEARCH ARTICLES" in text:
+        return AIMessage(content="# Research Report\n\n## Overview\n\nStand-in report body [1](https://example.com/a).")
+
+    if "Original user query" in text:
+        return AIMessage(content=json.dumps({
+            "enhanced_query": "stand-in enhanced query",
+            "followup_questions": [f"stand-in question {i}" for i in range(1, 5)],
+        }))
+
+    # planner react loop: search every question once (the first two on reddit and youtube too),
+    # then say it's done; the planner ranks the results itself
+    tool_results = [m for m in messages if isinstance(m, ToolMessage)]
+    if not tool_results:
+        questions = [line.split(". ", 1)[1] for line in text.splitlines() if line[:2].rstrip(".").isdigit() and ". " in line]
+        questions = questions[:6] or ["stand-in"]
+        queries = questions + [f"{q} site:{site}" for q in questions[:2] for site in ("reddit.com", "youtube.com")]
+        return AIMessage(content="", tool_calls=[
+            {"name": "serper_search_tool", "args": {"query": q}, "id": f"call_{i}"}
+            for i, q in enumerate(queries)
+        ])
+
+    return AIMessage(content="DONE")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers every agent in the graph after `latency` seconds.
+    A `failure_rate` share of calls raise instead, like a provider outage.
+    """
+
+    latency: float = 0.0
+    failure_rate: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        return self
+
+    def _maybe_fail(self) -> None:
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError("stand-in llm failure")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        self._maybe_fail()
+        return ChatResult(generations=[ChatGeneration(message=_respond(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        return ChatResult(generations=[ChatGeneration(message=_respond(messages))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        # first token after `latency`, the rest word by word; tool calls come in one chunk
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        message = _respond(messages)
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ]))
+            return
+        for word in message.content.split(" "):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def _fake_tool(name: str, latency: float, build):
+    def func(**kwargs):
+        time.sleep(latency)
+        return build(**kwargs)
+
+    async def coroutine(**kwargs):
+        await asyncio.sleep(latency)
+        return build(**kwargs)
+
+    func.__name__ = name
+    func.__doc__ = f"Stand-in for {name}."
+    return StructuredTool.from_function(func=func, coroutine=coroutine, name=name,
+                                        description=func.__doc__, infer_schema=False,
+                                        args_schema={"type": "object", "properties": {}})
+
+
+def _search_payload(query: str = "", **_):
+    slug = zlib.crc32(query.encode()) % 10_000
+    if "site:reddit.com" in query:
+        urls = [f"https://www.reddit.com/r/stand_in/comments/{slug}{i}/post/" for i in range(3)]
+    elif "site:youtube.com" in query:
+        urls = [f"https://www.youtube.com/watch?v=standin{slug}{i}" for i in range(3)]
+    else:
+        urls = [f"https://site{(slug + i) % 7}.example.com/{slug}/{i}" for i in range(5)]
+        urls.append(f"https://news.ycombinator.com/item?id={slug}")
+    return json.dumps({
+        "query": query,
+        "knowledge_graph": None,
+        "results": [{"title": f"Result {i}", "url": url, "snippet": f"About {query}"} for i, url in enumerate(urls)],
+    })
+
+
+def _article_text(url: str, chars: int) -> str:
+    # different words per url, so near-duplicate detection doesn't merge every stand-in page
+    rng = random.Random(zlib.crc32(url.encode()))
+    return " ".join(f"word{rng.randrange(5000)}" for _ in range(chars // 8))[:chars]
+
+
+def _crawl_payload(urls: List[str] = (), max_chars_per_article: int = 6000, **_):
+    return json.dumps({"articles": [
+        {"title": f"Article {i}", "url": url, "text": _article_text(url, max_chars_per_article)}
+        for i, url in enumerate(urls)
+    ]})
+
+
+def _platform_payload(urls: List[str] = (), **_):
+    return "\n\n".join(f"POST {i}: {url}\nstand-in platform content" for i, url in enumerate(urls, 1))
+
+
+def make_search_tools(latency: float = 0.0):
+    """Stand-ins for [serper_search_tool, exa_crawl_urls]."""
+    return [
+        _fake_tool("serper_search_tool", latency, _search_payload),
+        _fake_tool("exa_crawl_urls", latency, _crawl_payload),
+    ]
+
+
+def make_platform_tools(latency: float = 0.0):
+    """Stand-ins for the scraper agent's extractor tools (keyword overrides, see tools/extractors.py)."""
+    return {
+        "reddit_tool": _fake_tool("get_multiple_reddit_posts", latency, _platform_payload),
+        "youtube_tool": _fake_tool("get_multiple_youtube_transcripts", latency, _platform_payload),
+        "hackernews_tool": _fake_tool("get_multiple_hackernews_threads", latency, _platform_payload),
+    }
@@ -0,0 +1,145 @@
+"""
+LLM throughput under load against a stand-in provider with a hard rate limit.
+
+The provider serves --provider-rps calls per second (sliding one-second
+window) and at most --provider-concurrency at once; anything beyond that gets
+a 429 with a retry-after, like groq. Each simulated research run makes
+--calls llm calls back to back, and --runs of them overlap. Two setups:
+
+- direct   the old clients: the sdk retries a 429 twice, honouring retry-after,
+           then the call (and with it the run) fails
+- limited  the same provider through utils.llm.rate_limited: one process-wide
+           limiter per model, a fair queue, AIMD on the concurrency window
+
+The limiter isn't told the provider's limits here (the default: static caps
+are opt-in), so what it shows is the adaptive part; with LLM_RATE_LIMITS set
+right it doesn't see 429s at all.
+
+    python -m benchmarks.llm_limits --runs 1 4 16 64
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import deque
+from typing import Any, List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.outputs import ChatResult
+
+from benchmarks.fakes import FakeChatModel
+from utils.llm import rate_limited
+
+PROMPT = [HumanMessage(content="Original user query: benchmark")]
+
+
+class ProviderRateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"429 rate limited, retry after {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class Provider:
+    # the provider side: a one-second sliding window and a concurrency cap
+    def __init__(self, rps: int, concurrency: int):
+        self.rps = rps
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.recent: deque = deque()
+        self.rejected = 0
+
+    def admit(self) -> None:
+        now = time.monotonic()
+        while self.recent and self.recent[0] <= now - 1:
+            self.recent.popleft()
+        if len(self.recent) >= self.rps or self.in_flight >= self.concurrency:
+            self.rejected += 1
+            raise ProviderRateLimitError(max(0.05, (self.recent[0] + 1 - now) if self.recent else 0.1))
+        self.recent.append(now)
+        self.in_flight += 1
+
+
+class ProviderModel(FakeChatModel):
+    """FakeChatModel behind a Provider; sdk_retries emulates the sdk's own 429 retries."""
+
+    model_name: str = "benchmark-provider"
+    provider: Any = None
+    sdk_retries: int = 0
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        for attempt in range(self.sdk_retries + 1):
+            try:
+                self.provider.admit()
+                break
+            except ProviderRateLimitError as e:
+                if attempt == self.sdk_retries:
+                    raise
+                await asyncio.sleep(e.retry_after + random.uniform(0, 0.25))
+        try:
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+        finally:
+            self.provider.in_flight -= 1
+
+
+async def run_load(llm, runs: int, calls: int) -> dict:
+    latencies: List[float] = []
+    failed_calls = 0
+    failed_runs = 0
+
+    async def research_run() -> None:
+        nonlocal failed_calls, failed_runs
+        for _ in range(calls):
+            start = time.perf_counter()
+            try:
+                await llm.ainvoke(PROMPT)
+            except Exception:
+                failed_calls += 1
+                failed_runs += 1
+                return  # a failed planner/summarizer call ends the run
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(research_run() for _ in range(runs)))
+    wall = time.perf_counter() - start
+    return {
+        "ok": len(latencies),
+        "failed_runs": failed_runs,
+        "goodput": len(latencies) / wall,
+        "p95": statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else (latencies or [0])[0],
+        "wall": wall,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--calls", type=int, default=5, help="llm calls per run")
+    parser.add_argument("--latency", type=float, default=0.2, help="provider seconds per call")
+    parser.add_argument("--provider-rps", type=int, default=20)
+    parser.add_argument("--provider-concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"provider {args.provider_rps} calls/s, {args.provider_concurrency} concurrent, "
+          f"{args.latency}s per call, {args.calls} calls per run")
+    print(f"{'runs':>5} {'setup':<8} {'ok calls':>8} {'failed runs':>11} {'429s':>6} "
+          f"{'goodput/s':>9} {'p95 s':>6} {'wall s':>7}")
+    limited_cls = rate_limited(ProviderModel)
+    for runs in args.runs:
+        for setup in ("direct", "limited"):
+            provider = Provider(args.provider_rps, args.provider_concurrency)
+            if setup == "direct":
+                llm = ProviderModel(latency=args.latency, provider=provider, sdk_retries=2)
+            else:
+                # a fresh model name per trial, so every trial starts with a fresh limiter
+                llm = limited_cls(latency=args.latency, provider=provider, model_name=f"benchmark-provider-{runs}")
+            result = asyncio.run(run_load(llm, runs, args.calls))
+            print(f"{runs:>5} {setup:<8} {result['ok']:>8} {result['failed_runs']:>11} {provider.rejected:>6} "
+                  f"{result['goodput']:>9.1f} {result['p95']:>6.2f} {result['wall']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main_cli()
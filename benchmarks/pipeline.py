@@ -0,0 +1,322 @@
+"""
+Offline end-to-end benchmark of the whole research pipeline.
+
+main.graph_builder runs with stand-in llms (benchmarks/fakes.py) and the real
+tools pointed at local stub providers (benchmarks/stubs.py), so search,
+crawling, reddit and youtube go through the same http, caching and parsing
+code as production - just without the network. Latencies, failure rates and
+payload sizes are flags.
+
+Reports wall time per node, total latency (median / p95 over --runs), prompt
+tokens per node and peak memory, and saves a json baseline that a later run
+can be compared against:
+
+    python -m benchmarks.pipeline --runs 5 --save before.json
+    # ... change something ...
+    python -m benchmarks.pipeline --runs 5 --compare before.json --tolerance 0.1
+
+Every mode starts with one untimed run. --cache cold then empties the tool
+caches before every timed run; warm measures repeat runs of the same query.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from benchmarks.stubs import DEFAULT_LATENCY, PROVIDERS, StubProviders
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+class NodeTimer(BaseCallbackHandler):
+    """
+    Wall time and prompt tokens per top-level graph node.
+
+    Nodes that run more than once in a run (parallel search branches) report
+    their call count, summed time and span (first start to last end), which is
+    what they actually add to the run's latency.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._starts: Dict[str, tuple] = {}
+        self.nodes: Dict[str, dict] = {}
+        self.prompt_tokens: Dict[str, int] = {}
+        self.llm_calls: Dict[str, int] = {}
+
+    @staticmethod
+    def _top_level(metadata: Optional[dict]) -> Optional[str]:
+        ns = (metadata or {}).get("langgraph_checkpoint_ns", "")
+        return ns.split("|")[0].split(":")[0] or None
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        # the node's own run, not the runnables inside it or a subgraph's nodes
+        if node and kwargs.get("name") == node and "|" not in metadata.get("langgraph_checkpoint_ns", ""):
+            with self._lock:
+                self._starts[str(run_id)] = (node, time.perf_counter())
+
+    def _finish(self, run_id, failed: bool = False):
+        with self._lock:
+            started = self._starts.pop(str(run_id), None)
+            if started is None:
+                return
+            node, start = started
+            end = time.perf_counter()
+            stats = self.nodes.setdefault(node, {"calls": 0, "total_s": 0.0, "first": start, "last": end, "failed": 0})
+            stats["calls"] += 1
+            stats["total_s"] += end - start
+            stats["first"] = min(stats["first"], start)
+            stats["last"] = max(stats["last"], end)
+            stats["failed"] += int(failed)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, failed=True)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        from utils.budget import count_tokens
+
+        node = self._top_level(metadata) or "unknown"
+        tokens = sum(count_tokens(m.content if isinstance(m.content, str) else str(m.content))
+                     for batch in messages for m in batch)
+        with self._lock:
+            self.prompt_tokens[node] = self.prompt_tokens.get(node, 0) + tokens
+            self.llm_calls[node] = self.llm_calls.get(node, 0) + 1
+
+    def report(self) -> Dict[str, dict]:
+        nodes = {}
+        for node, stats in self.nodes.items():
+            nodes[node] = {
+                "calls": stats["calls"],
+                "failed": stats["failed"],
+                "wall_s": round(stats["last"] - stats["first"], 4),
+                "total_s": round(stats["total_s"], 4),
+                "llm_calls": self.llm_calls.get(node, 0),
+                "prompt_tokens": self.prompt_tokens.get(node, 0),
+            }
+        return nodes
+
+
+def build_graph(args):
+    import main
+    from benchmarks.fakes import FakeChatModel
+
+    os.environ["LANGSMITH_TRACING"] = "false"
+    return main.graph_builder(
+        llm=FakeChatModel(latency=args.llm_latency, failure_rate=args.llm_failure_rate),
+        gemini=FakeChatModel(latency=args.llm_latency, failure_rate=args.llm_failure_rate),
+        planner_mode=args.planner_mode,
+    )
+
+
+def run_once(graph, query: str, use_async: bool) -> dict:
+    timer = NodeTimer()
+    config = {"callbacks": [timer]}
+    state = {"user_input": query, "messages": [], "errors": []}
+    start = time.perf_counter()
+    try:
+        if use_async:
+            result = asyncio.run(graph.ainvoke(state, config))
+        else:
+            result = graph.invoke(state, config)
+        errors = list(result.get("errors", []))
+        report = result.get("report_markdown", "")
+    except Exception as e:
+        # a failure the graph doesn't catch itself still counts as a (failed) run
+        errors, report = [f"{type(e).__name__}: {e}"], ""
+    return {
+        "latency_s": round(time.perf_counter() - start, 4),
+        "success": bool(report) and not errors,
+        "errors": errors,
+        "report_tokens": len(report.split()),
+        "nodes": timer.report(),
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(runs: List[dict], peak_traced_mb: float) -> dict:
+    latencies = [r["latency_s"] for r in runs]
+    nodes: Dict[str, dict] = {}
+    for run in runs:
+        for node, stats in run["nodes"].items():
+            entry = nodes.setdefault(node, {"wall_s": [], "prompt_tokens": [], "llm_calls": [], "calls": []})
+            for key in entry:
+                entry[key].append(stats[key])
+    return {
+        "latency_median_s": round(statistics.median(latencies), 4),
+        "latency_p95_s": round(percentile(latencies, 0.95), 4),
+        "latency_max_s": round(max(latencies), 4),
+        "success_rate": round(sum(r["success"] for r in runs) / len(runs), 3),
+        "prompt_tokens": round(statistics.median(sum(s["prompt_tokens"] for s in r["nodes"].values()) for r in runs)),
+        "peak_traced_mb": round(peak_traced_mb, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != "darwin" else 1024 ** 2), 2),
+        "nodes": {
+            node: {key: round(statistics.median(values), 4) for key, values in entry.items()}
+            for node, entry in nodes.items()
+        },
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+# (metric, lower is better) pairs checked by --compare
+COMPARED = [
+    ("latency_median_s", True),
+    ("latency_p95_s", True),
+    ("prompt_tokens", True),
+    ("peak_traced_mb", True),
+    ("success_rate", False),
+]
+
+
+def compare(baseline: dict, current: dict, tolerance: Optional[float]) -> bool:
+    """Print metric deltas against a saved baseline; False if any regressed past tolerance."""
+    old, new = baseline["summary"], current["summary"]
+    print(f"\ncompared with {baseline.get('commit', '?')} ({baseline.get('timestamp', '?')})")
+    print(f"{'metric':<24} {'baseline':>12} {'current':>12} {'change':>9}")
+    ok = True
+    for metric, lower_is_better in COMPARED:
+        a, b = old.get(metric), new.get(metric)
+        if a is None or b is None:
+            continue
+        change = (b - a) / a if a else 0.0
+        worse = change > 0 if lower_is_better else change < 0
+        flag = ""
+        if tolerance is not None and worse and abs(change) > tolerance:
+            flag, ok = " REGRESSED", False
+        print(f"{metric:<24} {a:>12} {b:>12} {change:>+8.1%}{flag}")
+    for node in sorted(set(old["nodes"]) | set(new["nodes"])):
+        a = old["nodes"].get(node, {}).get("wall_s")
+        b = new["nodes"].get(node, {}).get("wall_s")
+        if a is None or b is None:
+            print(f"{node + ' wall_s':<24} {str(a):>12} {str(b):>12}")
+            continue
+        change = (b - a) / a if a else 0.0
+        print(f"{node + ' wall_s':<24} {a:>12} {b:>12} {change:>+8.1%}")
+    return ok
+
+
+def print_summary(summary: dict) -> None:
+    print(f"\n{'node':<18} {'wall s':>8} {'calls':>6} {'llm calls':>10} {'prompt tokens':>14}")
+    for node, stats in sorted(summary["nodes"].items(), key=lambda item: -item[1]["wall_s"]):
+        print(f"{node:<18} {stats['wall_s']:>8.3f} {stats['calls']:>6.0f} {stats['llm_calls']:>10.0f} {stats['prompt_tokens']:>14.0f}")
+    print(f"\nlatency median {summary['latency_median_s']:.3f}s, p95 {summary['latency_p95_s']:.3f}s, "
+          f"success {summary['success_rate']:.0%}, prompt tokens {summary['prompt_tokens']}")
+    print(f"peak traced memory {summary['peak_traced_mb']} MB, max rss {summary['max_rss_mb']} MB")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--query", default="MCP servers in ai agents")
+    parser.add_argument("--planner-mode", choices=["react", "parallel"], default="react")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="run graph.ainvoke instead of invoke")
+    parser.add_argument("--cache", choices=["cold", "warm"], default="cold")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per llm call")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    for provider in PROVIDERS:
+        parser.add_argument(f"--{provider}-latency", type=float, default=DEFAULT_LATENCY[provider])
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of stub http requests that get a 500")
+    parser.add_argument("--results", type=int, default=8, help="search results per query")
+    parser.add_argument("--page-words", type=int, default=2000, help="words per crawled page")
+    parser.add_argument("--comments", type=int, default=8, help="comments per reddit thread")
+    parser.add_argument("--transcript-lines", type=int, default=400, help="caption lines per video")
+    parser.add_argument("--no-memory", action="store_true", help="skip the extra tracemalloc run")
+    parser.add_argument("--save", metavar="FILE", help=f"baseline json to write (default: {os.path.relpath(BASELINE_DIR)}/<commit>-<mode>.json)")
+    parser.add_argument("--compare", metavar="FILE", help="baseline json to compare against")
+    parser.add_argument("--tolerance", type=float, help="exit 1 if a compared metric is this much worse (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    stubs = StubProviders(
+        latency={p: getattr(args, f"{p}_latency") for p in PROVIDERS},
+        failure_rate=args.failure_rate, results=args.results, page_words=args.page_words,
+        comments=args.comments, transcript_lines=args.transcript_lines,
+    ).start()
+    # keys main checks at import time, and a throwaway cache dir so real caches are untouched
+    for key in ("GROQ_API_KEY", "GOOGLE_API_KEY", "LANGSMITH_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="pipeline-bench-")
+    stubs.route()
+
+    from utils.cache import clear_caches
+
+    graph = build_graph(args)
+    mode = f"{args.planner_mode}-{'async' if args.use_async else 'sync'}-{args.cache}"
+    print(f"pipeline benchmark: {mode}, {args.runs} runs, llm {args.llm_latency}s, "
+          f"stub latency {stubs.latency}, failure rate {args.failure_rate}")
+
+    # untimed first run: it pays the lazy sdk imports (exa, transcripts) and, for --cache warm,
+    # fills the caches
+    run_once(graph, args.query, args.use_async)
+    runs = []
+    for i in range(args.runs):
+        if args.cache == "cold":
+            clear_caches()
+        runs.append(run_once(graph, args.query, args.use_async))
+        print(f"run {i + 1}: {runs[-1]['latency_s']:.3f}s{'' if runs[-1]['success'] else ' (failed)'}")
+
+    peak = 0.0
+    if not args.no_memory:
+        # separate run: tracemalloc slows everything down, so it stays out of the timings
+        if args.cache == "cold":
+            clear_caches()
+        tracemalloc.start()
+        run_once(graph, args.query, args.use_async)
+        peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+
+    summary = summarize(runs, peak)
+    print_summary(summary)
+    print(f"stub requests {stubs.stats()}")
+    stubs.stop()
+
+    baseline = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {**vars(args), "stub_latency": stubs.latency},
+        "summary": summary,
+        "runs": runs,
+    }
+    path = args.save or os.path.join(BASELINE_DIR, f"{baseline['commit']}-{mode}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+    print(f"saved {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            if not compare(json.load(f), baseline, args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,104 @@
+"""
+URL selection over synthetic serper candidates.
+
+Each trial searches --queries questions, --results hits each. Every question
+has a few on-topic pages that most searches return (on a handful of domains,
+some of them reputable), and the rest is a long tail of one-off pages, with
+one content farm showing up near the top of every search. Two selectors pick
+--max-urls urls, at most two per domain:
+
+- first-come  the old deduplicate_and_diversify_urls: domains in the order
+              their first url appeared, two urls each until the slots are full
+- ranked      utils.ranking.rank_candidates + diversify
+
+Reports how many of the on-topic pages were selected, how many distinct
+domains, how often a shuffled candidate order changed the selection, and the
+time per selection.
+
+    python -m benchmarks.ranking --candidates 100 1000 10000
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import List
+
+from utils.ranking import diversify, rank_candidates
+from utils.urls import domain_of, normalize_url
+
+
+def first_come(urls: List[str], max_urls: int = 8, max_per_domain: int = 2) -> List[str]:
+    # the selection before utils.ranking, kept here as the baseline
+    normalized = {}
+    for url in urls:
+        normalized.setdefault(normalize_url(url), url)
+    domain_groups = defaultdict(list)
+    for norm_url, url in normalized.items():
+        domain_groups[domain_of(norm_url)].append(url)
+    selected = []
+    for domain_urls in domain_groups.values():
+        selected.extend(domain_urls[:max_per_domain])
+        if len(selected) >= max_urls:
+            break
+    return selected[:max_urls]
+
+
+def make_hits(rng: random.Random, queries: int, results: int):
+    topic = "vector database indexing"
+    relevant = [f"https://{d}/vector-index-{i}" for i, d in
+                enumerate(["en.wikipedia.org", "github.com", "arxiv.org", "docs.example.org", "blog.example.net",
+                           "arxiv.org", "research.example.edu", "github.com"])]
+    hits = []
+    for q in range(queries):
+        query = f"{topic} question {q}"
+        page = [f"https://contentfarm.example.com/{topic.replace(' ', '-')}-{q}"]
+        page += rng.sample(relevant, k=min(len(relevant), max(2, results // 3)))
+        while len(page) < results:
+            page.append(f"https://tail{rng.randrange(10 * queries * results)}.example.com/p{rng.randrange(10 ** 6)}")
+        for rank, url in enumerate(page):
+            on_topic = url in relevant
+            hits.append({
+                "url": url, "query": query, "rank": rank,
+                "title": f"{topic} explained" if on_topic else f"page {rank}",
+                "snippet": f"how {topic} works" if on_topic else "unrelated text",
+            })
+    return hits, set(relevant)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[100, 1000, 10000], help="hits per trial")
+    parser.add_argument("--results", type=int, default=10, help="hits per search")
+    parser.add_argument("--max-urls", type=int, default=8)
+    parser.add_argument("--trials", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'hits':>6} {'selector':<11} {'on-topic':>8} {'domains':>7} {'order-dependent':>15} {'ms':>8}")
+    for n in args.candidates:
+        rng = random.Random(n)
+        queries = max(1, n // args.results)
+        stats = {name: {"relevant": [], "domains": [], "unstable": 0, "ms": []} for name in ("first-come", "ranked")}
+        for _ in range(args.trials):
+            hits, relevant = make_hits(rng, queries, args.results)
+            shuffled = rng.sample(hits, len(hits))
+            for name in stats:
+                picks = []
+                for trial_hits in (hits, shuffled):
+                    start = time.perf_counter()
+                    if name == "first-come":
+                        picked = first_come([h["url"] for h in trial_hits], args.max_urls)
+                    else:
+                        picked = diversify(rank_candidates(trial_hits), args.max_urls)
+                    stats[name]["ms"].append((time.perf_counter() - start) * 1000)
+                    picks.append(picked)
+                stats[name]["relevant"].append(len(set(picks[0]) & relevant))
+                stats[name]["domains"].append(len({domain_of(u) for u in picks[0]}))
+                stats[name]["unstable"] += picks[0] != picks[1]
+        for name, s in stats.items():
+            print(f"{n:>6} {name:<11} {statistics.mean(s['relevant']):>8.1f} {statistics.mean(s['domains']):>7.1f} "
+                  f"{s['unstable']:>8}/{args.trials:<6} {statistics.median(s['ms']):>8.2f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,104 @@
+"""
+Reddit thread fetching against a local stub server.
+
+The stub answers /r/<sub>/comments/<id>/<slug>/.json with a reddit-shaped
+payload after a fixed latency. We time the old behaviour (one requests.get
+per post, one after the other, fresh connection each time) against
+get_multiple_reddit_posts (pooled session, bounded concurrency, per-host
+rate limit) on both its sync and async paths.
+
+    python -m benchmarks.reddit_fetch --latency 0.5 --urls 1 5 10 20
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from tools import reddit_scraper
+from tools.reddit_scraper import HEADERS, _format_reddit_post, get_multiple_reddit_posts
+from utils.rate_limit import HostRateLimiter
+
+
+def _payload(path: str) -> bytes:
+    post = {"title": f"stub thread {path}", "selftext": "stub body " * 50, "author": "stub",
+            "score": 42, "subreddit": "stub", "num_comments": 8}
+    comments = [{"data": {"author": f"user{i}", "score": 10 - i, "body": "stub comment " * 20}} for i in range(8)]
+    return json.dumps([
+        {"data": {"children": [{"data": post}]}},
+        {"data": {"children": comments}},
+    ]).encode()
+
+
+def start_stub_server(latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like reddit
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = _payload(self.path)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def old_serial_fetch(urls):
+    # the pre-pooling implementation: sequential, new connection per request
+    posts = []
+    for url in urls:
+        json_url = url + ".json"
+        response = requests.get(json_url, headers=HEADERS, timeout=10)
+        response.raise_for_status()
+        posts.append(_format_reddit_post(response.json(), json_url))
+    return posts
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub server response time in seconds")
+    parser.add_argument("--urls", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--rate", type=float, default=10.0, help="per-host requests/sec for the new path")
+    args = parser.parse_args()
+
+    reddit_scraper.RATE_LIMITER = HostRateLimiter(args.rate)
+    server = start_stub_server(args.latency)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"stub latency {args.latency}s, concurrency {reddit_scraper.MAX_CONCURRENCY}, rate limit {args.rate}/s")
+    print(f"{'urls':>6} {'serial s':>10} {'pooled sync s':>14} {'pooled async s':>15} {'speedup':>8}")
+    for n in args.urls:
+        urls = [f"{base}/r/stub/comments/{i:05d}/thread_{i}/" for i in range(n)]
+
+        start = time.perf_counter()
+        old_serial_fetch(urls)
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        out = get_multiple_reddit_posts.invoke({"urls": urls})
+        pooled = time.perf_counter() - start
+        assert out.count("REDDIT POST:") == n and "Error" not in out
+
+        start = time.perf_counter()
+        out = asyncio.run(get_multiple_reddit_posts.ainvoke({"urls": urls}))
+        pooled_async = time.perf_counter() - start
+        assert out.count("REDDIT POST:") == n and "Error" not in out
+
+        print(f"{n:>6} {serial:>10.2f} {pooled:>14.2f} {pooled_async:>15.2f} {serial / min(pooled, pooled_async):>7.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main_cli()
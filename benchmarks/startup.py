@@ -0,0 +1,111 @@
+"""
+Cold-start time: what a fresh worker pays before it can serve.
+
+Every measurement runs in a new python process (nothing cached in
+sys.modules), median over --runs:
+
+- import api          module import only
+- api first response  import + app startup + GET / (what a readiness probe waits for)
+- import main         module import only
+- graph ready         import main + main.get_graph() (llm clients built, graph compiled)
+- first transcript    youtube-transcript-api, loaded on the first transcript fetch
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --importtime api   # slowest imports under `import api`
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# each snippet prints the seconds it measured
+SNIPPETS = {
+    "import api": "import api",
+    "api first response": (
+        "import api\n"
+        "from fastapi.testclient import TestClient\n"
+        "with TestClient(api.app) as client:\n"
+        "    assert client.get('/').status_code == 200\n"
+    ),
+    "import main": "import main",
+    "graph ready": "import main\nmain.get_graph()",
+    "first transcript": "from youtube_transcript_api._transcripts import TranscriptListFetcher",
+}
+
+TEMPLATE = """
+import time
+start = time.perf_counter()
+{body}
+print(time.perf_counter() - start)
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    # placeholder keys so nothing prompts (older trees also need the langsmith one); no network is used
+    for key in ("GROQ_API_KEY", "GOOGLE_API_KEY", "SERPER_API_KEY", "EXA_API_KEY", "LANGSMITH_API_KEY"):
+        env.setdefault(key, "benchmark")
+    env["LANGSMITH_TRACING"] = "false"
+    env["WARM_START"] = "0"  # measure readiness, not the background compile
+    env["CACHE_DIR"] = tempfile.mkdtemp(prefix="startup-bench-")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def measure(body: str, env: dict) -> float:
+    out = subprocess.run([sys.executable, "-c", TEMPLATE.format(body=body)], cwd=ROOT, env=env,
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed")
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def importtime(module: str, env: dict, top: int) -> None:
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, env=env,
+                         capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>8.0f} ms  {name}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", metavar="MODULE", help="print the slowest imports under MODULE and exit")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--json", metavar="FILE", help="also write the medians as json")
+    args = parser.parse_args()
+
+    env = _env()
+    if args.importtime:
+        importtime(args.importtime, env, args.top)
+        return
+
+    results = {}
+    print(f"{'measurement':<20} {'median s':>9} {'min s':>7} {'max s':>7}")
+    for name, body in SNIPPETS.items():
+        try:
+            times = [measure(body, env) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{name:<20} failed: {e}")
+            continue
+        results[name] = round(statistics.median(times), 4)
+        print(f"{name:<20} {results[name]:>9.3f} {min(times):>7.3f} {max(times):>7.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
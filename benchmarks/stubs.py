@@ -0,0 +1,216 @@
+"""
+Local stand-ins for the http apis behind the real tools: serper search, exa
+contents, reddit thread json, youtube watch pages + caption tracks and hacker
+news threads (algolia's items api).
+
+One threaded http server answers all of them with provider-shaped payloads,
+after a per-provider latency and with a configurable failure rate (http 500),
+so tools/ runs unchanged - caching, pooling, rate limiting and parsing
+included - with no network access. route() points the tools at it.
+
+    stubs = StubProviders(latency={"exa": 0.8}, failure_rate=0.05, page_words=3000)
+    stubs.start()
+    stubs.route()   # before importing tools / main
+"""
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+PROVIDERS = ("serper", "exa", "reddit", "youtube", "hackernews")
+
+# rough response times of the real apis, seconds
+DEFAULT_LATENCY = {"serper": 0.6, "exa": 1.5, "reddit": 0.5, "youtube": 0.8, "hackernews": 0.4}
+
+
+class StubProviders:
+    """
+    Stub server for every external api the pipeline calls.
+
+    latency: seconds per request, per provider (missing ones use DEFAULT_LATENCY)
+    failure_rate: share of requests answered with http 500, per provider or one for all
+    results / page_words / comments / transcript_lines: payload sizes
+    """
+
+    def __init__(self, latency: Optional[Dict[str, float]] = None, failure_rate=0.0, results: int = 8,
+                 page_words: int = 2000, comments: int = 8, transcript_lines: int = 400, seed: int = 0):
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        rates = failure_rate if isinstance(failure_rate, dict) else {p: failure_rate for p in PROVIDERS}
+        self.failure_rate = {p: float(rates.get(p, 0.0)) for p in PROVIDERS}
+        self.results = results
+        self.page_words = page_words
+        self.comments = comments
+        self.transcript_lines = transcript_lines
+        self.requests = {p: 0 for p in PROVIDERS}
+        self.failures = {p: 0 for p in PROVIDERS}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> "StubProviders":
+        stubs = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stubs._handle(self, None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                stubs._handle(self, json.loads(self.rfile.read(length) or b"{}"))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def route(self) -> None:
+        """Point the tools at this server. Call before tools/ (or main) is imported."""
+        for key in ("SERPER_API_KEY", "EXA_API_KEY"):
+            os.environ.setdefault(key, "benchmark")
+        os.environ["SERPER_BASE_URL"] = self.base_url
+        os.environ["EXA_BASE_URL"] = self.base_url
+        os.environ["REDDIT_BASE_URL"] = self.base_url
+        os.environ["HN_BASE_URL"] = self.base_url
+        # youtube-transcript-api has no base url setting; its watch url is a module constant
+        from youtube_transcript_api import _transcripts
+        _transcripts.WATCH_URL = self.base_url + "/watch?v={video_id}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": dict(self.requests), "failures": dict(self.failures)}
+
+    # --- request handling ---
+
+    def _provider(self, path: str) -> Optional[str]:
+        if path == "/search":
+            return "serper"
+        if path == "/contents":
+            return "exa"
+        if path.startswith("/r/"):
+            return "reddit"
+        if path in ("/watch", "/timedtext"):
+            return "youtube"
+        if path.startswith("/items/"):
+            return "hackernews"
+        return None
+
+    def _handle(self, handler: BaseHTTPRequestHandler, body: Optional[dict]) -> None:
+        url = urlparse(handler.path)
+        provider = self._provider(url.path)
+        if provider is None:
+            return self._send(handler, 404, "text/plain", b"not found")
+        with self._lock:
+            self.requests[provider] += 1
+            failed = self._rng.random() < self.failure_rate[provider]
+            if failed:
+                self.failures[provider] += 1
+        time.sleep(self.latency[provider])
+        if failed:
+            return self._send(handler, 500, "application/json", b'{"error": "stub failure"}')
+
+        query = parse_qs(url.query)
+        if provider == "serper":
+            payload, content_type = json.dumps(self._search(body.get("q", ""))), "application/json"
+        elif provider == "exa":
+            payload, content_type = json.dumps(self._contents(body.get("urls", []))), "application/json"
+        elif provider == "reddit":
+            payload, content_type = json.dumps(self._thread(url.path)), "application/json"
+        elif provider == "hackernews":
+            payload, content_type = json.dumps(self._hn_item(url.path.rsplit("/", 1)[-1])), "application/json"
+        elif url.path == "/watch":
+            payload, content_type = self._watch_page(query.get("v", [""])[0]), "text/html"
+        else:
+            payload, content_type = self._captions(query.get("v", [""])[0]), "text/xml"
+        self._send(handler, 200, content_type, payload.encode("utf-8"))
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, content_type: str, body: bytes) -> None:
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    # --- payloads (deterministic per query / url, so caches and dedup behave like the real thing) ---
+
+    @staticmethod
+    def _words(key: str, n: int) -> str:
+        rng = random.Random(zlib.crc32(key.encode()))
+        sentences = []
+        for _ in range(max(1, n // 12)):
+            sentences.append(" ".join(f"term{rng.randrange(4000)}" for _ in range(12)).capitalize() + ".")
+        # paragraphs of ~6 sentences, like a real article
+        return "\n\n".join(" ".join(sentences[i:i + 6]) for i in range(0, len(sentences), 6))
+
+    def _search(self, q: str) -> dict:
+        slug = zlib.crc32(q.encode()) % 100_000
+        if "site:reddit.com" in q:
+            links = [f"https://www.reddit.com/r/stub/comments/{slug}{i}/thread_{i}/" for i in range(self.results)]
+        elif "site:youtube.com" in q:
+            links = [f"https://www.youtube.com/watch?v=stub{slug}{i}" for i in range(self.results)]
+        else:
+            links = [f"https://site{(slug + i) % 23}.example.com/{slug}/{i}" for i in range(self.results)]
+            # one discussion thread among the pages, like real searches on tech topics turn up
+            links[min(2, len(links) - 1)] = f"https://news.ycombinator.com/item?id={slug}"
+        return {
+            "searchParameters": {"q": q},
+            "organic": [{"title": f"Result {i} for {q}", "link": link, "snippet": self._words(link, 30)[:200], "position": i + 1}
+                        for i, link in enumerate(links)],
+        }
+
+    def _contents(self, urls) -> dict:
+        return {"results": [
+            {"id": url, "url": url, "title": f"Stub page {url}", "text": self._words(url, self.page_words)}
+            for url in urls
+        ]}
+
+    def _thread(self, path: str) -> list:
+        post = {"title": f"stub thread {path}", "selftext": self._words(path, 150), "author": "stub",
+                "score": 42, "subreddit": "stub", "num_comments": self.comments}
+        comments = [{"kind": "t1", "data": {"author": f"user{i}", "score": 100 - i, "body": self._words(f"{path}#{i}", 60)}}
+                    for i in range(self.comments)]
+        return [{"data": {"children": [{"data": post}]}}, {"data": {"children": comments}}]
+
+    def _hn_item(self, item_id: str) -> dict:
+        comments = [{"id": i, "author": f"hn{i}", "text": f"<p>{self._words(f'hn{item_id}#{i}', 60)}</p>",
+                     "children": [{"id": 1000 + i, "author": f"hn{i}r", "text": self._words(f"hn{item_id}#{i}r", 30),
+                                   "children": []}]}
+                    for i in range(self.comments)]
+        return {"id": int(item_id or 0), "title": f"stub story {item_id}", "url": f"https://example.org/{item_id}",
+                "author": "stub", "points": 120, "text": None, "children": comments}
+
+    def _watch_page(self, video_id: str) -> str:
+        captions = {"playerCaptionsTracklistRenderer": {"captionTracks": [{
+            "baseUrl": f"{self.base_url}/timedtext?v={video_id}",
+            "name": {"simpleText": "English"},
+            "languageCode": "en",
+            "isTranslatable": False,
+        }]}}
+        return f'<html><script>var ytInitialPlayerResponse = {{"playabilityStatus": {{}}, "captions":{json.dumps(captions)},"videoDetails": {{}}}};</script></html>'
+
+    def _captions(self, video_id: str) -> str:
+        rng = random.Random(zlib.crc32(video_id.encode()))
+        lines = [
+            f'<text start="{i * 4.0:.1f}" dur="4.0">{escape(" ".join(f"spoken{rng.randrange(3000)}" for _ in range(10)))}</text>'
+            for i in range(self.transcript_lines)
+        ]
+        return '<?xml version="1.0" encoding="utf-8" ?><transcript>' + "".join(lines) + "</transcript>"
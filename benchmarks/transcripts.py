@@ -0,0 +1,98 @@
+"""
+Transcript excerpts for the report prompt, on synthetic long talks.
+
+Every talk has --minutes of 4-second caption segments: an intro and a sponsor
+read at the start, small talk throughout, and a few stretches (placed at
+random past the first minutes, --stretches x --stretch-minutes) that discuss
+the research question. Two ways
+of filling a --budget of tokens per video:
+
+- first-n    the old cut: segments from the start until the budget is full
+             (select_windows without questions)
+- windowed   tools.youtube_transcript.select_windows: ~1 minute windows
+             scored against the question, best ones kept, scoring stops once
+             no later window could change the selection
+
+Reports the share of kept caption lines that are on topic, how many of the
+talk's on-topic lines made it in, tokens sent, how much of the transcript was
+scored (all of it is still fetched), and the time per video. Fails if the
+windowed selection scores all of the longest talk: the question's terms stop
+appearing after the last on-topic stretch, so the rest of it can't change the
+result.
+
+    python -m benchmarks.transcripts --minutes 20 60 180
+    python -m benchmarks.transcripts --stretches 4 --stretch-minutes 3   # more on-topic talk than the budget holds
+"""
+import argparse
+import random
+import re
+import statistics
+import time
+
+from tools.youtube_transcript import WINDOW_SECONDS, select_windows
+
+QUESTION = "how does a vector database index trade recall for query latency"
+TOPIC = ["vector", "database", "index", "indexes", "hnsw", "recall", "latency", "queries", "graph", "quantization",
+         "embedding", "neighbors", "the", "and", "so", "this"]
+INTRO = "hey everyone welcome back to the channel before we start this video is sponsored by".split()
+FILLER = ["so", "yeah", "anyway", "the", "and", "you", "know", "like", "really", "cool", "thing", "today", "coffee",
+          "stream", "chat", "question", "people", "right", "okay", "subscribe"]
+SEGMENT_SECONDS = 4.0
+STAMP = re.compile(r"^\[(\d+):(\d\d)\]", re.MULTILINE)
+
+
+def make_talk(rng: random.Random, minutes: int, stretches: int = 2, stretch_minutes: float = 2.0):
+    n = int(minutes * 60 / SEGMENT_SECONDS)
+    per_stretch = int(stretch_minutes * 60 / SEGMENT_SECONDS)
+    on_topic = set()
+    for _ in range(stretches):
+        start = rng.randrange(min(n - 1, int(180 / SEGMENT_SECONDS)), max(n - per_stretch, int(180 / SEGMENT_SECONDS) + 1))
+        on_topic.update(range(start, min(n, start + per_stretch)))
+    segments = []
+    for i in range(n):
+        if i in on_topic:
+            words = [rng.choice(TOPIC) for _ in range(11)]
+        elif i < 20:
+            words = [rng.choice(INTRO) for _ in range(11)]
+        else:
+            words = [rng.choice(FILLER) for _ in range(11)]
+        segments.append({"start": i * SEGMENT_SECONDS, "duration": SEGMENT_SECONDS, "text": " ".join(words)})
+    return segments, on_topic
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, nargs="+", default=[20, 60, 180], help="talk lengths")
+    parser.add_argument("--budget", type=int, default=2700, help="tokens per video")
+    parser.add_argument("--stretches", type=int, default=2, help="on-topic stretches per talk")
+    parser.add_argument("--stretch-minutes", type=float, default=2.0)
+    parser.add_argument("--trials", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"window {WINDOW_SECONDS:.0f}s, budget {args.budget} tokens")
+    print(f"{'minutes':>7} {'method':<9} {'on-topic %':>10} {'recall %':>8} {'tokens':>7} {'scored %':>8} {'ms':>7}")
+    for minutes in args.minutes:
+        rng = random.Random(minutes)
+        stats = {name: {"precision": [], "recall": [], "tokens": [], "scored": [], "ms": []} for name in ("first-n", "windowed")}
+        for _ in range(args.trials):
+            segments, on_topic = make_talk(rng, minutes, args.stretches, args.stretch_minutes)
+            for name in stats:
+                start = time.perf_counter()
+                # without questions select_windows keeps the opening windows: the old cut
+                text, info = select_windows(segments, [QUESTION] if name == "windowed" else None, args.budget)
+                stats[name]["ms"].append((time.perf_counter() - start) * 1000)
+                kept = [int((int(m) * 60 + int(s)) // SEGMENT_SECONDS) for m, s in STAMP.findall(text)]
+                hits = sum(1 for i in kept if i in on_topic)
+                stats[name]["precision"].append(100 * hits / max(1, len(kept)))
+                stats[name]["recall"].append(100 * hits / max(1, len(on_topic)))
+                stats[name]["tokens"].append(info["tokens"])
+                stats[name]["scored"].append(100 * info["seconds_scored"] / (len(segments) * SEGMENT_SECONDS))
+        for name, s in stats.items():
+            print(f"{minutes:>7} {name:<9} {statistics.mean(s['precision']):>10.1f} {statistics.mean(s['recall']):>8.1f} "
+                  f"{statistics.mean(s['tokens']):>7.0f} {statistics.mean(s['scored']):>8.1f} {statistics.median(s['ms']):>7.2f}")
+        if minutes == max(args.minutes):
+            assert statistics.mean(stats["windowed"]["scored"]) < 100, f"windowed selection scored all of the {minutes} minute talks"
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from utils.cache import cache_dir
+
+logger = logging.getLogger(__name__)
+
+# lanes in the order workers serve them
+PRIORITIES = ("interactive", "batch")
+
+# after this many interactive jobs in a row, a waiting batch job gets the next worker
+BATCH_EVERY = 4
+
+# run_job(job_id, query, on_progress) -> final markdown report; on_progress is awaited
+RunJob = Callable[[str, str, Callable[[dict], Awaitable[None]]], Awaitable[str]]
+
+
+class JobStore:
+    """
+    Jobs table in sqlite, so queued and finished jobs survive restarts.
+
+    The methods are synchronous and serialized by a lock; the a-prefixed twins
+    run them in a thread, so async callers don't block the event loop (and
+    every stream on it) while the database is busy.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("JOBS_DB", os.path.join(cache_dir(), "jobs.sqlite"))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " query TEXT NOT NULL,"
+            " priority TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " step_info TEXT NOT NULL DEFAULT '',"
+            " progress TEXT NOT NULL DEFAULT '[]',"
+            " report TEXT,"
+            " error TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs(status, priority, created_at)")
+
+    def add(self, query: str, priority: str) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, query, priority, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, query, priority, time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["progress"] = json.loads(job["progress"])
+        return job
+
+    def claim(self, priority: str) -> Optional[dict]:
+        """Move the oldest queued job of a lane to running and return it."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, query, priority FROM jobs WHERE status = 'queued' AND priority = ? ORDER BY created_at LIMIT 1",
+                (priority,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), row["id"])
+            )
+        return dict(row)
+
+    def add_progress(self, job_id: str, event: dict) -> None:
+        with self._lock:
+            row = self._conn.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            progress = json.loads(row["progress"]) if row else []
+            progress.append(event)
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, step_info = ? WHERE id = ?",
+                (json.dumps(progress), event.get("step", ""), job_id),
+            )
+
+    def finish(self, job_id: str, report: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, report = ?, error = ? WHERE id = ?",
+                ("failed" if error else "done", time.time(), report, error, job_id),
+            )
+
+    def requeue_interrupted(self) -> int:
+        # jobs that were running when the process died go back in the queue
+        # (with checkpoints on, the runner picks them up from their last finished node)
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, progress = '[]', step_info = '' WHERE status = 'running'"
+            )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, priority, COUNT(*) FROM jobs GROUP BY status, priority").fetchall()
+        counts: Dict[str, Dict[str, int]] = {}
+        for status, priority, n in rows:
+            counts.setdefault(status, {})[priority] = n
+        return counts
+
+    def oldest_queued(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT priority, MIN(created_at) FROM jobs WHERE status = 'queued' GROUP BY priority"
+            ).fetchall()
+        return {priority: created for priority, created in rows}
+
+    async def aadd(self, query: str, priority: str) -> str:
+        return await asyncio.to_thread(self.add, query, priority)
+
+    async def aget(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.get, job_id)
+
+    async def aclaim(self, priority: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.claim, priority)
+
+    async def aadd_progress(self, job_id: str, event: dict) -> None:
+        await asyncio.to_thread(self.add_progress, job_id, event)
+
+    async def afinish(self, job_id: str, report: Optional[str] = None, error: Optional[str] = None) -> None:
+        await asyncio.to_thread(self.finish, job_id, report, error)
+
+    async def arequeue_interrupted(self) -> int:
+        return await asyncio.to_thread(self.requeue_interrupted)
+
+    async def acounts(self) -> Dict[str, Dict[str, int]]:
+        return await asyncio.to_thread(self.counts)
+
+    async def aoldest_queued(self) -> Dict[str, Optional[float]]:
+        return await asyncio.to_thread(self.oldest_queued)
+
+
+class JobManager:
+    """
+    Bounded pool of asyncio workers pulling research jobs from a JobStore.
+
+    Interactive jobs are served before batch ones, but a waiting batch job
+    gets a worker after every BATCH_EVERY interactive jobs so it can't starve.
+    """
+
+    def __init__(self, run_job: RunJob, workers: Optional[int] = None, store: Optional[JobStore] = None):
+        self.run_job = run_job
+        self.workers = workers or int(os.getenv("JOB_WORKERS", 2))
+        self.store = store or JobStore()
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, float] = {}
+        self._interactive_streak = 0
+
+    async def start(self) -> None:
+        requeued = await self.store.arequeue_interrupted()
+        if requeued:
+            logger.info(f"re-queued {requeued} jobs interrupted by the last shutdown")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._wakeup.set()
+        logger.info(f"job manager started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, query: str, priority: str = "interactive") -> str:
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {PRIORITIES}")
+        job_id = await self.store.aadd(query, priority)
+        self._wakeup.set()
+        logger.info(f"queued job {job_id} ({priority}): {query}")
+        return job_id
+
+    async def _next_job(self) -> Optional[dict]:
+        lanes = list(PRIORITIES)
+        if self._interactive_streak >= BATCH_EVERY:
+            lanes.reverse()
+        for lane in lanes:
+            job = await self.store.aclaim(lane)
+            if job is not None:
+                self._interactive_streak = self._interactive_streak + 1 if lane == "interactive" else 0
+                return job
+        return None
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            # clear before looking, not after: the claim runs in a thread, and a submit() landing
+            # meanwhile sets the event again, so the wait below returns instead of missing its job
+            self._wakeup.clear()
+            job = await self._next_job()
+            if job is None:
+                await self._wakeup.wait()
+                continue
+            # more may be waiting: let the other idle workers look too
+            self._wakeup.set()
+            await self._run(job)
+
+    async def _run(self, job: dict) -> None:
+        job_id = job["id"]
+        self._running[job_id] = time.time()
+        logger.info(f"running job {job_id}: {job['query']}")
+        try:
+            report = await self.run_job(job_id, job["query"], lambda event: self.store.aadd_progress(job_id, event))
+            await self.store.afinish(job_id, report=report)
+            logger.info(f"finished job {job_id}")
+        except asyncio.CancelledError:
+            # shutdown mid-run: leave it 'running' so the next start re-queues it
+            raise
+        except Exception as e:
+            logger.error(f"job {job_id} failed: {e}")
+            await self.store.afinish(job_id, error=str(e))
+        finally:
+            self._running.pop(job_id, None)
+
+    async def metrics(self) -> dict:
+        counts = await self.store.acounts()
+        oldest = await self.store.aoldest_queued()
+        now = time.time()
+        queued = counts.get("queued", {})
+        return {
+            "workers": self.workers,
+            "running": len(self._running),
+            "queue_depth": {lane: queued.get(lane, 0) for lane in PRIORITIES},
+            "oldest_queued_seconds": {
+                lane: round(now - oldest[lane], 1) if oldest.get(lane) else 0.0 for lane in PRIORITIES
+            },
+            "done": sum(counts.get("done", {}).values()),
+            "failed": sum(counts.get("failed", {}).values()),
+        }
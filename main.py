@@ -1,35 +1,41 @@
 import getpass
+import operator
 import os
-from typing import TypedDict, Annotated, List, Optional
+import threading
+from typing import TypedDict, Annotated, Dict, List, Optional
 from datetime import datetime
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
+from langchain_core.runnables import RunnableLambda
 import logging
 
-from agents import create_query_enhancer_agent, create_planner_agent, create_summarizer_agent, create_scraper_agent
+from agents import (
+    create_query_enhancer_agent, create_planner_agent, create_summarizer_agent, create_scraper_agent,
+    create_async_query_enhancer_agent, create_async_planner_agent, create_async_summarizer_agent, create_async_scraper_agent,
+    create_crawler_agent, create_async_crawler_agent,
+    create_search_branch, create_async_search_branch, fan_out_questions, select_urls, SEARCH_BRANCH_NODE,
+)
+from agents.planner import append_unique
 from tools import serper_search_tool, exa_crawl_urls
 from utils import init_groq, init_gemini
+from utils.budget import ContextBudget
+from utils.checkpoints import finish_run, afinish_run, get_checkpointer, new_run_id, run_config, resume_config
+from utils.report_cache import get_report_cache
 
 load_dotenv()
 
-if not os.getenv("GROQ_API_KEY"):
-    os.environ["GROQ_API_KEY"] = getpass.getpass("Enter your Groq API key: ")
-
-if not os.getenv("SERPER_API_KEY"):
-    print("Warning: SERPER_API_KEY not found in environment variables.")
-
-if not os.getenv("EXA_API_KEY"):
-    print("Warning: EXA_API_KEY not found in environment variables.")
-
-os.environ["LANGSMITH_API_KEY"] = os.getenv("LANGSMITH_API_KEY")
-os.environ["LANGSMITH_TRACING"] = "true"
+# trace to langsmith when there's a key for it (LANGSMITH_TRACING=false turns it off)
+if os.getenv("LANGSMITH_API_KEY"):
+    os.environ.setdefault("LANGSMITH_TRACING", "true")
 
 class Article(TypedDict, total=False):
     title: Optional[str]
     url: str
     text: str
     error: Optional[str]
+    mirrors: List[str]  # urls of near-identical copies merged into this one
+    relevance: float  # search ranking score relative to the other selected urls (1.0 = average)
 
 class GraphState(TypedDict):
     # LangGraph plumbing
@@ -47,8 +53,13 @@ class GraphState(TypedDict):
     articles: List[Article]
     reddit_posts: List[str]
     youtube_urls: List[str]
+    extractor_urls: Dict[str, List[str]]  # extractor name -> urls, see tools/extractors.py
+    url_scores: Dict[str, float]  # selected url -> utils.ranking score, the crawler turns it into relevance
     platform_questions: List[str]
     
+    # Parallel planner fan-in (one entry per search hit)
+    search_candidates: Annotated[List[dict], append_unique]
+    
     # Scraper agent outputs
     platform_content: str
     platform_summary: str
@@ -57,41 +68,104 @@ class GraphState(TypedDict):
     # Summarizer outputs
     report_markdown: str
     
-    # Meta
-    errors: List[str]
+    # Meta (crawler and scraper agent run side by side, so errors needs a reducer)
+    errors: Annotated[List[str], append_unique]
+    # tokens the crawler and scraper agent kept out of the report prompt by merging near-duplicates
+    dedup_tokens_saved: Annotated[int, operator.add]
     step_info: str
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# init llms - groq for research (lower temp for planner), gemini for final report
-llm = init_groq(model="llama-3.1-8b-instant", temperature=0.3)  # Lower temp for more consistent tool calls
-gemini = init_gemini(model="gemini-2.0-flash", temperature=0.7)
+def check_env(interactive: bool = False) -> None:
+    """Warn about missing api keys; the cli asks for the groq key instead of failing later."""
+    if not os.getenv("GROQ_API_KEY"):
+        if interactive:
+            os.environ["GROQ_API_KEY"] = getpass.getpass("Enter your Groq API key: ")
+        else:
+            logger.warning("GROQ_API_KEY not found in environment variables")
+
+    for key in ("SERPER_API_KEY", "EXA_API_KEY"):
+        if not os.getenv(key):
+            logger.warning(f"{key} not found in environment variables")
+
+def default_llms():
+    # groq for research (lower temp for more consistent tool calls), gemini for the final report
+    llm = init_groq(model="llama-3.1-8b-instant", temperature=0.3)
+    gemini = init_gemini(model="gemini-2.0-flash", temperature=0.7)
+    return llm, gemini
+
+def graph_builder(llm=None, gemini=None, search_tools=None, platform_tools=None, planner_mode="react",
+                  checkpointer=None):
+    """
+    Compile the research graph. Every node carries a sync and an async
+    implementation, so the result supports both .invoke() and .ainvoke().
+    The llm/tool arguments default to the real clients (built here, not at
+    import) and can be swapped for stand-ins (see benchmarks/).
+
+    planner_mode="react" runs the groq ReAct planner; planner_mode="parallel"
+    fans the follow-up questions out as search branches (no llm in the loop)
+    and joins them in a url selection step. Either way the selected urls are
+    then crawled by the crawler node while the scraper agent fetches reddit and
+    youtube, and the summarizer waits for both.
+
+    With a checkpointer (see utils.checkpoints.get_checkpointer) the state is
+    saved after every node under the run's thread_id, so a failed run can be
+    resumed with utils.checkpoints.resume_config instead of starting over.
+    """
+    if planner_mode not in ("react", "parallel"):
+        raise ValueError(f"unknown planner_mode: {planner_mode}")
+    if llm is None or gemini is None:
+        default_llm, default_gemini = default_llms()
+        llm = llm or default_llm
+        gemini = gemini or default_gemini
+    search_tools = search_tools or [serper_search_tool, exa_crawl_urls]
+    platform_tools = platform_tools or {}
+    # everything crawled or scraped ends up in gemini's report prompt, so size it by gemini's budget
+    report_budget = ContextBudget.for_llm(gemini)
 
-# create the agent instances
-query_enhancer_node = create_query_enhancer_agent(gemini)
-planner_agent = create_planner_agent([serper_search_tool, exa_crawl_urls], llm)
-scraper_agent = create_scraper_agent(llm)
-summarizer_agent = create_summarizer_agent(gemini)
+    # create the agent instances
+    query_enhancer_node = RunnableLambda(
+        create_query_enhancer_agent(gemini), afunc=create_async_query_enhancer_agent(gemini))
+    crawler_agent = RunnableLambda(
+        create_crawler_agent(search_tools[1], report_budget),
+        afunc=create_async_crawler_agent(search_tools[1], report_budget))
+    scraper_agent = RunnableLambda(
+        create_scraper_agent(llm, budget=report_budget, **platform_tools),
+        afunc=create_async_scraper_agent(llm, budget=report_budget, **platform_tools))
+    summarizer_agent = RunnableLambda(
+        create_summarizer_agent(gemini, report_budget), afunc=create_async_summarizer_agent(gemini, report_budget))
 
-def graph_builder():
     graph = StateGraph(GraphState)
     
-    # add nodes: query enhancer -> planner -> scraper agent -> summarizer
+    # add nodes: query enhancer -> planner -> (crawler | scraper agent) -> summarizer
     graph.add_node("query enhancer", query_enhancer_node)
-    graph.add_node("planner", planner_agent)
+    graph.add_node("crawler", crawler_agent)
     graph.add_node("scraper agent", scraper_agent)
     graph.add_node("summarizer", summarizer_agent)
 
     # connect the flow
     graph.add_edge(START, "query enhancer")
-    graph.add_edge("query enhancer", "planner")
+    if planner_mode == "parallel":
+        # query enhancer -> N x search question -> planner (join)
+        search_branch = RunnableLambda(
+            create_search_branch(search_tools), afunc=create_async_search_branch(search_tools))
+        graph.add_node(SEARCH_BRANCH_NODE, search_branch)
+        graph.add_node("planner", select_urls)
+        graph.add_conditional_edges("query enhancer", fan_out_questions, [SEARCH_BRANCH_NODE])
+        graph.add_edge(SEARCH_BRANCH_NODE, "planner")
+    else:
+        planner_agent = RunnableLambda(
+            create_planner_agent(search_tools, llm), afunc=create_async_planner_agent(search_tools, llm))
+        graph.add_node("planner", planner_agent)
+        graph.add_edge("query enhancer", "planner")
+    # article crawling and platform scraping only need the selected urls: run them
+    # as parallel branches and join before the summarizer
+    graph.add_edge("planner", "crawler")
     graph.add_edge("planner", "scraper agent")
-    graph.add_edge("scraper agent", "summarizer")
+    graph.add_edge(["crawler", "scraper agent"], "summarizer")
     graph.add_edge("summarizer", END)
 
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
 
 def save_output_to_markdown(content: str, query: str) -> str:
     # make output folder if it doesnt exist
@@ -125,17 +199,31 @@ def save_output_to_markdown(content: str, query: str) -> str:
     
     return file_path
 
-mygraph = graph_builder()
+_GRAPH = None
+_GRAPH_LOCK = threading.Lock()
 
-# test run
-if __name__ == "__main__":
-    logger.info("Testing the research agent workflow...")
-    print("=" * 50)
+def get_graph():
+    """
+    The process-wide research graph with the real clients, checkpointed when
+    checkpoints are enabled. Compiled on first call (not at import), once.
+    """
+    global _GRAPH
+    if _GRAPH is None:
+        with _GRAPH_LOCK:
+            if _GRAPH is None:
+                _GRAPH = graph_builder(checkpointer=get_checkpointer())
+    return _GRAPH
 
-    query = "MCP servers in ai agents"
-    
+def __getattr__(name: str):
+    # main.mygraph (no checkpointer) used to be compiled at import time; now it's built on first access
+    if name == "mygraph":
+        globals()["mygraph"] = graph_builder()
+        return globals()["mygraph"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def initial_state(query: str) -> dict:
     # Initialize state with defaults
-    initial_state = {
+    return {
         "user_input": query,
         "enhanced_query": "",
         "followup_questions": [],
@@ -149,10 +237,105 @@ if __name__ == "__main__":
         "messages": [],
         "step_info": "",
     }
-    
-    result = mygraph.invoke(initial_state)
+
+async def research_batch(queries: List[str], out, concurrency: Optional[int] = None, fresh: bool = False) -> dict:
+    """
+    Research every query with batch.run_batch (bounded concurrency, searches and
+    crawls shared across the batch) and write a JSON line per query to `out` as
+    each finishes, then the summary line. Returns the summary.
+    """
+    import json
+    from batch import run_batch
+
+    graph = get_graph()
+    checkpointer = get_checkpointer()
+    report_cache = get_report_cache()
+
+    async def run_query(query: str) -> dict:
+        cached = None if fresh else report_cache.get(query)
+        if cached:
+            return {"status": "done", "cached": True, "match": cached["match"], "run_id": None,
+                    "report_markdown": cached["report"]}
+        run_id = new_run_id()
+        result = await graph.ainvoke(initial_state(query), run_config(run_id) if checkpointer else None)
+        report = result.get("report_markdown", "<no report generated>")
+        report_cache.store_result(query, result, report)
+        await afinish_run(checkpointer, run_id, result)
+        return {"status": "done", "cached": False, "run_id": run_id, "errors": result.get("errors", []),
+                "report_markdown": report}
+
+    summary: dict = {}
+    async for item in run_batch(queries, run_query, concurrency):
+        out.write(json.dumps(item) + "\n")
+        out.flush()
+        summary = item.get("summary", summary)
+    return summary
+
+# test run
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="run the research agent")
+    parser.add_argument("query", nargs="?", default="MCP servers in ai agents")
+    parser.add_argument("--resume", metavar="RUN_ID", help="pick a failed or interrupted run back up from its failed node")
+    parser.add_argument("--fresh", action="store_true", help="ignore cached reports and run the full pipeline")
+    parser.add_argument("--batch", metavar="FILE", help="research every line of FILE ('-' for stdin), writing JSONL results")
+    parser.add_argument("--concurrency", type=int, help="batch runs in flight at once (default BATCH_CONCURRENCY)")
+    parser.add_argument("--out", metavar="FILE", help="where batch results go (default stdout)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    check_env(interactive=True)
+
+    if args.batch:
+        import asyncio
+        import sys
+        from contextlib import nullcontext
+
+        with (sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")) as f:
+            queries = [line.strip() for line in f if line.strip()]
+        with (open(args.out, "w", encoding="utf-8") if args.out else nullcontext(sys.stdout)) as out:
+            summary = asyncio.run(research_batch(queries, out, args.concurrency, args.fresh))
+        logger.info(f"Batch completed: {summary}")
+        raise SystemExit(1 if summary.get("failed") else 0)
+
+    report_cache = get_report_cache()
+    cached = None if (args.resume or args.fresh) else report_cache.get(args.query)
+    checkpointer = get_checkpointer()
+
+    logger.info("Testing the research agent workflow...")
+    print("=" * 50)
+
+    if args.resume:
+        if checkpointer is None:
+            raise SystemExit("resuming needs checkpoints (set CHECKPOINT_DB and install langgraph-checkpoint-sqlite)")
+        run_id = args.resume
+        cli_graph = get_graph()
+        try:
+            config = resume_config(cli_graph, run_id)
+        except KeyError:
+            raise SystemExit(f"no checkpoints for run {run_id}")
+        if config is None:
+            raise SystemExit(f"run {run_id} already completed without errors")
+        query = cli_graph.get_state(config).values.get("user_input", args.query)
+        result = cli_graph.invoke(None, config)
+    elif cached:
+        run_id = None
+        query = args.query
+        age = int(datetime.now().timestamp() - cached["created_at"])
+        logger.info(f"Using cached report ({cached['match']} match for '{cached['query']}', {age}s old); pass --fresh to rerun")
+        result = {"report_markdown": cached["report"], "step_info": "Cached report", "errors": []}
+    else:
+        run_id = new_run_id()
+        query = args.query
+
+        if checkpointer:
+            logger.info(f"run id: {run_id} (resume with: python main.py --resume {run_id})")
+        result = get_graph().invoke(initial_state(query), run_config(run_id) if checkpointer else None)
     
     final_response = result.get("report_markdown", "<no report generated>")
+    report_cache.store_result(query, result, final_response)
+    finish_run(checkpointer, run_id, result)
     
     # save to file
     try:
@@ -172,8 +355,11 @@ if __name__ == "__main__":
     errors = result.get("errors", [])
     if errors:
         logger.warning(f"Errors encountered during workflow: {errors}")
+        if checkpointer:
+            logger.warning(f"Retry the failed step with: python main.py --resume {run_id}")
     
     # Log summary stats
     selected_urls = result.get("selected_urls", [])
     articles = result.get("articles", [])
-    logger.info(f"Workflow summary: {len(selected_urls)} URLs selected, {len(articles)} articles processed")
\ No newline at end of file
+    logger.info(f"Workflow summary: {len(selected_urls)} URLs selected, {len(articles)} articles processed, "
+                f"~{result.get('dedup_tokens_saved', 0)} tokens of near-duplicate content skipped")
\ No newline at end of file
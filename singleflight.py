@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# what a flight broadcasts: (event name, payload), e.g. ("node", {...}) or ("token", {"text": ...})
+Event = Tuple[str, dict]
+
+
+class Flight:
+    """
+    One in-flight run that any number of callers share.
+
+    The run publishes events as it goes; every subscriber replays them from the
+    first one, so a caller that attaches late still sees the whole stream. The
+    run keeps going while anyone is attached and is cancelled when the last
+    subscriber leaves, the way a lone client disconnecting used to stop its run.
+    """
+
+    def __init__(self, key: str, run_id: str, query: str):
+        self.key = key
+        self.run_id = run_id
+        self.query = query
+        self.events: List[Event] = []
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.result: Optional[asyncio.Future] = None
+        self._published = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None and self.result.done()
+
+    def publish(self, name: str, data: dict) -> None:
+        self.events.append((name, data))
+        self._wake()
+
+    def _wake(self) -> None:
+        # wake everyone waiting on the current event, then start a fresh one for the next publish
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    @asynccontextmanager
+    async def attached(self):
+        """Keep the run alive for as long as the block runs."""
+        self.subscribers += 1
+        try:
+            yield self
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done and self.task is not None:
+                logger.info(f"last caller left, cancelling run {self.run_id}: {self.query}")
+                self.task.cancel()
+
+    async def stream(self, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Event]]:
+        """Every event so far, then live ones until the run ends; None when `heartbeat` passes without one."""
+        seen = 0
+        while True:
+            while seen < len(self.events):
+                seen += 1
+                yield self.events[seen - 1]
+            if self.done:
+                return
+            published = self._published
+            try:
+                await asyncio.wait_for(published.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+    async def wait(self) -> Any:
+        """The run's result (or its exception); a caller giving up doesn't cancel the run for the others."""
+        return await asyncio.shield(self.result)
+
+
+class SingleFlight:
+    """
+    Flights by key: the first caller for a key starts the run, callers that
+    arrive while it's in flight join it instead of starting a duplicate.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self.started = 0
+        self.joined = 0
+
+    def join(self, key: str, run_id: str, query: str,
+             run: Callable[[Flight], Awaitable[Any]]) -> Tuple[Flight, bool]:
+        """(flight, True) after starting `run(flight)` for a new key, (flight, False) when one was in flight."""
+        flight = self._flights.get(key)
+        if flight is not None and not flight.done:
+            self.joined += 1
+            logger.info(f"joining run {flight.run_id} already in flight for: {query}")
+            return flight, False
+        flight = Flight(key, run_id, query)
+        flight.result = asyncio.get_running_loop().create_future()
+        # nobody may be waiting on the result (stream-only callers); don't warn about it
+        flight.result.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._flights[key] = flight
+        flight.task = asyncio.create_task(self._fly(flight, run))
+        self.started += 1
+        return flight, True
+
+    async def _fly(self, flight: Flight, run: Callable[[Flight], Awaitable[Any]]) -> None:
+        try:
+            flight.result.set_result(await run(flight))
+        except asyncio.CancelledError:
+            flight.result.set_exception(RuntimeError("run cancelled"))
+            raise
+        except Exception as e:
+            flight.result.set_exception(e)
+        finally:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            flight._wake()  # let subscribers see the end
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def cancel_all(self) -> None:
+        tasks = [f.task for f in self._flights.values() if f.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,20 @@
+import asyncio
+
+from batch import run_batch
+
+
+def test_batch_runs_similar_questions_separately():
+    calls = []
+
+    async def run_query(query):
+        calls.append(query)
+        return {"status": "done", "report_markdown": f"report for {query}"}
+
+    async def collect(queries):
+        return [item async for item in run_batch(queries, run_query, concurrency=2)]
+
+    items = asyncio.run(collect(["How to tune HNSW?", "how to tune  hnsw", "why tune HNSW"]))
+    summary = items[-1]["summary"]
+    assert summary["distinct"] == 2 and len(calls) == 2
+    reports = {item["index"]: item["report_markdown"] for item in items[:-1]}
+    assert reports[0] == reports[1] != reports[2]
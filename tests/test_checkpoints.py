@@ -0,0 +1,52 @@
+import sqlite3
+from typing import List, TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+from utils import checkpoints
+from utils.checkpoints import SqliteCheckpointer, finish_run, new_run_id, run_config
+
+
+class State(TypedDict):
+    step_info: str
+    errors: List[str]
+
+
+def _graph(checkpointer, fail: bool):
+    def summarizer(state: State) -> dict:
+        if fail:
+            return {"step_info": "Summarizer (error)", "errors": ["gemini 503"]}
+        return {"step_info": "Summarizer", "errors": []}
+
+    builder = StateGraph(State)
+    builder.add_node("summarizer", summarizer)
+    builder.add_edge(START, "summarizer")
+    builder.add_edge("summarizer", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _threads(checkpointer) -> set:
+    with checkpointer.cursor() as cur:
+        cur.execute("SELECT DISTINCT thread_id FROM checkpoints")
+        return {row[0] for row in cur.fetchall()}
+
+
+def _run(checkpointer, fail: bool) -> str:
+    run_id = new_run_id()
+    result = _graph(checkpointer, fail).invoke({"step_info": "", "errors": []}, run_config(run_id))
+    finish_run(checkpointer, run_id, result)
+    return run_id
+
+
+def test_only_failed_runs_keep_their_checkpoints(tmp_path):
+    checkpointer = SqliteCheckpointer(sqlite3.connect(str(tmp_path / "checkpoints.sqlite"), check_same_thread=False))
+    _run(checkpointer, fail=False)
+    failed = _run(checkpointer, fail=True)
+    assert _threads(checkpointer) == {failed}
+
+
+def test_failed_runs_past_the_limit_are_pruned_oldest_first(monkeypatch, tmp_path):
+    monkeypatch.setattr(checkpoints, "MAX_RUNS", 2)
+    checkpointer = SqliteCheckpointer(sqlite3.connect(str(tmp_path / "checkpoints.sqlite"), check_same_thread=False))
+    failed = [_run(checkpointer, fail=True) for _ in range(4)]
+    assert _threads(checkpointer) == set(failed[-2:])
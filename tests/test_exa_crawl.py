@@ -0,0 +1,85 @@
+import asyncio
+import json
+import os
+import threading
+
+os.environ.setdefault("HTTP_RETRIES", "0")
+
+from agents.planner import _parse_crawl_result
+from tools import exa_search
+from utils.cache import SQLiteCache
+
+CACHED = {"title": "Cached", "url": "https://example.com/cached", "text": "cached page text " * 20}
+
+
+def _setup(monkeypatch):
+    # nothing listens on port 9: every crawl request fails
+    monkeypatch.setenv("EXA_API_KEY", "test")
+    monkeypatch.setattr(exa_search, "EXA_BASE_URL", "http://127.0.0.1:9")
+    cache = exa_search._get_crawl_cache()
+    cache.set(exa_search._crawl_key(CACHED["url"]), json.dumps(CACHED).encode("utf-8"))
+    return [CACHED["url"], "https://example.com/missing"]
+
+
+def test_failed_crawl_keeps_cached_pages(monkeypatch):
+    urls = _setup(monkeypatch)
+    for result in (exa_search._exa_crawl_urls(urls, max_urls=2),
+                   asyncio.run(exa_search._aexa_crawl_urls(urls, max_urls=2))):
+        payload = json.loads(result)
+        assert [article["url"] for article in payload["articles"]] == [CACHED["url"]]
+        assert payload["error"].startswith("Error crawling URLs with Exa")
+
+    # the crawler keeps the page and reports the failure next to it
+    articles = _parse_crawl_result(result)
+    assert articles[0]["url"] == CACHED["url"] and not articles[0].get("error")
+    assert "Error crawling URLs with Exa" in articles[-1]["error"]
+
+
+def test_waiter_crawls_what_a_failed_owner_left(monkeypatch):
+    url = "https://example.com/contested"
+    crawled = []
+
+    def crawl_into(urls, pages):
+        crawled.append(list(urls))
+        pages.update({u: {"title": "Contested", "url": u, "text": "contested page text " * 20} for u in urls})
+
+    monkeypatch.setattr(exa_search, "_crawl_into", crawl_into)
+    # another caller owns the crawl and fails it
+    key = exa_search._crawl_key(url)
+    exa_search.CRAWLS.claim([key])
+    threading.Timer(0.1, exa_search.CRAWLS.resolve, (key, None)).start()
+
+    payload = json.loads(exa_search._exa_crawl_urls([url], max_urls=1))
+    assert crawled == [[url]]
+    assert [article["url"] for article in payload["articles"]] == [url]
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"results": [{"id": "https://example.com/fresh", "url": "https://example.com/fresh",
+                             "title": "Fresh", "text": "fresh page text " * 20}]}
+
+
+class FakeClient:
+    async def post(self, **kwargs):
+        return FakeResponse()
+
+
+def test_async_crawl_keeps_the_cache_off_the_event_loop(monkeypatch):
+    urls = _setup(monkeypatch)[:1] + ["https://example.com/fresh"]
+    on_loop = []
+    for name in ("get", "set"):
+        method = getattr(SQLiteCache, name)
+        def record(self, *args, _method=method, **kwargs):
+            # asyncio.run drives the loop from the main thread
+            on_loop.append(threading.current_thread() is threading.main_thread())
+            return _method(self, *args, **kwargs)
+        monkeypatch.setattr(SQLiteCache, name, record)
+    monkeypatch.setattr(exa_search, "async_client", FakeClient)
+
+    payload = json.loads(asyncio.run(exa_search._aexa_crawl_urls(urls, max_urls=2)))
+    assert [article["url"] for article in payload["articles"]] == urls
+    assert on_loop and not any(on_loop)
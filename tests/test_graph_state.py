@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("LANGSMITH_TRACING", "false")
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp())
+
+from langchain_core.tools import StructuredTool
+
+import main
+from benchmarks.fakes import FakeChatModel, make_platform_tools, make_search_tools
+
+MIRRORED_TEXT = " ".join(f"word{i % 97} term{i % 13}" for i in range(400))
+
+
+def _mirror_crawl(urls=(), **_):
+    # every url returns the same page, so the crawler merges all but one of them
+    return json.dumps({"articles": [{"title": f"Mirror {i}", "url": url, "text": MIRRORED_TEXT}
+                                    for i, url in enumerate(urls)]})
+
+
+def _graph(planner_mode: str):
+    search_tools = make_search_tools()
+    search_tools[1] = StructuredTool.from_function(
+        func=_mirror_crawl, name="exa_crawl_urls", description="Stand-in crawl returning mirrored pages.",
+        infer_schema=False, args_schema={"type": "object", "properties": {}})
+    return main.graph_builder(llm=FakeChatModel(), gemini=FakeChatModel(), search_tools=search_tools,
+                              platform_tools=make_platform_tools(), planner_mode=planner_mode)
+
+
+def test_dedup_tokens_saved_is_counted_once():
+    for planner_mode in ("react", "parallel"):
+        node_saved = {}
+        final = None
+        for mode, chunk in _graph(planner_mode).stream(main.initial_state("mirrored pages"),
+                                                       stream_mode=["updates", "values"]):
+            if mode == "values":
+                final = chunk
+                continue
+            for node, update in chunk.items():
+                if isinstance(update, dict) and "dedup_tokens_saved" in update:
+                    node_saved[node] = node_saved.get(node, 0) + update["dedup_tokens_saved"]
+
+        assert node_saved.get("crawler", 0) > 0, planner_mode
+        # only the crawler and the scraper agent merge duplicates; no other node may hand
+        # their count back to the reducer
+        assert set(node_saved) <= {"crawler", "scraper agent"}, (planner_mode, node_saved)
+        assert final["dedup_tokens_saved"] == node_saved["crawler"] + node_saved.get("scraper agent", 0), planner_mode
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from jobs import JobManager, JobStore
+
+
+def test_jobs_run_and_record_progress(tmp_path):
+    async def run_job(job_id, query, on_progress):
+        for step in ("planner", "summarizer"):
+            await on_progress({"step": step})
+        return f"report for {query}"
+
+    async def scenario():
+        manager = JobManager(run_job, workers=2, store=JobStore(str(tmp_path / "jobs.sqlite")))
+        await manager.start()
+        try:
+            job_ids = [await manager.submit(f"query {i}", "batch" if i % 2 else "interactive") for i in range(4)]
+            for _ in range(200):
+                jobs = [await manager.store.aget(job_id) for job_id in job_ids]
+                if all(job["status"] == "done" for job in jobs):
+                    break
+                await asyncio.sleep(0.01)
+            return jobs, await manager.metrics()
+        finally:
+            await manager.stop()
+
+    jobs, metrics = asyncio.run(scenario())
+    assert [job["report"] for job in jobs] == [f"report for query {i}" for i in range(4)]
+    assert all([event["step"] for event in job["progress"]] == ["planner", "summarizer"] for job in jobs)
+    assert metrics["done"] == 4 and metrics["queue_depth"] == {"interactive": 0, "batch": 0}
+
+
+class SlowClaimStore(JobStore):
+    # an empty claim that's still in its thread when the next job is submitted
+    def claim(self, priority):
+        job = super().claim(priority)
+        time.sleep(0.05)
+        return job
+
+
+def test_job_submitted_during_an_empty_claim_still_runs(tmp_path):
+    async def run_job(job_id, query, on_progress):
+        return f"report for {query}"
+
+    async def scenario():
+        manager = JobManager(run_job, workers=1, store=SlowClaimStore(str(tmp_path / "jobs.sqlite")))
+        await manager.start()
+        try:
+            await asyncio.sleep(0.02)
+            job_id = await manager.submit("late query")
+            for _ in range(200):
+                job = await manager.store.aget(job_id)
+                if job["status"] == "done":
+                    break
+                await asyncio.sleep(0.01)
+            return job
+        finally:
+            await manager.stop()
+
+    assert asyncio.run(scenario())["status"] == "done"
@@ -0,0 +1,42 @@
+import os
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+
+import google.api_core.exceptions
+
+from utils import llm
+
+
+class _ExhaustedClient:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, **kwargs):
+        self.calls += 1
+        error = google.api_core.exceptions.ResourceExhausted("quota exceeded")
+        error.retry_after = 0.1
+        raise error
+
+
+def test_gemini_429s_reach_the_limiter(monkeypatch):
+    monkeypatch.setattr(llm, "RETRIES", 1)
+    gemini = llm.init_gemini()
+    client = _ExhaustedClient()
+    object.__setattr__(gemini, "client", client)
+    limiter = llm.llm_limiter(llm._model_of(gemini))
+    try:
+        gemini.invoke("hello")
+    except google.api_core.exceptions.ResourceExhausted:
+        pass
+    else:
+        raise AssertionError("expected the 429 to surface")
+    # one sdk attempt per limiter attempt: the sdk's own retry loop would make this 6 per attempt
+    assert client.calls == llm.RETRIES + 1
+    assert limiter.window < llm.MAX_CONCURRENCY
+
+
+def test_static_caps_are_opt_in():
+    assert llm._parse_rate_limits("") == {}
+    limits = llm._parse_rate_limits("free, gemini-2.0-flash=2000/4000000")
+    assert limits["llama-3.1-8b-instant"] == llm.FREE_TIER_LIMITS["llama-3.1-8b-instant"]
+    assert limits["gemini-2.0-flash"] == (2000, 4_000_000)
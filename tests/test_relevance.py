@@ -0,0 +1,37 @@
+import json
+
+from langchain_core.tools import StructuredTool
+
+from agents.planner import create_crawler_agent, select_urls
+from agents.summarizer import _content_parts
+from utils.budget import ContextBudget
+
+def _crawl(urls=(), **_):
+    # pages of the same length, different enough that dedup keeps both
+    return json.dumps({"articles": [{"title": f"Page {i}", "url": url,
+                                     "text": " ".join(f"page{i}word{j}" for j in range(2000))}
+                                    for i, url in enumerate(urls)]})
+
+
+def test_better_ranked_pages_get_more_of_the_report_prompt():
+    question = "vector database index"
+    # the first url comes back first for every search and its snippet matches, the second doesn't
+    hits = []
+    for q in (question, f"{question} tutorial", f"{question} guide"):
+        hits.append({"url": "https://wikipedia.org/wiki/Vector_database", "query": q, "rank": 0,
+                     "title": "Vector database", "snippet": "vector database index"})
+        hits.append({"url": "https://blog.example.com/misc", "query": q, "rank": 9, "title": "Misc", "snippet": ""})
+    state = {"user_input": question, "followup_questions": [question], "search_candidates": hits}
+    state.update(select_urls(state))
+    best, worst = state["selected_urls"]
+    assert state["url_scores"][best] > state["url_scores"][worst]
+
+    tool = StructuredTool.from_function(func=_crawl, name="exa_crawl_urls", description="Stand-in crawl.",
+                                        infer_schema=False, args_schema={"type": "object", "properties": {}})
+    articles = create_crawler_agent(tool)(state)["articles"]
+    assert articles[0]["relevance"] > 1.0 > articles[1]["relevance"]
+
+    budget = ContextBudget("gemini-2.0-flash", input_tokens=3000)
+    blocks, weights, _ = _content_parts({"user_input": question}, articles, [], budget)
+    fitted = budget.fit(blocks, weights, total=2000)
+    assert budget.count(fitted[0]) > 2 * budget.count(fitted[1])
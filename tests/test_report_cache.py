@@ -0,0 +1,34 @@
+from utils.cache import SQLiteCache
+from utils import report_cache
+from utils.report_cache import ReportCache, exact_query, normalize_query
+
+
+def _cache(monkeypatch, tmp_path, max_entries: int = 100) -> ReportCache:
+    # a private store instead of the process-wide "reports" cache
+    path = str(tmp_path / "reports.sqlite")
+    monkeypatch.setattr(report_cache, "get_cache", lambda name, **kwargs: SQLiteCache(name, path=path, **kwargs))
+    return ReportCache(ttl=3600, max_entries=max_entries)
+
+
+def test_keys_keep_the_question_and_real_words():
+    assert exact_query("How does HNSW work?") != exact_query("Why does HNSW work?")
+    assert exact_query("The MCP servers") == exact_query("mcp server")
+    assert normalize_query("AI news") == "ai news"
+    assert normalize_query("MCP servers for AI agents") == "mcp server ai agent"
+
+
+def test_different_questions_are_not_served_each_others_report(monkeypatch, tmp_path):
+    cache = _cache(monkeypatch, tmp_path)
+    cache.set("how does a vector database index work", "HOW REPORT")
+    assert cache.get("How does a vector database index work?")["match"] == "exact"
+    assert cache.get("why does a vector database index work") is None
+    assert cache.get("how do vector database indexes work")["report"] == "HOW REPORT"
+
+
+def test_evicted_reports_lose_their_signatures(monkeypatch, tmp_path):
+    cache = _cache(monkeypatch, tmp_path, max_entries=3)
+    for i in range(10):
+        cache.set(f"topic number {i} overview", f"report {i}")
+    (signatures,) = cache._conn.execute("SELECT COUNT(*) FROM report_signatures").fetchone()
+    (band_keys,) = cache._conn.execute("SELECT COUNT(DISTINCT key) FROM report_bands").fetchone()
+    assert signatures == band_keys == 3
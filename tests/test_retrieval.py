@@ -0,0 +1,18 @@
+from utils.budget import count_tokens
+from utils.retrieval import select_passages
+
+
+def _article(topic: str, paragraphs: int) -> str:
+    return "\n\n".join(f"{topic} paragraph {i}: " + " ".join(f"{topic}{j}" for j in range(150))
+                       for i in range(paragraphs))
+
+
+def test_every_text_keeps_its_top_passage_within_the_budget():
+    # the first text matches best and could fill the whole budget on its own
+    texts = [_article("vector index", 20), _article("database", 5), _article("latency", 5)]
+    for max_tokens in (600, 150):
+        selected = select_passages(texts, ["vector index database latency"], max_tokens)
+        assert all(selected)
+        # the budget is for passages; the "[...]" marks between them come on top
+        gaps = sum(text.count("[...]") for text in selected)
+        assert sum(count_tokens(text) for text in selected) <= max_tokens + 4 * gaps + len(selected)
@@ -0,0 +1,39 @@
+import asyncio
+import json
+import threading
+
+from tools import serper_search
+from utils.cache import SQLiteCache
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"organic": [{"title": "Result", "link": "https://example.com/result", "snippet": "snippet"}]}
+
+
+class FakeClient:
+    async def post(self, *args, **kwargs):
+        return FakeResponse()
+
+
+def test_async_search_keeps_the_cache_off_the_event_loop(monkeypatch):
+    on_loop = []
+    for name in ("get", "set"):
+        method = getattr(SQLiteCache, name)
+        def record(self, *args, _method=method, **kwargs):
+            # asyncio.run drives the loop from the main thread
+            on_loop.append(threading.current_thread() is threading.main_thread())
+            return _method(self, *args, **kwargs)
+        monkeypatch.setattr(SQLiteCache, name, record)
+    monkeypatch.setenv("SERPER_API_KEY", "test")
+    monkeypatch.setattr(serper_search, "async_client", FakeClient)
+
+    query = "serper cache thread test"
+    fresh = asyncio.run(serper_search._aserper_search(query))
+    cached = asyncio.run(serper_search._aserper_search(query))
+    assert json.loads(fresh)["results"][0]["url"] == "https://example.com/result"
+    assert cached == fresh
+    assert on_loop and not any(on_loop)
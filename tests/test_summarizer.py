@@ -0,0 +1,35 @@
+from typing import Any, List, Optional
+
+from langchain_core.messages import BaseMessage
+
+from agents import summarizer
+from benchmarks.fakes import FakeChatModel
+from utils.budget import ContextBudget
+
+
+class RecordingModel(FakeChatModel):
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any):
+        PROMPTS.append(messages[-1].content)
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+PROMPTS: List[str] = []
+
+
+def test_notes_mode_condenses_articles_that_dont_fit(monkeypatch):
+    monkeypatch.setattr(summarizer, "SUMMARIZER_CONTEXT", "notes")
+    PROMPTS.clear()
+    articles = [{"title": f"Article {i}", "url": f"https://example.com/{i}",
+                 "text": " ".join(f"article{i}word{j}" for j in range(3000))} for i in range(3)]
+    state = {"user_input": "vector databases", "articles": articles, "platform_content": ""}
+
+    agent = summarizer.create_summarizer_agent(RecordingModel(), ContextBudget("gemini-2.0-flash", input_tokens=4000))
+    result = agent(state)
+    assert result["step_info"] == "Summarizer"
+    notes_calls = [p for p in PROMPTS if "ARTICLE TO CONDENSE" in p]
+    assert len(notes_calls) >= len(articles)
+    # the report prompt gets every chunk's notes, not a truncated raw text
+    report_prompt = PROMPTS[-1]
+    assert report_prompt.count("stand-in evidence note") == len(notes_calls)
+    assert "article0word2999" not in report_prompt
@@ -0,0 +1,7 @@
+from utils.text import strict_key
+
+
+def test_strict_key_keeps_every_word():
+    assert strict_key("How to tune HNSW?") == strict_key("how to tune  hnsw") == "how to tune hnsw"
+    assert strict_key("why tune HNSW") != strict_key("how to tune HNSW")
+    assert strict_key("C++ vs C#") == "c++ vs c#"
@@ -0,0 +1,41 @@
+import asyncio
+import json
+import random
+import threading
+
+from benchmarks.transcripts import QUESTION, SEGMENT_SECONDS, make_talk
+from tools import youtube_transcript
+from tools.youtube_transcript import select_windows
+from utils.cache import SQLiteCache
+
+
+def test_scoring_stops_after_the_last_on_topic_stretch():
+    segments, on_topic = make_talk(random.Random(7), minutes=180)
+    text, stats = select_windows(segments, [QUESTION], 2700)
+    assert stats["stopped_early"]
+    assert stats["seconds_scored"] < len(segments) * SEGMENT_SECONDS
+    # stopping early didn't change the selection: a last line that contains every question term to the
+    # scan ("trademark" has "trade") makes it score the whole talk, but scores nothing itself
+    tail = [{"start": len(segments) * SEGMENT_SECONDS, "duration": SEGMENT_SECONDS,
+             "text": "vectorial databasey indexer trademark recaller queryable latencyish"}]
+    full_text, full_stats = select_windows(segments + tail, [QUESTION], 2700)
+    assert not full_stats["stopped_early"]
+    assert full_text == text
+
+
+def test_async_transcript_keeps_the_cache_off_the_event_loop(monkeypatch):
+    video_id = "cachethread1"
+    segments = [{"start": 4.0 * i, "duration": 4.0, "text": f"line {i} about vector databases"} for i in range(30)]
+    youtube_transcript._get_transcript_cache().set(
+        f"{video_id}:en", json.dumps({"language": "en", "segments": segments}).encode("utf-8"))
+    on_loop = []
+    method = SQLiteCache.get
+    def record(self, *args, **kwargs):
+        # asyncio.run drives the loop from the main thread
+        on_loop.append(threading.current_thread() is threading.main_thread())
+        return method(self, *args, **kwargs)
+    monkeypatch.setattr(SQLiteCache, "get", record)
+
+    text = asyncio.run(youtube_transcript._aget_youtube_transcript(f"https://youtu.be/{video_id}", 500, [QUESTION]))
+    assert "vector databases" in text
+    assert on_loop and not any(on_loop)
@@ -1,28 +1,205 @@
-from langchain_core.tools import tool
-from exa_py import Exa
+from langchain_core.tools import StructuredTool
+import asyncio
 import os
-from typing import List, Optional
+import hashlib
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 import json
 import logging
 
+from utils.cache import SQLiteCache, get_cache
+from utils.urls import normalize_url
+from utils.metrics import timed_tool
+from utils.http import async_client, session
+from utils.inflight import InFlight
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-_EXA_CLIENT: Optional[Exa] = None
+# EXA_BASE_URL points the crawler at a proxy or a local stub (benchmarks/stubs.py)
+EXA_BASE_URL = (os.getenv("EXA_BASE_URL") or "https://api.exa.ai").rstrip("/")
+# crawling pages live is slower than a search call, give it longer than the transport default
+CRAWL_TIMEOUT = float(os.getenv("EXA_CRAWL_TIMEOUT", 60))
+
+# how long crawled pages stay fresh, by domain (suffix match, seconds).
+# reference docs barely change; news and forums do. EXA_CACHE_DOMAIN_TTLS
+# ("docs.python.org=2592000,news.ycombinator.com=600") adds to / overrides this.
+DOCS_TTL = 30 * 86400  # any docs.* host not listed below
+DOMAIN_TTLS: Dict[str, float] = {
+    "docs.python.org": 30 * 86400,
+    "developer.mozilla.org": 30 * 86400,
+    "readthedocs.io": 14 * 86400,
+    "wikipedia.org": 7 * 86400,
+    "arxiv.org": 30 * 86400,
+    "github.com": 3 * 86400,
+    "news.ycombinator.com": 3600,
+    "techcrunch.com": 6 * 3600,
+    "theverge.com": 6 * 3600,
+}
+
+for _item in os.getenv("EXA_CACHE_DOMAIN_TTLS", "").split(","):
+    if "=" in _item:
+        _domain, _ttl = _item.split("=", 1)
+        DOMAIN_TTLS[_domain.strip().lower()] = float(_ttl)
+
+def _get_crawl_cache() -> SQLiteCache:
+    return get_cache(
+        "exa",
+        ttl=float(os.getenv("EXA_CACHE_TTL", 3 * 86400)),  # default for unlisted domains, 0 disables
+        max_entries=int(os.getenv("EXA_CACHE_MAX_ENTRIES", 50000)),
+        max_bytes=int(os.getenv("EXA_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+        compress=True,
+    )
+
+def crawl_cache_stats() -> dict:
+    return _get_crawl_cache().stats()
+
+def _domain_ttl(url: str, default: float) -> float:
+    host = urlparse(url).netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    for domain, ttl in DOMAIN_TTLS.items():
+        if host == domain or host.endswith("." + domain):
+            return ttl
+    if host.startswith("docs."):
+        return max(default, DOCS_TTL)
+    return default
+
+def _crawl_key(url: str) -> str:
+    # content address: hash of the canonical url
+    return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+def _split_cached(urls: List[str]) -> Tuple[Dict[str, dict], List[str]]:
+    """Return ({url: cached page}, [urls that still need crawling])."""
+    cache = _get_crawl_cache()
+    cached: Dict[str, dict] = {}
+    misses: List[str] = []
+    for url in urls:
+        hit = cache.get(_crawl_key(url))
+        if hit is not None:
+            cached[url] = json.loads(hit)
+        else:
+            misses.append(url)
+    if cached:
+        logger.info(f"Exa cache: {len(cached)} hits, {len(misses)} misses")
+    return cached, misses
+
+# canonical urls being crawled right now: a page two runs want at once is crawled once
+CRAWLS = InFlight("exa")
+
+def _claim_misses(misses: List[str]) -> Tuple[List[str], Dict[str, object]]:
+    """(urls to crawl ourselves, {url: the crawl another caller has in flight for it})."""
+    by_key = {_crawl_key(url): url for url in misses}
+    mine, theirs = CRAWLS.claim(by_key)
+    return [by_key[key] for key in mine], {by_key[key]: call for key, call in theirs.items()}
+
+def _release_claims(urls: List[str], pages: Dict[str, dict]) -> None:
+    # hand what we crawled to whoever waited on it (None for pages we didn't get)
+    for url in urls:
+        CRAWLS.resolve(_crawl_key(url), pages.get(url))
+
+def _store_results(requested: List[str], results: List[dict]) -> Dict[str, dict]:
+    """Cache freshly crawled pages (full text) and map them back to the requested urls."""
+    cache = _get_crawl_cache()
+    by_key = {}
+    crawled = []
+    for res in results or []:
+        page = {
+            "title": res.get("title"),
+            "url": res.get("url"),
+            "text": res.get("text") or "",
+        }
+        # exa echoes the requested url as the id; the final url can differ after redirects
+        keys = {_crawl_key(u) for u in (res.get("id"), page["url"]) if isinstance(u, str)}
+        if page["text"]:
+            payload = json.dumps(page, ensure_ascii=False).encode("utf-8")
+            for key in keys:
+                cache.set(key, payload, ttl=_domain_ttl(page["url"] or "", cache.ttl))
+        for key in keys:
+            by_key[key] = page
+        crawled.append(page)
 
-def _get_exa_client() -> Optional[Exa]:
-    global _EXA_CLIENT
-    if _EXA_CLIENT is None:
-        api_key = os.getenv("EXA_API_KEY")
-        if not api_key:
-            return None
-        _EXA_CLIENT = Exa(api_key=api_key)
-    return _EXA_CLIENT
+    fresh = {}
+    for url in requested:
+        page = by_key.get(_crawl_key(url))
+        if page is not None:
+            fresh[url] = page
+    # pages we can't map back to a requested url are still worth returning
+    for page in crawled:
+        if not any(page is p for p in fresh.values()):
+            fresh[page["url"] or ""] = page
+    return fresh
 
+def _contents_request(urls: List[str]) -> Optional[dict]:
+    """Keyword args for POST /contents, None without an api key."""
+    api_key = os.getenv("EXA_API_KEY")
+    if not api_key:
+        return None
+    return {
+        "url": f"{EXA_BASE_URL}/contents",
+        "json": {"urls": urls, "text": True},
+        "headers": {"x-api-key": api_key, "Content-Type": "application/json"},
+        "timeout": CRAWL_TIMEOUT,
+    }
+
+
+def _crawl_into(urls: List[str], pages: Dict[str, dict]) -> Optional[str]:
+    """Crawl `urls` and add what comes back to `pages`; the error message if the request failed."""
+    request = _contents_request(urls)
+    if request is None:
+        return "EXA_API_KEY not found in environment variables"
+    try:
+        response = session().post(**request)
+        response.raise_for_status()
+        pages.update(_store_results(urls, response.json().get("results")))
+    except Exception as e:
+        logger.error(f"Exa crawl error: {e}")
+        return f"Error crawling URLs with Exa: {str(e)}"
+    return None
+
+async def _acrawl_into(urls: List[str], pages: Dict[str, dict]) -> Optional[str]:
+    # async twin of _crawl_into; compressing and caching the pages runs in a thread, off the event loop
+    request = _contents_request(urls)
+    if request is None:
+        return "EXA_API_KEY not found in environment variables"
+    try:
+        response = await async_client().post(**request)
+        response.raise_for_status()
+        pages.update(await asyncio.to_thread(_store_results, urls, response.json().get("results")))
+    except Exception as e:
+        logger.error(f"Exa crawl error: {e}")
+        return f"Error crawling URLs with Exa: {str(e)}"
+    return None
 
-@tool
-def exa_crawl_urls(
+
+def _format_articles(urls: List[str], pages: Dict[str, dict], max_chars_per_article: int, max_total_chars: int,
+                     error: Optional[str] = None) -> str:
+    # keep the requested order, pages exa couldn't map back go last
+    ordered = [pages[u] for u in urls if u in pages] + [p for u, p in pages.items() if u not in urls]
+    # a failed crawl still returns the cached and shared pages; the error goes along for the crawler
+    payload = {"error": error} if error else {}
+    if not ordered:
+        return json.dumps({"articles": [], **payload})
+
+    articles = []
+    total = 0
+    for page in ordered:
+        text = (page.get("text") or "")[:max_chars_per_article]
+        total += len(text)
+        articles.append({
+            "title": page.get("title"),
+            "url": page.get("url"),
+            "text": text,
+        })
+        if total >= max_total_chars:
+            break
+
+    return json.dumps({"articles": articles, **payload}, ensure_ascii=False)
+
+
+@timed_tool("exa_crawl_urls")
+def _exa_crawl_urls(
     urls: List[str],
     max_urls: int = 3,
     max_chars_per_article: int = 6000,
@@ -34,39 +211,69 @@ def exa_crawl_urls(
     Takes a list of URLs and returns full text content from each.
     """
     logger.info(f"Crawling {len(urls)} URLs with Exa")
-    
-    client = _get_exa_client()
-    if client is None:
-        return "Error: EXA_API_KEY not found in environment variables"
-    
-    try:
-        # limit to max_urls to avoid too many requests
-        urls_to_crawl = urls[:max_urls]
-        
-        # get contents from specific URLs
-        result = client.get_contents(
-            urls=urls_to_crawl,
-            text=True,
-        )
-        
-        if not result.results:
-            return json.dumps({"articles": []})
-        
-        articles = []
-        total = 0
-        for res in result.results:
-            text = (res.text or "")[:max_chars_per_article]
-            total += len(text)
-            articles.append({
-                "title": getattr(res, "title", None),
-                "url": getattr(res, "url", None),
-                "text": text,
-            })
-            if total >= max_total_chars:
-                break
-        
-        return json.dumps({"articles": articles}, ensure_ascii=False)
-        
-    except Exception as e:
-        logger.error(f"Exa crawl error: {e}")
-        return f"Error crawling URLs with Exa: {str(e)}"
+
+    # limit to max_urls to avoid too many requests
+    urls_to_crawl = urls[:max_urls]
+    pages, misses = _split_cached(urls_to_crawl)
+    error = None
+    # the second round crawls what another caller's failed (or timed out) crawl left us
+    for _ in range(2):
+        if not misses:
+            break
+        mine, theirs = _claim_misses(misses)
+        try:
+            if mine:
+                # get contents for the urls we don't have and nobody else is fetching
+                error = _crawl_into(mine, pages) or error
+        finally:
+            _release_claims(mine, pages)
+
+        misses = []
+        for url, call in theirs.items():
+            page = CRAWLS.wait(call, CRAWL_TIMEOUT)
+            if page is not None:
+                pages[url] = page
+            else:
+                misses.append(url)
+    return _format_articles(urls_to_crawl, pages, max_chars_per_article, max_total_chars, error)
+
+
+@timed_tool("exa_crawl_urls")
+async def _aexa_crawl_urls(
+    urls: List[str],
+    max_urls: int = 3,
+    max_chars_per_article: int = 6000,
+    max_total_chars: int = 20000,
+) -> str:
+    # async twin of _exa_crawl_urls on the shared async client
+    logger.info(f"Crawling {len(urls)} URLs with Exa (async)")
+
+    urls_to_crawl = urls[:max_urls]
+    # reading and decompressing cached pages runs in a thread, off the event loop
+    pages, misses = await asyncio.to_thread(_split_cached, urls_to_crawl)
+    error = None
+    for _ in range(2):
+        if not misses:
+            break
+        mine, theirs = _claim_misses(misses)
+        try:
+            if mine:
+                error = await _acrawl_into(mine, pages) or error
+        finally:
+            _release_claims(mine, pages)
+
+        misses = []
+        for url, call in theirs.items():
+            page = await CRAWLS.await_(call, CRAWL_TIMEOUT)
+            if page is not None:
+                pages[url] = page
+            else:
+                misses.append(url)
+    return _format_articles(urls_to_crawl, pages, max_chars_per_article, max_total_chars, error)
+
+
+exa_crawl_urls = StructuredTool.from_function(
+    func=_exa_crawl_urls,
+    coroutine=_aexa_crawl_urls,
+    name="exa_crawl_urls",
+)
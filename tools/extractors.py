@@ -0,0 +1,104 @@
+import os
+import logging
+from typing import Dict, List, Optional
+
+from utils.url_router import UrlRouter
+from .reddit_scraper import get_multiple_reddit_posts
+from .youtube_transcript import get_multiple_youtube_transcripts
+from .hackernews import get_multiple_hackernews_threads
+
+logger = logging.getLogger(__name__)
+
+
+class Extractor:
+    """
+    A source the scraper agent fetches itself instead of handing to the crawler.
+
+    patterns: regexes matched at the start of a url (see UrlRouter)
+    tool: batch tool taking {"urls"} (plus "max_tokens" when sized, "questions" when focused)
+    heading: section title in the platform content, upper case ("REDDIT DISCUSSIONS")
+    label: source type shown in the report's source list
+    site: domain for the planner's "site:" searches, if it has any
+    """
+
+    def __init__(self, name: str, patterns: List[str], tool, heading: str, label: str,
+                 site: Optional[str] = None, sized: bool = False, focused: bool = False, max_urls: int = 3):
+        self.name = name
+        self.patterns = patterns
+        self.tool = tool
+        self.heading = heading
+        self.label = label
+        self.site = site
+        self.sized = sized
+        self.focused = focused  # picks the parts of each item that answer the research questions
+        self.max_urls = max_urls
+
+    def args(self, urls: List[str], item_tokens: int, questions: Optional[List[str]] = None) -> dict:
+        args = {"urls": urls}
+        if self.sized:
+            args["max_tokens"] = item_tokens
+        if self.focused and questions:
+            args["questions"] = questions
+        return args
+
+
+# registration order is the order of the sections in the report prompt
+EXTRACTORS: Dict[str, Extractor] = {}
+# every url the planner sees goes through here once; "web" is the crawler's
+ROUTER = UrlRouter(default="web")
+
+
+def register_extractor(extractor: Extractor) -> Extractor:
+    if extractor.name in EXTRACTORS:
+        raise ValueError(f"extractor {extractor.name!r} is already registered")
+    EXTRACTORS[extractor.name] = extractor
+    ROUTER.add(extractor.name, *extractor.patterns)
+    return extractor
+
+
+register_extractor(Extractor(
+    "reddit",
+    [r"https?://(?:www\.|old\.)?reddit\.com/r/[^/\s]+/comments/[^/\s]+/[^/\s]+/?"],
+    get_multiple_reddit_posts,
+    heading="REDDIT DISCUSSIONS",
+    label="Reddit Discussion",
+    site="reddit.com",
+))
+register_extractor(Extractor(
+    "youtube",
+    [r"https?://(?:www\.|m\.)?(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/|youtube\.com/v/)[^&\s]+"],
+    get_multiple_youtube_transcripts,
+    heading="YOUTUBE TRANSCRIPTS",
+    label="YouTube Video",
+    site="youtube.com",
+    sized=True,
+    focused=True,
+))
+register_extractor(Extractor(
+    "hackernews",
+    [r"https?://news\.ycombinator\.com/item\?(?:[^\s]*&)?id=\d+"],
+    get_multiple_hackernews_threads,
+    heading="HACKER NEWS DISCUSSIONS",
+    label="Hacker News Discussion",
+    site="news.ycombinator.com",
+    sized=True,
+))
+
+# extractors whose sites get their own searches in the parallel planner, e.g. "reddit,youtube,hackernews";
+# the others are still fetched whenever a regular search turns them up
+PLATFORM_SEARCHES = [name.strip() for name in os.getenv("PLATFORM_SEARCHES", "reddit,youtube").split(",") if name.strip()]
+
+
+def platform_search_sites() -> List[str]:
+    sites = []
+    for name in PLATFORM_SEARCHES:
+        extractor = EXTRACTORS.get(name)
+        if extractor is None or not extractor.site:
+            logger.warning(f"PLATFORM_SEARCHES: no extractor with a site named '{name}'")
+            continue
+        sites.append(extractor.site)
+    return sites
+
+
+def route_limits() -> Dict[str, int]:
+    return {name: extractor.max_urls for name, extractor in EXTRACTORS.items()}
@@ -0,0 +1,191 @@
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import html
+import os
+import re
+import httpx
+import requests
+from langchain_core.tools import StructuredTool
+import logging
+
+from utils.budget import count_tokens, truncate_tokens
+from utils.metrics import timed_tool
+from utils.http import async_client, session
+
+logger = logging.getLogger(__name__)
+
+# threads fetched at once by the batch tool
+MAX_CONCURRENCY = int(os.getenv("HN_MAX_CONCURRENCY", 4))
+# algolia's mirror of the hn api returns a whole thread (story + comment tree) in one request;
+# HN_BASE_URL points it elsewhere (the stub in benchmarks/stubs.py)
+HN_BASE_URL = (os.getenv("HN_BASE_URL") or "https://hn.algolia.com/api/v1").rstrip("/")
+
+# default length per thread; the scraper agent passes its own allocation
+THREAD_TOKENS = 2000
+MAX_REPLIES = 2  # replies kept under each top-level comment
+
+ITEM_ID = re.compile(r"[?&]id=(\d+)")
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def extract_item_id(url: str) -> Optional[str]:
+    match = ITEM_ID.search(url)
+    return match.group(1) if match else None
+
+
+def _plain(text: Optional[str]) -> str:
+    # comment and post text come as html (<p>, <a>, <i>, entities)
+    text = (text or "").replace("<p>", "\n\n")
+    return html.unescape(_TAGS.sub("", text)).strip()
+
+
+def _format_thread(item: Dict[str, Any], url: str, max_tokens: int = THREAD_TOKENS) -> str:
+    title = item.get("title") or "No title"
+    header = f"""HACKER NEWS THREAD: {title}
+Thread Link: {url}
+Story Link: {item.get("url") or "(self post)"}
+Author: {item.get("author") or "Anonymous"} | Points: {item.get("points") or 0}
+"""
+    text = _plain(item.get("text"))
+    if text:
+        header += f"\nContent: {text}\n"
+
+    # hn has no comment scores; the api keeps the site's order, so the first comments are the ranked ones
+    comments = []
+    for comment in item.get("children") or []:
+        body = _plain(comment.get("text"))
+        if not body:
+            continue
+        entry = f"Author: {comment.get('author') or 'Anonymous'}\n{body}"
+        replies = [r for r in comment.get("children") or [] if _plain(r.get("text"))][:MAX_REPLIES]
+        for reply in replies:
+            entry += f"\n  ↳ {reply.get('author') or 'Anonymous'}: {_plain(reply.get('text'))}"
+        comments.append(entry)
+
+    output = header + "\n"
+    if not comments:
+        return output + "No comments found."
+    output += "TOP COMMENTS:\n\n"
+    # whole comments while they fit, so the thread isn't cut mid-sentence unless the first one is too long
+    used = count_tokens(output)
+    kept = []
+    for entry in comments:
+        cost = count_tokens(entry) + 2
+        if kept and used + cost > max_tokens:
+            break
+        kept.append(entry)
+        used += cost
+    logger.info(f"Formatted Hacker News thread with {len(kept)}/{len(comments)} top-level comments")
+    return truncate_tokens(output + "\n\n---\n\n".join(kept), max_tokens)
+
+
+def _item_url(item_id: str) -> str:
+    return f"{HN_BASE_URL}/items/{item_id}"
+
+
+@timed_tool("get_hackernews_thread")
+def _get_hackernews_thread(url: str, max_tokens: int = THREAD_TOKENS) -> str:
+    """
+    Fetches a Hacker News discussion (story and top comments).
+
+    Args:
+        url: The thread URL (e.g., https://news.ycombinator.com/item?id=12345)
+        max_tokens: Token budget for the thread
+
+    Returns:
+        String containing the formatted story and comments
+    """
+    item_id = extract_item_id(url)
+    if not item_id:
+        return f"Error: Could not extract item ID from URL: {url}"
+    logger.info(f"Fetching Hacker News thread: {url}")
+
+    try:
+        response = session().get(_item_url(item_id), timeout=10)
+        response.raise_for_status()
+        return _format_thread(response.json(), url, max_tokens)
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Request error fetching Hacker News thread: {e}")
+        return f"Error fetching Hacker News thread: {str(e)}"
+    except (ValueError, AttributeError) as e:
+        logger.error(f"Data parsing error: {e}")
+        return f"Error parsing Hacker News data: {str(e)}"
+
+
+@timed_tool("get_hackernews_thread")
+async def _aget_hackernews_thread(url: str, max_tokens: int = THREAD_TOKENS) -> str:
+    # async twin of _get_hackernews_thread
+    item_id = extract_item_id(url)
+    if not item_id:
+        return f"Error: Could not extract item ID from URL: {url}"
+    logger.info(f"Fetching Hacker News thread (async): {url}")
+
+    try:
+        response = await async_client().get(_item_url(item_id), timeout=10)
+        response.raise_for_status()
+        return _format_thread(response.json(), url, max_tokens)
+
+    except httpx.HTTPError as e:
+        logger.error(f"Request error fetching Hacker News thread: {e}")
+        return f"Error fetching Hacker News thread: {str(e)}"
+    except (ValueError, AttributeError) as e:
+        logger.error(f"Data parsing error: {e}")
+        return f"Error parsing Hacker News data: {str(e)}"
+
+
+def _combine_threads(urls: List[str], threads: List[str]) -> str:
+    results = [f"POST {i}: {url}\n{thread}" for i, (url, thread) in enumerate(zip(urls, threads), 1)]
+    successful = len([t for t in threads if not t.startswith("Error")])
+    logger.info(f"Completed Hacker News fetch: {successful}/{len(urls)} threads successful")
+    return ("\n\n" + "=" * 80 + "\n\n").join(results)
+
+
+def _get_multiple_hackernews_threads(urls: List[str], max_tokens: int = THREAD_TOKENS) -> str:
+    """
+    Fetches multiple Hacker News discussions.
+
+    Args:
+        urls: A list of Hacker News thread URLs
+        max_tokens: Token budget per thread
+
+    Returns:
+        String containing the formatted threads, separated by dividers
+    """
+    if not urls or not isinstance(urls, list):
+        return "Error: No valid URLs provided."
+    logger.info(f"Fetching {len(urls)} Hacker News threads")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENCY, len(urls)))) as pool:
+        threads = list(pool.map(lambda url: _get_hackernews_thread(url, max_tokens), urls))
+
+    return _combine_threads(urls, threads)
+
+
+async def _aget_multiple_hackernews_threads(urls: List[str], max_tokens: int = THREAD_TOKENS) -> str:
+    if not urls or not isinstance(urls, list):
+        return "Error: No valid URLs provided."
+    logger.info(f"Fetching {len(urls)} Hacker News threads (async)")
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def fetch(url: str) -> str:
+        async with semaphore:
+            return await _aget_hackernews_thread(url, max_tokens)
+
+    threads = await asyncio.gather(*(fetch(url) for url in urls))
+
+    return _combine_threads(urls, list(threads))
+
+
+get_hackernews_thread = StructuredTool.from_function(
+    func=_get_hackernews_thread,
+    coroutine=_aget_hackernews_thread,
+    name="get_hackernews_thread",
+)
+
+get_multiple_hackernews_threads = StructuredTool.from_function(
+    func=_get_multiple_hackernews_threads,
+    coroutine=_aget_multiple_hackernews_threads,
+    name="get_multiple_hackernews_threads",
+)
@@ -1,13 +1,104 @@
 from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import asyncio
+import os
+import httpx
 import requests
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 import logging
 import json
 
+from utils.rate_limit import HostRateLimiter
+from utils.metrics import timed_tool
+from utils.http import MAX_BACKOFF, async_client, session
+
 logger = logging.getLogger(__name__)
 
-@tool
-def get_reddit_comments(url: str) -> str:
+# Set user agent to avoid being blocked
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# how many threads are fetched at once, and how fast we hit any one host
+MAX_CONCURRENCY = int(os.getenv("REDDIT_MAX_CONCURRENCY", 4))
+RATE_LIMITER = HostRateLimiter(float(os.getenv("REDDIT_RATE_LIMIT", 2)))  # requests/sec per host
+# REDDIT_BASE_URL sends thread fetches to another host (a mirror, or the stub in benchmarks/stubs.py)
+REDDIT_BASE_URL = os.getenv("REDDIT_BASE_URL", "").rstrip("/")
+
+def _throttle_delay(response) -> Optional[float]:
+    """Seconds reddit asks us to back off, from a 429 or its X-Ratelimit-* headers."""
+    headers = response.headers
+    try:
+        if response.status_code == 429:
+            return float(headers.get("Retry-After") or headers.get("X-Ratelimit-Reset") or 5)
+        remaining = headers.get("X-Ratelimit-Remaining")
+        if remaining is not None and float(remaining) < 1:
+            return float(headers.get("X-Ratelimit-Reset") or 5)
+    except ValueError:
+        return 5.0
+    return None
+
+
+def _format_reddit_post(data: Any, url: str) -> str:
+    # Extract post title and content
+    post_data = data[0]["data"]["children"][0]["data"]
+    post_title = post_data.get("title", "No title")
+    post_content = post_data.get("selftext", "No content")
+    post_author = post_data.get("author", "Anonymous")
+    post_score = post_data.get("score", 0)
+    post_subreddit = post_data.get("subreddit", "unknown")
+    post_comments_count = post_data.get("num_comments", 0)
+
+    # Extract top comments only (limit to top 5 by score)
+    comments = []
+    if len(data) > 1 and "children" in data[1]["data"]:
+        # Get all comments and sort by score
+        all_comments = []
+        for comment in data[1]["data"]["children"]:
+            if "body" in comment.get("data", {}):
+                author = comment["data"].get("author", "Anonymous")
+                score = comment["data"].get("score", 0)
+                body = comment["data"]["body"]
+                all_comments.append((score, author, body))
+
+        # Sort by score (highest first) and take top 5
+        all_comments.sort(key=lambda x: x[0], reverse=True)
+        top_comments = all_comments[:5]
+
+        for score, author, body in top_comments:
+            comments.append(f"Author: {author} | Score: {score}\n{body}")
+
+    # Format the output (optimized)
+    formatted_output = f"""REDDIT POST: {post_title}
+Post Link: {url}
+Subreddit: r/{post_subreddit}
+Score: {post_score}
+
+Content: {post_content}
+
+"""
+
+    if comments:
+        formatted_output += "TOP COMMENTS:\n\n"
+        formatted_output += "\n\n---\n\n".join(comments)
+    else:
+        formatted_output += "No comments found."
+
+    logger.info(f"Successfully scraped Reddit post with {len(comments)} comments")
+    return formatted_output
+
+
+def _json_url(url: str) -> str:
+    # reddit serves every thread as json at <thread url>.json
+    if REDDIT_BASE_URL:
+        parsed = urlparse(url)
+        url = REDDIT_BASE_URL + parsed.path
+    return url if url.endswith(".json") else url + ".json"
+
+
+@timed_tool("get_reddit_comments")
+def _get_reddit_comments(url: str) -> str:
     """
     Fetches comments from a Reddit post URL using Reddit's JSON API.
     
@@ -19,69 +110,48 @@ def get_reddit_comments(url: str) -> str:
     """
     logger.info(f"Scraping Reddit post: {url}")
     
-    # Ensure URL is in JSON format
-    if not url.endswith(".json"):
-        url += ".json"
-
-    # Set user agent to avoid being blocked
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+    url = _json_url(url)
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        host = urlparse(url).netloc
+        RATE_LIMITER.acquire(host)
+        # the shared transport retries 429s itself; the penalty slows down the other fetches too
+        response = session().get(url, headers=HEADERS, timeout=10)
+        delay = _throttle_delay(response)
+        if delay:
+            RATE_LIMITER.penalize(host, min(delay, MAX_BACKOFF))
         response.raise_for_status()
+        return _format_reddit_post(response.json(), url)
 
-        data = response.json()
-
-        # Extract post title and content
-        post_data = data[0]["data"]["children"][0]["data"]
-        post_title = post_data.get("title", "No title")
-        post_content = post_data.get("selftext", "No content")
-        post_author = post_data.get("author", "Anonymous")
-        post_score = post_data.get("score", 0)
-        post_subreddit = post_data.get("subreddit", "unknown")
-        post_comments_count = post_data.get("num_comments", 0)
-
-        # Extract top comments only (limit to top 5 by score)
-        comments = []
-        if len(data) > 1 and "children" in data[1]["data"]:
-            # Get all comments and sort by score
-            all_comments = []
-            for comment in data[1]["data"]["children"]:
-                if "body" in comment.get("data", {}):
-                    author = comment["data"].get("author", "Anonymous")
-                    score = comment["data"].get("score", 0)
-                    body = comment["data"]["body"]
-                    all_comments.append((score, author, body))
-            
-            # Sort by score (highest first) and take top 5
-            all_comments.sort(key=lambda x: x[0], reverse=True)
-            top_comments = all_comments[:5]
-            
-            for score, author, body in top_comments:
-                comments.append(f"Author: {author} | Score: {score}\n{body}")
-
-        # Format the output (optimized)
-        formatted_output = f"""REDDIT POST: {post_title}
-Post Link: {url}
-Subreddit: r/{post_subreddit}
-Score: {post_score}
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Request error scraping Reddit: {e}")
+        return f"Error fetching Reddit post: {str(e)}"
+    except (KeyError, IndexError) as e:
+        logger.error(f"Data parsing error: {e}")
+        return f"Error parsing Reddit data: {str(e)}"
+    except Exception as e:
+        logger.error(f"Unexpected error scraping Reddit: {e}")
+        return f"Error: {str(e)}"
 
-Content: {post_content}
 
-"""
-        
-        if comments:
-            formatted_output += "TOP COMMENTS:\n\n"
-            formatted_output += "\n\n---\n\n".join(comments)
-        else:
-            formatted_output += "No comments found."
+@timed_tool("get_reddit_comments")
+async def _aget_reddit_comments(url: str) -> str:
+    # async twin of _get_reddit_comments
+    logger.info(f"Scraping Reddit post (async): {url}")
 
-        logger.info(f"Successfully scraped Reddit post with {len(comments)} comments")
-        return formatted_output
+    url = _json_url(url)
 
-    except requests.exceptions.RequestException as e:
+    try:
+        host = urlparse(url).netloc
+        await RATE_LIMITER.aacquire(host)
+        response = await async_client().get(url, headers=HEADERS, timeout=10)
+        delay = _throttle_delay(response)
+        if delay:
+            RATE_LIMITER.penalize(host, min(delay, MAX_BACKOFF))
+        response.raise_for_status()
+        return _format_reddit_post(response.json(), url)
+
+    except httpx.HTTPError as e:
         logger.error(f"Request error scraping Reddit: {e}")
         return f"Error fetching Reddit post: {str(e)}"
     except (KeyError, IndexError) as e:
@@ -92,8 +162,24 @@ Content: {post_content}
         return f"Error: {str(e)}"
 
 
-@tool
-def get_multiple_reddit_posts(urls: List[str]) -> str:
+def _combine_posts(urls: List[str], posts: List[str]) -> str:
+    results = []
+    successful_scrapes = 0
+
+    for i, (url, post_data) in enumerate(zip(urls, posts), 1):
+        if not post_data.startswith("Error"):
+            successful_scrapes += 1
+
+        results.append(f"POST {i}: {url}\n{post_data}")
+
+    # Join all posts with clear separators
+    combined_output = "\n\n" + "="*80 + "\n" + "="*80 + "\n\n".join(results)
+
+    logger.info(f"Completed scraping: {successful_scrapes}/{len(urls)} posts successful")
+    return combined_output
+
+
+def _get_multiple_reddit_posts(urls: List[str]) -> str:
     """
     Fetches comments from multiple Reddit post URLs.
     
@@ -108,27 +194,51 @@ def get_multiple_reddit_posts(urls: List[str]) -> str:
     if not urls or not isinstance(urls, list):
         return "Error: No valid URLs provided."
 
-    results = []
-    successful_scrapes = 0
-
-    for i, url in enumerate(urls, 1):
+    def fetch(item):
+        i, url = item
         logger.info(f"Scraping post {i}/{len(urls)}: {url}")
-        post_data = get_reddit_comments(url)
-        
-        if not post_data.startswith("Error"):
-            successful_scrapes += 1
-            
-        results.append(f"POST {i}: {url}\n{post_data}")
+        return _get_reddit_comments(url)
 
-    # Join all posts with clear separators
-    combined_output = "\n\n" + "="*80 + "\n" + "="*80 + "\n\n".join(results)
-    
-    logger.info(f"Completed scraping: {successful_scrapes}/{len(urls)} posts successful")
-    return combined_output
+    # bounded fan-out over the shared session; map() keeps the input order
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENCY, len(urls)))) as pool:
+        posts = list(pool.map(fetch, enumerate(urls, 1)))
+
+    return _combine_posts(urls, posts)
+
+
+async def _aget_multiple_reddit_posts(urls: List[str]) -> str:
+    logger.info(f"Scraping {len(urls)} Reddit posts (async)")
+
+    if not urls or not isinstance(urls, list):
+        return "Error: No valid URLs provided."
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def fetch(i: int, url: str) -> str:
+        async with semaphore:
+            logger.info(f"Scraping post {i}/{len(urls)}: {url}")
+            return await _aget_reddit_comments(url)
+
+    posts = await asyncio.gather(*(fetch(i, url) for i, url in enumerate(urls, 1)))
+
+    return _combine_posts(urls, list(posts))
+
+
+get_reddit_comments = StructuredTool.from_function(
+    func=_get_reddit_comments,
+    coroutine=_aget_reddit_comments,
+    name="get_reddit_comments",
+)
+
+get_multiple_reddit_posts = StructuredTool.from_function(
+    func=_get_multiple_reddit_posts,
+    coroutine=_aget_multiple_reddit_posts,
+    name="get_multiple_reddit_posts",
+)
 
 
 # Test function for development
 if __name__ == "__main__":
     # Test with a sample Reddit URL
     test_url = "https://www.reddit.com/r/ethereum/comments/1iuxkmv/how_bybit_could_have_prevented_this_hack_but_didnt/"
-    print(get_reddit_comments(test_url))
+    print(get_reddit_comments.invoke({"url": test_url}))
@@ -1,16 +1,71 @@
-from langchain_core.tools import tool
-import requests
+from langchain_core.tools import StructuredTool
+import asyncio
 import os
+import re
 import json
 import logging
 from dotenv import load_dotenv
 
+from utils.cache import SQLiteCache, get_cache
+from utils.metrics import timed_tool
+from utils.http import async_client, session
+from utils.inflight import InFlight
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# SERPER_BASE_URL points the tool at a proxy or a local stub (benchmarks/stubs.py)
+BASE_URL = (os.getenv("SERPER_BASE_URL") or "https://google.serper.dev").rstrip("/") + "/search"
+
+def _get_search_cache() -> SQLiteCache:
+    return get_cache(
+        "serper",
+        ttl=float(os.getenv("SERPER_CACHE_TTL", 86400)),  # 0 disables the cache
+        max_entries=int(os.getenv("SERPER_CACHE_MAX_ENTRIES", 20000)),
+    )
+
+def _cache_key(query: str, locale: str, language: str, max_results: int) -> str:
+    # near-repeats hit the same entry: case, spacing and trailing punctuation don't matter
+    normalized = re.sub(r"\s+", " ", query).strip().strip("?!.,;: ").lower()
+    return json.dumps([normalized, locale.strip().lower(), language.strip().lower(), int(max_results)])
+
+def search_cache_stats() -> dict:
+    return _get_search_cache().stats()
+
+# identical searches running at the same time (a batch of related queries) go out once
+SEARCHES = InFlight("serper")
+SHARED_WAIT = 120  # seconds to wait on someone else's search before giving up on it
+
+
+def _compact_results(data: dict, query: str, max_results: int) -> str:
+    # compact json for minimal tokens
+    compact = {
+        "query": query,
+        "knowledge_graph": None,
+        "results": [],
+    }
+
+    if "knowledgeGraph" in data:
+        kg = data["knowledgeGraph"]
+        compact["knowledge_graph"] = {
+            "title": kg.get("title"),
+            "type": kg.get("type"),
+            "description": kg.get("description"),
+        }
+
+    organic = data.get("organic", [])[:max_results]
+    for item in organic:
+        compact["results"].append({
+            "title": item.get("title"),
+            "url": item.get("link"),
+            "snippet": item.get("snippet"),  # for the planner's url ranking; the react model doesn't see it
+        })
+
+    return json.dumps(compact, ensure_ascii=False)
 
-@tool
-def serper_search_tool(
+
+@timed_tool("serper_search_tool")
+def _serper_search(
     query: str,
     locale: str = "us",
     language: str = "en",
@@ -21,46 +76,97 @@ def serper_search_tool(
     Best for: what/when/where/who questions, definitions, lists, overviews, recent news.
     Returns: Knowledge graphs, snippets, related searches, people also ask questions.
     """
-    logger.info(f"Searching with Serper: {query}")
-    
+    cache = _get_search_cache()
+    key = _cache_key(query, locale, language, max_results)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info(f"Serper cache hit: {query}")
+        return cached.decode("utf-8")
+
     SERPER_API_KEY = os.getenv("SERPER_API_KEY")
     if not SERPER_API_KEY:
         return "Error: SERPER_API_KEY not found in environment variables"
-    
-    BASE_URL = "https://google.serper.dev/search"
-    
+
+    mine, theirs = SEARCHES.claim([key])
+    if theirs:
+        shared = SEARCHES.wait(theirs[key], SHARED_WAIT)
+        if shared is not None:
+            logger.info(f"Serper search shared with an identical one in flight: {query}")
+            return shared
+        # that search failed: try our own
+
+    logger.info(f"Searching with Serper: {query}")
+
     payload = {"q": query, "gl": locale, "hl": language, "autocorrect": True}
     headers = {"X-API-KEY": SERPER_API_KEY, "Content-Type": "application/json"}
-    
+
+    result = None
     try:
-        response = requests.post(BASE_URL, json=payload, headers=headers, timeout=20)
+        response = session().post(BASE_URL, json=payload, headers=headers, timeout=20)
         response.raise_for_status()
-        data = response.json()
+        result = _compact_results(response.json(), query, max_results)
+        cache.set(key, result.encode("utf-8"))
+        return result
 
-        # compact json for minimal tokens
-        compact = {
-            "query": query,
-            "knowledge_graph": None,
-            "results": [],
-        }
+    except Exception as e:
+        logger.error(f"Serper search error: {str(e)}")
+        return json.dumps({"error": f"Error fetching search results: {str(e)}"})
+    finally:
+        if mine:
+            SEARCHES.resolve(key, result)
+
+
+@timed_tool("serper_search_tool")
+async def _aserper_search(
+    query: str,
+    locale: str = "us",
+    language: str = "en",
+    max_results: int = 5,
+) -> str:
+    # same as _serper_search but doesnt block the event loop (the sqlite cache runs in a thread too:
+    # it takes a lock and a set() may evict)
+    cache = _get_search_cache()
+    key = _cache_key(query, locale, language, max_results)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        logger.info(f"Serper cache hit: {query}")
+        return cached.decode("utf-8")
+
+    SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+    if not SERPER_API_KEY:
+        return "Error: SERPER_API_KEY not found in environment variables"
 
-        if "knowledgeGraph" in data:
-            kg = data["knowledgeGraph"]
-            compact["knowledge_graph"] = {
-                "title": kg.get("title"),
-                "type": kg.get("type"),
-                "description": kg.get("description"),
-            }
+    mine, theirs = SEARCHES.claim([key])
+    if theirs:
+        shared = await SEARCHES.await_(theirs[key], SHARED_WAIT)
+        if shared is not None:
+            logger.info(f"Serper search shared with an identical one in flight: {query}")
+            return shared
 
-        organic = data.get("organic", [])[:max_results]
-        for item in organic:
-            compact["results"].append({
-                "title": item.get("title"),
-                "url": item.get("link"),
-            })
+    logger.info(f"Searching with Serper (async): {query}")
+
+    payload = {"q": query, "gl": locale, "hl": language, "autocorrect": True}
+    headers = {"X-API-KEY": SERPER_API_KEY, "Content-Type": "application/json"}
 
-        return json.dumps(compact, ensure_ascii=False)
+    result = None
+    try:
+        response = await async_client().post(BASE_URL, json=payload, headers=headers, timeout=20)
+        response.raise_for_status()
+        result = _compact_results(response.json(), query, max_results)
+        await asyncio.to_thread(cache.set, key, result.encode("utf-8"))
+        return result
 
     except Exception as e:
         logger.error(f"Serper search error: {str(e)}")
         return json.dumps({"error": f"Error fetching search results: {str(e)}"})
+    finally:
+        if mine:
+            SEARCHES.resolve(key, result)
+
+
+# one tool object for both paths: .invoke() uses the shared session, .ainvoke() the shared async client
+serper_search_tool = StructuredTool.from_function(
+    func=_serper_search,
+    coroutine=_aserper_search,
+    name="serper_search_tool",
+)
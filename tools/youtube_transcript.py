@@ -1,12 +1,52 @@
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.formatters import TextFormatter
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import heapq
+import json
+import os
 import re
-from typing import List, Union, Dict, Any
-from langchain_core.tools import tool
+from typing import Iterable, Iterator, List, Tuple, Union, Dict, Any, Optional
+from langchain_core.tools import StructuredTool
 import logging
 
+from utils.cache import SQLiteCache, get_cache
+from utils.budget import count_tokens, truncate_tokens
+from utils.metrics import timed_tool
+from utils.http import session
+from utils.inflight import InFlight
+from utils.retrieval import GAP
+from utils.text import terms
+
 logger = logging.getLogger(__name__)
 
+# videos fetched at once by the batch tool
+MAX_CONCURRENCY = int(os.getenv("YOUTUBE_MAX_CONCURRENCY", 4))
+
+# default transcript length per video (~2000 words); the scraper agent passes its own allocation
+TRANSCRIPT_TOKENS = 2700
+
+# with research questions, a transcript is read in windows of about this many seconds (and at most
+# WINDOW_TOKENS) and the best scoring ones are kept, instead of the opening minutes (intros, sponsors)
+WINDOW_SECONDS = float(os.getenv("TRANSCRIPT_WINDOW_SECONDS", 60))
+WINDOW_TOKENS = 250
+# windows scoring below this aren't sent at all, so off-topic talk doesn't pad the budget
+MIN_SCORE = float(os.getenv("TRANSCRIPT_MIN_SCORE", 0.3))
+
+TRANSCRIPTS = InFlight("youtube")
+SHARED_WAIT = 60  # seconds to wait on someone else's download before trying ourselves
+
+def _get_transcript_cache() -> SQLiteCache:
+    # published transcripts don't change, so entries can live for a long time
+    return get_cache(
+        "youtube",
+        ttl=float(os.getenv("YOUTUBE_CACHE_TTL", 365 * 86400)),  # 0 disables
+        max_entries=int(os.getenv("YOUTUBE_CACHE_MAX_ENTRIES", 20000)),
+        max_bytes=int(os.getenv("YOUTUBE_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+        compress=True,
+    )
+
+def transcript_cache_stats() -> dict:
+    return _get_transcript_cache().stats()
+
 def extract_video_id(url: str) -> str:
     """
     Extracts the YouTube video ID from a URL.
@@ -40,92 +80,255 @@ def _format_timestamp(seconds: float) -> str:
     return f"{minutes:02d}:{seconds:02d}"
 
 
-def _fetch_transcript(video_id: str) -> str:
+def _fetch_segments(video_id: str, language: str = "en") -> Optional[List[Dict[str, Any]]]:
+    """
+    Raw transcript segments ({"start", "duration", "text"}) for a video in the
+    given language, served from the transcript cache when we have them.
+
+    Returns None when the video has no usable transcript. Blocks on the sqlite
+    cache and the network: the async tools run it in a worker thread.
+    """
+    cache = _get_transcript_cache()
+    key = f"{video_id}:{language}"
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info(f"Transcript cache hit for video {video_id}")
+        return json.loads(cached)["segments"]
+
+    mine, theirs = TRANSCRIPTS.claim([key])
+    if theirs:
+        # another run (a batch query sharing this video) is downloading it right now
+        segments = TRANSCRIPTS.wait(theirs[key], SHARED_WAIT)
+        if segments is not None:
+            return segments
+    segments = None
+    try:
+        segments = _download_segments(video_id, language, cache, key)
+    finally:
+        if mine:
+            TRANSCRIPTS.resolve(key, segments)
+    return segments
+
+def _download_segments(video_id: str, language: str, cache: SQLiteCache, key: str) -> Optional[List[Dict[str, Any]]]:
+    # imported on first fetch, not when the tools package loads
+    from youtube_transcript_api._transcripts import TranscriptListFetcher
+
+    # Get available transcripts. YouTubeTranscriptApi.list_transcripts opens a fresh
+    # requests.Session per video; the fetcher it wraps takes our pooled one instead
+    transcript_list = TranscriptListFetcher(session()).fetch(video_id)
+
+    # Try to get English transcript
+    try:
+        transcript = transcript_list.find_transcript([language])
+    except:
+        # If English transcript is not available, try to get any transcript and translate it
+        try:
+            transcript = transcript_list.find_transcript([f"{language}-US", f"{language}-GB"])
+        except:
+            try:
+                # Get any available transcript and translate to English
+                transcript = next(
+                    transcript_list._manually_created_transcripts.values().__iter__()
+                )
+                transcript = transcript.translate(language)
+            except:
+                return None
+
+    # Get the transcript data
+    segments = []
+    for entry in transcript.fetch():
+        try:
+            segments.append({"start": float(entry.start), "duration": float(entry.duration), "text": entry.text})
+        except AttributeError:
+            segments.append({"start": float(entry["start"]), "duration": float(entry.get("duration", 0)), "text": entry["text"]})
+
+    cache.set(key, json.dumps({"language": transcript.language_code, "segments": segments}).encode("utf-8"))
+    return segments
+
+
+def _question_terms(questions: Optional[List[str]]) -> List[frozenset]:
+    # folded like the url ranking: case, stopwords and plurals don't matter
+    return [wanted for wanted in (frozenset(terms(q)) for q in questions or []) if wanted]
+
+
+def _last_mentions(segments: List[Dict[str, Any]], wanted: List[frozenset]) -> Dict[str, int]:
+    """
+    For every question term, the position of the last segment that contains it
+    as a substring ("index" in "indexes"), found by scanning from the end. A
+    substring test can only over-report, so _ceiling stays an upper bound.
+    """
+    pending = set().union(*wanted) if wanted else set()
+    last = {}
+    for position in range(len(segments) - 1, -1, -1):
+        if not pending:
+            break
+        text = (segments[position].get("text") or "").lower()
+        found = {term for term in pending if term in text}
+        for term in found:
+            last[term] = position
+        pending -= found
+    return last
+
+
+def _ceiling(wanted: List[frozenset], last: Dict[str, int], position: int) -> float:
+    """The best score (see _score_window) a window starting at segment `position` or later could reach."""
+    if not wanted:
+        return 0.0
+    coverage = max(sum(1 for term in question if last.get(term, -1) >= position) / len(question) for question in wanted)
+    # coverage is 0.8 of the score, density at most the other 0.2, and there's no density without coverage
+    return round(0.8 * coverage + 0.2, 6) if coverage else 0.0
+
+
+def _windows(segments: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Consecutive segments grouped into windows of about WINDOW_SECONDS (at most
+    WINDOW_TOKENS), every line keeping its [MM:SS] stamp; "next" is the
+    position of the first segment after the window. Lazy, so a caller that
+    has seen enough doesn't pay for windowing (and token counting) the rest.
+    """
+    lines, texts, tokens, start, end, index = [], [], 0, None, 0.0, 0
+    for position, entry in enumerate(segments, 1):
+        text = " ".join((entry.get("text") or "").split())
+        if not text:
+            continue
+        if start is None:
+            start = entry["start"]
+        line = f"[{_format_timestamp(entry['start'])}] {text}"
+        lines.append(line)
+        texts.append(text)
+        tokens += count_tokens(line) + 1  # newline
+        end = entry["start"] + entry.get("duration", 0)
+        if end - start >= WINDOW_SECONDS or tokens >= WINDOW_TOKENS:
+            yield {"index": index, "lines": lines, "text": " ".join(texts), "tokens": tokens, "end": end,
+                   "next": position}
+            lines, texts, tokens, start, index = [], [], 0, None, index + 1
+    if lines:
+        yield {"index": index, "lines": lines, "text": " ".join(texts), "tokens": tokens, "end": end, "next": position}
+
+
+def _score_window(text: str, wanted: List[frozenset]) -> float:
+    """0..1: the largest share of one question's terms the window mentions, plus a little for how often."""
+    words = terms(text)
+    if not wanted or not words:
+        return 0.0
+    present = set(words)
+    coverage = max(len(terms & present) / len(terms) for terms in wanted)
+    every_term = frozenset().union(*wanted)
+    density = sum(1 for word in words if word in every_term) / len(words)
+    return round(0.8 * coverage + 0.2 * min(1.0, 5 * density), 6)
+
+
+def select_windows(segments: Iterable[Dict[str, Any]], questions: Optional[List[str]],
+                   max_tokens: int = TRANSCRIPT_TOKENS) -> Tuple[str, Dict[str, Any]]:
+    """
+    The transcript windows that best match the questions, up to max_tokens, in
+    playback order with "[...]" between the ones that aren't adjacent.
+
+    Windows are scored in order and the weakest kept one is dropped whenever
+    the budget overflows. Where each question term last occurs is known up
+    front (_last_mentions, a substring scan from the end), which caps what the
+    rest of the video can score; scoring stops once that cap can't change the
+    result: the budget is full and no later window could beat the weakest kept
+    one, or no later window could reach MIN_SCORE. The whole transcript is
+    still fetched and scanned; what's skipped is building, counting and
+    scoring the windows after that point. Windows under MIN_SCORE are left out even
+    when there is room, except the best one. Without questions it keeps the
+    opening windows, like a plain cut. Returns (text, stats).
+    """
+    segments = segments if isinstance(segments, list) else list(segments)
+    wanted = _question_terms(questions)
+    last = _last_mentions(segments, wanted)
+    kept: List[tuple] = []  # min-heap on (score, -index): the weakest, then the latest, goes first
+    used = scored = largest = 0
+    seconds_scored = 0.0
+    best = None
+    stopped = False
+    for window in _windows(segments):
+        scored += 1
+        seconds_scored = window["end"]
+        score = _score_window(window["text"], wanted)
+        if best is None or score > best[0]:
+            best = (score, window)
+        heapq.heappush(kept, (score, -window["index"], window))
+        used += window["tokens"]
+        largest = max(largest, window["tokens"])
+        while used > max_tokens and kept:
+            used -= heapq.heappop(kept)[2]["tokens"]
+        rest = _ceiling(wanted, last, window["next"])
+        full = max_tokens - used < largest
+        # nothing further on could displace a kept window, or even make the cut
+        if kept and ((full and kept[0][0] >= rest) or (wanted and rest < MIN_SCORE and best[0] >= rest)):
+            stopped = window["next"] < len(segments)
+            break
+
+    if wanted:
+        strong = [item for item in kept if item[0] >= MIN_SCORE]
+        kept = strong or [max(kept, key=lambda item: (item[0], item[1]))] if kept else []
+        heapq.heapify(kept)
+        used = sum(item[2]["tokens"] for item in kept)
+    stats = {"windows_scored": scored, "windows_kept": len(kept), "seconds_scored": seconds_scored,
+             "stopped_early": stopped, "tokens": used}
+    if not kept:
+        # a budget smaller than one window: cut the best one
+        return (truncate_tokens("\n".join(best[1]["lines"]), max_tokens) if best else ""), stats
+
+    parts, last = [], None
+    for _, _, window in sorted(kept, key=lambda item: -item[1]):
+        if last is not None:
+            parts.append("\n" if window["index"] == last + 1 else GAP)
+        parts.append("\n".join(window["lines"]))
+        last = window["index"]
+    stats["min_score"] = kept[0][0]
+    return "".join(parts), stats
+
+
+def _fetch_transcript(video_id: str, max_tokens: int = TRANSCRIPT_TOKENS, questions: Optional[List[str]] = None) -> str:
     """
     Helper function to fetch and format a transcript for a given video ID.
 
     Args:
         video_id: The YouTube video ID
+        max_tokens: Token budget for the formatted transcript
+        questions: Research questions; the parts of the video that answer them are kept
 
     Returns:
         Formatted transcript text
     """
     try:
-        # Get available transcripts
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+        segments = _fetch_segments(video_id)
+        if segments is None:
+            return "Error: No transcript available for this video."
 
-        # Try to get English transcript
-        try:
-            transcript = transcript_list.find_transcript(["en"])
-        except:
-            # If English transcript is not available, try to get any transcript and translate it
-            try:
-                transcript = transcript_list.find_transcript(["en-US", "en-GB"])
-            except:
-                try:
-                    # Get any available transcript and translate to English
-                    transcript = next(
-                        transcript_list._manually_created_transcripts.values().__iter__()
-                    )
-                    transcript = transcript.translate("en")
-                except:
-                    return "Error: No transcript available for this video."
-
-        # Get the transcript data
-        transcript_data = transcript.fetch()
-
-        # Format transcript with timestamps (limit to first 2000 words to save tokens)
-        formatted_lines = []
-        word_count = 0
-        max_words = 2000  # Limit transcript length
-        
-        for entry in transcript_data:
-            try:
-                timestamp = _format_timestamp(float(entry.start))
-                text = entry.text
-                words = text.split()
-                
-                # Check if adding this entry would exceed word limit
-                if word_count + len(words) > max_words:
-                    # Add partial entry if it fits
-                    remaining_words = max_words - word_count
-                    if remaining_words > 0:
-                        partial_text = " ".join(words[:remaining_words])
-                        formatted_lines.append(f"[{timestamp}] {partial_text}...")
-                    break
-                
-                formatted_lines.append(f"[{timestamp}] {text}")
-                word_count += len(words)
-                
-            except AttributeError:
-                timestamp = _format_timestamp(float(entry["start"]))
-                text = entry["text"]
-                words = text.split()
-                
-                if word_count + len(words) > max_words:
-                    remaining_words = max_words - word_count
-                    if remaining_words > 0:
-                        partial_text = " ".join(words[:remaining_words])
-                        formatted_lines.append(f"[{timestamp}] {partial_text}...")
-                    break
-                
-                formatted_lines.append(f"[{timestamp}] {text}")
-                word_count += len(words)
-
-        return "\n".join(formatted_lines)
+        transcript, stats = select_windows(segments, questions, max_tokens)
+        logger.info(f"Transcript {video_id}: kept {stats['windows_kept']} of {stats['windows_scored']} windows scored "
+                    f"({stats['tokens']} tokens{', stopped scoring at ' + _format_timestamp(stats['seconds_scored']) if stats['stopped_early'] else ''})")
+        return transcript
         
     except Exception as e:
         logger.error(f"Error fetching transcript for video {video_id}: {e}")
         return f"Error fetching transcript: {str(e)}"
 
 
-@tool
-def get_youtube_transcript(url: str) -> str:
+def _format_video(url: str, video_id: str, transcript: str, max_tokens: int = TRANSCRIPT_TOKENS,
+                  questions: Optional[List[str]] = None) -> str:
+    # Add video metadata (we'll get this from the URL for now)
+    extent = f"most relevant parts, up to {max_tokens} tokens" if _question_terms(questions) else f"first {max_tokens} tokens"
+    video_info = f"""YOUTUBE VIDEO: {url}
+Video ID: {video_id}
+Transcript ({extent}):"""
+
+    return f"{video_info}\n\n{transcript}"
+
+
+@timed_tool("get_youtube_transcript")
+def _get_youtube_transcript(url: str, max_tokens: int = TRANSCRIPT_TOKENS, questions: Optional[List[str]] = None) -> str:
     """
     Fetches the transcript of a YouTube video in English given its URL.
 
     Args:
         url: The URL of the YouTube video
+        max_tokens: Token budget for the transcript
+        questions: Research questions to pick the transcript's parts by (default: its beginning)
 
     Returns:
         String containing the transcript of the video in English with timestamps
@@ -140,14 +343,8 @@ def get_youtube_transcript(url: str) -> str:
             logger.error(error_msg)
             return error_msg
 
-        transcript = _fetch_transcript(video_id)
-        
-        # Add video metadata (we'll get this from the URL for now)
-        video_info = f"""YOUTUBE VIDEO: {url}
-Video ID: {video_id}
-Transcript (first 2000 words):"""
-        
-        full_output = f"{video_info}\n\n{transcript}"
+        transcript = _fetch_transcript(video_id, max_tokens, questions)
+        full_output = _format_video(url, video_id, transcript, max_tokens, questions)
         logger.info(f"Successfully fetched transcript for video {video_id}")
         return full_output
 
@@ -157,13 +354,31 @@ Transcript (first 2000 words):"""
         return error_msg
 
 
-@tool
-def get_multiple_youtube_transcripts(urls: List[str]) -> str:
+async def _aget_youtube_transcript(url: str, max_tokens: int = TRANSCRIPT_TOKENS, questions: Optional[List[str]] = None) -> str:
+    # youtube-transcript-api and the transcript cache are blocking only, so all of it runs in a worker thread
+    return await asyncio.to_thread(_get_youtube_transcript, url, max_tokens, questions)
+
+
+def _combine_transcripts(urls: List[str], transcripts: List[str]) -> str:
+    results = [f"URL: {url}\n\n{transcript}" for url, transcript in zip(urls, transcripts)]
+
+    # Join all transcripts with divider
+    divider = "\n\n" + "=" * 80 + "\n\n"
+    combined_result = divider.join(results)
+
+    logger.info(f"Successfully processed {len(urls)} YouTube videos")
+    return combined_result
+
+
+def _get_multiple_youtube_transcripts(urls: List[str], max_tokens: int = TRANSCRIPT_TOKENS,
+                                      questions: Optional[List[str]] = None) -> str:
     """
     Fetches transcripts for multiple YouTube videos given their URLs.
 
     Args:
         urls: A list of YouTube video URLs
+        max_tokens: Token budget per transcript
+        questions: Research questions to pick each transcript's parts by
 
     Returns:
         String containing all transcripts with timestamps, separated by dividers
@@ -175,21 +390,58 @@ def get_multiple_youtube_transcripts(urls: List[str]) -> str:
             return error_msg
 
         logger.info(f"Processing {len(urls)} YouTube URLs")
-        results = []
 
-        for i, url in enumerate(urls, 1):
+        def fetch(item):
+            i, url = item
             logger.info(f"Processing video {i}/{len(urls)}: {url}")
-            transcript = get_youtube_transcript(url)
-            results.append(f"URL: {url}\n\n{transcript}")
+            return _get_youtube_transcript(url, max_tokens, questions)
 
-        # Join all transcripts with divider
-        divider = "\n\n" + "=" * 80 + "\n\n"
-        combined_result = divider.join(results)
-        
-        logger.info(f"Successfully processed {len(urls)} YouTube videos")
-        return combined_result
+        # listing + fetching transcripts block on network, so overlap them; map() keeps the order
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENCY, len(urls)))) as pool:
+            transcripts = list(pool.map(fetch, enumerate(urls, 1)))
+
+        return _combine_transcripts(urls, transcripts)
         
     except Exception as e:
         error_msg = f"Error processing multiple YouTube transcripts: {str(e)}"
         logger.error(error_msg)
         return error_msg
+
+
+async def _aget_multiple_youtube_transcripts(urls: List[str], max_tokens: int = TRANSCRIPT_TOKENS,
+                                             questions: Optional[List[str]] = None) -> str:
+    try:
+        if not urls or not isinstance(urls, list):
+            error_msg = "Error: No valid URLs provided."
+            logger.error(error_msg)
+            return error_msg
+
+        logger.info(f"Processing {len(urls)} YouTube URLs (async)")
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+        async def fetch(i: int, url: str) -> str:
+            async with semaphore:
+                logger.info(f"Processing video {i}/{len(urls)}: {url}")
+                return await _aget_youtube_transcript(url, max_tokens, questions)
+
+        transcripts = await asyncio.gather(*(fetch(i, url) for i, url in enumerate(urls, 1)))
+
+        return _combine_transcripts(urls, list(transcripts))
+
+    except Exception as e:
+        error_msg = f"Error processing multiple YouTube transcripts: {str(e)}"
+        logger.error(error_msg)
+        return error_msg
+
+
+get_youtube_transcript = StructuredTool.from_function(
+    func=_get_youtube_transcript,
+    coroutine=_aget_youtube_transcript,
+    name="get_youtube_transcript",
+)
+
+get_multiple_youtube_transcripts = StructuredTool.from_function(
+    func=_get_multiple_youtube_transcripts,
+    coroutine=_aget_multiple_youtube_transcripts,
+    name="get_multiple_youtube_transcripts",
+)
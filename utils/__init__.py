@@ -1,9 +1,12 @@
 from .llm import init_groq, init_gemini
 from .prompts import QUERY_ENHANCER_PROMPT, SUMMARIZER_PROMPT
+from .cache import SQLiteCache, get_cache
 
 __all__ = [
     "init_groq",
     "init_gemini", 
     "QUERY_ENHANCER_PROMPT",
-    "SUMMARIZER_PROMPT"
+    "SUMMARIZER_PROMPT",
+    "SQLiteCache",
+    "get_cache",
 ]
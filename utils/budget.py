@@ -0,0 +1,198 @@
+import os
+import threading
+import logging
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # a declared dependency; without it (or offline, see _encoding) we estimate
+    tiktoken = None
+
+# context window per model (tokens)
+CONTEXT_WINDOWS: Dict[str, int] = {
+    "gemini-2.0-flash": 1_048_576,
+    "gemini-1.5-flash": 1_048_576,
+    "gemini-1.5-pro": 2_097_152,
+    "llama-3.1-8b-instant": 131_072,
+    "llama-3.3-70b-versatile": 131_072,
+}
+DEFAULT_CONTEXT_WINDOW = 32_768
+
+# how much of the window we plan to fill per call. far below the window on purpose:
+# past this, cost and latency grow faster than report quality, and groq's per-request
+# limits (the old 413s) are much lower than the model's window.
+# LLM_INPUT_BUDGETS ("gemini-2.0-flash=48000,llama-3.1-8b-instant=5000") overrides.
+#
+# the budgets are per model but the count isn't: every model is measured with cl100k_base.
+# on english prose that is within ~5% of llama 3's tokenizer and tends to over-count gemini's
+# (larger vocabulary) by up to ~15%, which errs on the safe side. the len/4 fallback
+# (CHARS_PER_TOKEN, no tiktoken or no bpe file) is within ~15% on prose but under-counts
+# code, urls and json by up to ~40% and non-latin scripts by 2-3x, so a page in one of those
+# can overshoot its budget by that much.
+INPUT_BUDGETS: Dict[str, int] = {
+    "gemini-2.0-flash": 32_000,
+    "gemini-1.5-flash": 32_000,
+    "gemini-1.5-pro": 32_000,
+    "llama-3.1-8b-instant": 6_000,
+    "llama-3.3-70b-versatile": 6_000,
+}
+DEFAULT_INPUT_BUDGET = 16_000
+
+for _item in os.getenv("LLM_INPUT_BUDGETS", "").split(","):
+    if "=" in _item:
+        _model, _tokens = _item.split("=", 1)
+        INPUT_BUDGETS[_model.strip()] = int(_tokens)
+
+# planning split of the report prompt, for nodes that run before the content is known
+ARTICLES_SHARE = 0.75
+PLATFORM_SHARE = 0.25
+# crawl at least this much per page even on small budgets; the summarizer condenses overflow
+MIN_PAGE_TOKENS = 4000
+MIN_PLATFORM_ITEM_TOKENS = 1000
+
+# estimate used when no tokenizer is available (english prose is ~4 chars per token)
+CHARS_PER_TOKEN = 4.0
+
+_ENCODING = None
+_ENCODING_LOCK = threading.Lock()
+_ENCODING_FAILED = False
+
+
+def _encoding():
+    """tiktoken's cl100k_base (the llama 3 tokenizer is a close relative), or None."""
+    global _ENCODING, _ENCODING_FAILED
+    if tiktoken is None or _ENCODING_FAILED:
+        return None
+    with _ENCODING_LOCK:
+        if _ENCODING is None and not _ENCODING_FAILED:
+            try:
+                _ENCODING = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # first use downloads the bpe file; offline boxes fall back to estimates
+                logger.warning(f"tiktoken encoding unavailable, estimating token counts: {e}")
+                _ENCODING_FAILED = True
+    return _ENCODING
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def tokens_to_chars(tokens: int) -> int:
+    # for apis that take character limits (exa)
+    return int(tokens * CHARS_PER_TOKEN)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0 or not text:
+        return ""
+    encoding = _encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    return text[:tokens_to_chars(max_tokens)]
+
+
+def split_tokens(text: str, max_tokens: int) -> List[str]:
+    """Cut text into pieces of at most max_tokens, preferring paragraph breaks."""
+    pieces = []
+    while text and count_tokens(text) > max_tokens:
+        head = truncate_tokens(text, max_tokens)
+        cut = head.rfind("\n\n")
+        if cut < len(head) // 2:
+            cut = len(head)
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text.strip():
+        pieces.append(text)
+    return pieces
+
+
+def allocate(total: int, sizes: Sequence[int], weights: Optional[Sequence[float]] = None) -> List[int]:
+    """
+    Split `total` tokens between items that need `sizes` tokens each.
+
+    Every item gets a share proportional to its weight (relevance), but never
+    more than it needs; what small items don't use is handed to the bigger ones
+    in the next round. If everything fits, everyone gets their full size.
+    """
+    weights = list(weights) if weights is not None else [1.0] * len(sizes)
+    grants = [0] * len(sizes)
+    open_items = [i for i, size in enumerate(sizes) if size > 0 and weights[i] > 0]
+    left = max(0, total)
+    while open_items and left > 0:
+        weight_sum = sum(weights[i] for i in open_items)
+        capped = [i for i in open_items if sizes[i] - grants[i] <= left * weights[i] / weight_sum]
+        if not capped:
+            # nobody can be fully served: proportional split of what's left, done
+            for i in open_items:
+                grants[i] += int(left * weights[i] / weight_sum)
+            break
+        for i in capped:
+            left -= sizes[i] - grants[i]
+            grants[i] = sizes[i]
+        open_items = [i for i in open_items if i not in capped]
+    return grants
+
+
+def model_name(llm) -> str:
+    # ChatGroq has model_name, ChatGoogleGenerativeAI has model ("models/gemini-2.0-flash")
+    name = getattr(llm, "model_name", None) or getattr(llm, "model", None) or ""
+    return str(name).split("/")[-1]
+
+
+class ContextBudget:
+    """
+    Token budget for the prompts sent to one model.
+
+    Nodes ask it how much room they have: available() subtracts the fixed parts
+    of a prompt (system prompt, instructions, sources list) from the model's
+    input budget, and fit() shares the rest between the variable parts
+    (articles, platform content) by relevance and size, truncating each to its
+    share. Counts are real tokens when tiktoken is installed, estimates otherwise.
+    """
+
+    def __init__(self, model: str, input_tokens: Optional[int] = None, output_tokens: int = 8192):
+        self.model = model
+        window = CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+        budget = input_tokens or INPUT_BUDGETS.get(model, DEFAULT_INPUT_BUDGET)
+        # never plan a prompt that leaves no room for the answer
+        self.input_tokens = min(budget, window - output_tokens)
+
+    @classmethod
+    def for_llm(cls, llm, **kwargs) -> "ContextBudget":
+        return cls(model_name(llm), **kwargs)
+
+    def count(self, text: str) -> int:
+        return count_tokens(text)
+
+    def available(self, *fixed: str) -> int:
+        """Tokens left for variable content once the fixed prompt parts are in."""
+        return max(0, self.input_tokens - sum(count_tokens(part) for part in fixed))
+
+    def share(self, fraction: float) -> int:
+        return int(self.input_tokens * fraction)
+
+    def page_tokens(self, pages: int) -> int:
+        """Per-page crawl limit when `pages` articles will share the report prompt."""
+        return max(MIN_PAGE_TOKENS, self.share(ARTICLES_SHARE) // max(1, pages))
+
+    def platform_item_tokens(self, items: int) -> int:
+        """Per-post / per-transcript limit when `items` platform sources share the report prompt."""
+        return max(MIN_PLATFORM_ITEM_TOKENS, self.share(PLATFORM_SHARE) // max(1, items))
+
+    def fit(self, texts: Sequence[str], weights: Optional[Sequence[float]] = None, total: Optional[int] = None) -> List[str]:
+        total = self.input_tokens if total is None else total
+        sizes = [count_tokens(text) for text in texts]
+        grants = allocate(total, sizes, weights)
+        fitted = [text if grant >= size else truncate_tokens(text, grant) for text, size, grant in zip(texts, sizes, grants)]
+        if sum(sizes) > total:
+            logger.info(f"{self.model}: fitted {sum(sizes)} tokens of content into {total}")
+        return fitted
@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_CACHES: Dict[str, "SQLiteCache"] = {}
+_CACHES_LOCK = threading.Lock()
+
+def cache_dir() -> str:
+    # all on-disk caches live here (CACHE_DIR env var, defaults to ./.cache)
+    path = os.getenv("CACHE_DIR", ".cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class SQLiteCache:
+    """
+    Small persistent key/value cache on top of sqlite.
+
+    - every entry has its own expiry (ttl seconds, 0 = never store)
+    - least recently used entries are evicted once max_entries, or the
+      optional max_bytes of stored (possibly compressed) values, is exceeded
+    - values can be zlib-compressed on disk (compress=True)
+    - hit/miss/eviction counters are kept per instance, see stats()
+
+    Safe to share between threads; each call is a single short transaction.
+    """
+
+    def __init__(self, name: str, ttl: float = 86400, max_entries: int = 10000, path: Optional[str] = None,
+                 max_bytes: Optional[int] = None, compress: bool = False):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.path = path or os.path.join(cache_dir(), f"{name}.sqlite")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " size INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+        if "size" not in columns:
+            # caches created before byte accounting existed
+            self._conn.execute("ALTER TABLE entries ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return zlib.decompress(row[0]) if self.compress else row[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        if self.compress:
+            value = zlib.compress(value, 6)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, last_access, size) VALUES (?, ?, ?, ?, ?)",
+                (key, value, now + ttl, now, len(value)),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        # drop expired rows first, then the least recently used ones over the limit
+        self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+            logger.info(f"{self.name} cache evicted {overflow} entries")
+
+        if self.max_bytes is not None:
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+            excess = total - self.max_bytes
+            if excess > 0:
+                victims = []
+                for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+                    victims.append((key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+                self.evictions += len(victims)
+                logger.info(f"{self.name} cache evicted {len(victims)} entries to stay under {self.max_bytes} bytes")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def get_cache(name: str, **kwargs) -> SQLiteCache:
+    """Process-wide SQLiteCache for `name`, created on first use (kwargs only apply then)."""
+    with _CACHES_LOCK:
+        if name not in _CACHES:
+            _CACHES[name] = SQLiteCache(name, **kwargs)
+        return _CACHES[name]
+
+
+def clear_caches() -> None:
+    """Empty every cache created so far in this process (benchmarks use it to measure cold runs)."""
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+    for cache in caches:
+        cache.clear()
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import uuid
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from .cache import cache_dir
+
+logger = logging.getLogger(__name__)
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:  # pip install langgraph-checkpoint-sqlite
+    SqliteSaver = None
+
+_CHECKPOINTER = None
+_CHECKPOINTER_LOCK = threading.Lock()
+# a run that finished cleanly has nothing to resume and its checkpoints are dropped; failed
+# ones are kept for resuming, the most recent CHECKPOINT_MAX_RUNS of them (0 keeps them all)
+MAX_RUNS = int(os.getenv("CHECKPOINT_MAX_RUNS", 200))
+
+
+if SqliteSaver is not None:
+    class SqliteCheckpointer(SqliteSaver):
+        """
+        SqliteSaver that also serves the async checkpoint api, so one compiled
+        graph can be checkpointed from .invoke() and .ainvoke(). The sync saver
+        already serializes access with a lock; async calls just run it in a thread.
+        """
+
+        async def aget_tuple(self, config: RunnableConfig):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                        before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator:
+            items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+            for item in items:
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path: str = "") -> None:
+            await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id: str) -> None:
+            await asyncio.to_thread(self.delete_thread, thread_id)
+
+        def prune(self, keep: int) -> int:
+            """Delete all but the `keep` most recently checkpointed runs, returns how many went."""
+            # checkpoint ids are uuid6, so the largest id of a thread is its latest checkpoint
+            with self.cursor() as cur:
+                cur.execute(
+                    "SELECT thread_id FROM checkpoints GROUP BY thread_id "
+                    "ORDER BY MAX(checkpoint_id) DESC LIMIT -1 OFFSET ?", (keep,))
+                stale = [row[0] for row in cur.fetchall()]
+            for thread_id in stale:
+                self.delete_thread(thread_id)
+            return len(stale)
+
+
+def get_checkpointer():
+    """
+    Process-wide sqlite checkpointer at CHECKPOINT_DB (default .cache/checkpoints.sqlite).
+    Returns None when CHECKPOINT_DB is set to "" or langgraph-checkpoint-sqlite isn't installed.
+    """
+    global _CHECKPOINTER
+    path = os.getenv("CHECKPOINT_DB", os.path.join(cache_dir(), "checkpoints.sqlite"))
+    if not path:
+        return None
+    if SqliteSaver is None:
+        logger.warning("langgraph-checkpoint-sqlite not installed, runs will not be checkpointed")
+        return None
+    with _CHECKPOINTER_LOCK:
+        if _CHECKPOINTER is None:
+            _CHECKPOINTER = SqliteCheckpointer(sqlite3.connect(path, check_same_thread=False))
+        return _CHECKPOINTER
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+def run_config(run_id: str) -> RunnableConfig:
+    # a run is a langgraph thread; every node boundary is saved under it
+    return {"configurable": {"thread_id": run_id}}
+
+
+def finish_run(checkpointer, run_id: Optional[str], result: dict) -> None:
+    """
+    Drop a run's checkpoints once it finished cleanly (the summarizer wrote the
+    report and no node failed), then prune failed runs past MAX_RUNS.
+    """
+    if checkpointer is None or not run_id:
+        return
+    if result.get("step_info") == "Summarizer" and not result.get("errors"):
+        checkpointer.delete_thread(run_id)
+    if MAX_RUNS > 0:
+        pruned = checkpointer.prune(MAX_RUNS)
+        if pruned:
+            logger.info(f"pruned checkpoints of {pruned} old runs")
+
+async def afinish_run(checkpointer, run_id: Optional[str], result: dict) -> None:
+    await asyncio.to_thread(finish_run, checkpointer, run_id, result)
+
+
+def _lineage(history: List) -> List:
+    """Checkpoints of the latest attempt, oldest first (earlier resumes leave forks behind)."""
+    by_id = {snap.config["configurable"]["checkpoint_id"]: snap for snap in history}
+    lineage = []
+    snap = history[0] if history else None
+    while snap is not None:
+        lineage.append(snap)
+        parent = snap.parent_config
+        snap = by_id.get(parent["configurable"]["checkpoint_id"]) if parent else None
+    lineage.reverse()
+    return lineage
+
+def resume_config(graph, run_id: str) -> Optional[RunnableConfig]:
+    """
+    Where to pick a checkpointed run back up, or None if it finished cleanly.
+
+    - a run that stopped mid-graph (crash, exception, killed process) continues
+      from its last saved step
+    - otherwise nodes report failures through step_info ("Summarizer (error)"),
+      so we find the first step that flipped to an error label and rewind to the
+      checkpoint just before it; invoking from there re-runs that node on the
+      saved state without paying for the ones before it
+
+    Raises KeyError for an unknown run id.
+    """
+    history = list(graph.get_state_history(run_config(run_id)))
+    if not history:
+        raise KeyError(run_id)
+    if history[0].next:
+        return history[0].config
+
+    lineage = _lineage(history)
+    for before, after in zip(lineage, lineage[1:]):
+        step = after.values.get("step_info", "")
+        if step.endswith("(error)") and step != before.values.get("step_info", "") and before.next:
+            logger.info(f"run {run_id} failed at {', '.join(before.next)}, resuming from there")
+            return before.config
+    return None
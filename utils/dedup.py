@@ -0,0 +1,167 @@
+import os
+import re
+import string
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# two documents are duplicates when this share of their 5-word shingles is the same (jaccard)
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", 0.8))
+SHINGLE_WORDS = 5
+# simhashes this close (differing bits of 64) get the exact jaccard check; ~0.8 jaccard lands around 10
+SIMHASH_DISTANCE = 16
+# shorter texts (error strings, one-line comments) are never merged
+MIN_WORDS = 50
+
+# reddit posts and transcripts are joined with lines of '=' by the scraper tools, and the
+# scraper agent puts a "## REDDIT DISCUSSIONS" / "## YOUTUBE TRANSCRIPTS" heading on each section
+PLATFORM_DIVIDER = re.compile(r"(\n*={80,}\n*|\n*^## [A-Z ]+$\n*)", re.MULTILINE)
+
+_PUNCTUATION = str.maketrans(string.punctuation, " " * len(string.punctuation))
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def shingle_hashes(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """64-bit hashes of every k-word shingle, vectorized (a few ms for a long page)."""
+    words = text.lower().translate(_PUNCTUATION).split()
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    # python's str hash is salted per process, fine for in-run comparisons (never persist these)
+    word_hashes = np.fromiter(map(hash, words), dtype=np.int64, count=len(words)).view(np.uint64)
+    n = max(1, len(words) - k + 1)
+    hashes = np.zeros(n, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(min(k, len(words))):
+            hashes = hashes * _MIX + word_hashes[j:j + n]
+        # splitmix finalizer so every output bit depends on the whole shingle
+        hashes ^= hashes >> np.uint64(31)
+        hashes *= np.uint64(0xBF58476D1CE4E5B9)
+        hashes ^= hashes >> np.uint64(29)
+    return hashes
+
+
+def simhash(hashes: np.ndarray) -> np.uint64:
+    """64-bit simhash: every bit is the majority vote of that bit over the shingle hashes."""
+    if hashes.size == 0:
+        return np.uint64(0)
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > hashes.size
+    return np.packbits(votes).view(np.uint64)[0]
+
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    a, b = np.unique(a), np.unique(b)
+    if a.size == 0 or b.size == 0:
+        return 0.0
+    shared = np.intersect1d(a, b, assume_unique=True).size
+    return shared / (a.size + b.size - shared)
+
+
+def near_duplicate_groups(texts: List[str], threshold: Optional[float] = None) -> List[List[int]]:
+    """
+    Indices of `texts` grouped into near-duplicate clusters (singletons included),
+    in order of first appearance.
+
+    Simhash distances pick candidate pairs in one vectorized pass; candidates are
+    confirmed with exact shingle jaccard, so distinct pages on the same topic
+    never merge. Hundreds of full pages take a fraction of a second.
+    """
+    threshold = DEDUP_SIMILARITY if threshold is None else threshold
+    hashes = [shingle_hashes(text) for text in texts]
+    eligible = [i for i, text in enumerate(texts) if len(text.split()) >= MIN_WORDS]
+    parent = list(range(len(texts)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    if len(eligible) > 1:
+        sims = np.array([simhash(hashes[i]) for i in eligible], dtype=np.uint64)
+        distances = np.bitwise_count(sims[:, None] ^ sims[None, :])
+        for a, b in zip(*np.nonzero(np.triu(distances <= SIMHASH_DISTANCE, k=1))):
+            i, j = eligible[a], eligible[b]
+            if root(i) != root(j) and jaccard(hashes[i], hashes[j]) >= threshold:
+                parent[max(root(i), root(j))] = min(root(i), root(j))
+
+    groups: dict = {}
+    for i in range(len(texts)):
+        groups.setdefault(root(i), []).append(i)
+    return list(groups.values())
+
+
+def dedupe_articles(articles: List[dict], threshold: Optional[float] = None) -> Tuple[List[dict], int]:
+    """
+    Collapse mirrored / syndicated articles into one, keeping the longest text.
+
+    The kept article lists the other copies' urls under "mirrors" so they stay
+    citable. Failed crawls pass through untouched. Returns (articles, tokens saved).
+    """
+    valid = [i for i, a in enumerate(articles) if not a.get("error") and a.get("text", "").strip()]
+    groups = near_duplicate_groups([articles[i].get("text", "") for i in valid], threshold)
+    if len(groups) == len(valid):
+        return articles, 0
+
+    replacement = {}
+    dropped = set()
+    saved = 0
+    for group in groups:
+        if len(group) == 1:
+            continue
+        members = [articles[valid[g]] for g in group]
+        keep = max(members, key=lambda a: len(a.get("text", "")))
+        mirrors = list(keep.get("mirrors", []))
+        for member in members:
+            if member is keep:
+                continue
+            mirrors += [url for url in [member.get("url")] + member.get("mirrors", []) if url and url not in mirrors]
+            saved += count_tokens(member.get("text", ""))
+        relevance = max(float(a.get("relevance", 1.0)) for a in members)
+        merged = {**keep, "mirrors": mirrors}
+        if any("relevance" in a for a in members):
+            merged["relevance"] = relevance
+        # the cluster keeps the position of its first member
+        replacement[valid[group[0]]] = merged
+        dropped.update(valid[g] for g in group[1:])
+
+    deduped = [replacement.get(i, article) for i, article in enumerate(articles) if i not in dropped]
+    logger.info(f"Merged {len(dropped)} near-duplicate articles into their originals, saving ~{saved} tokens")
+    return deduped, saved
+
+
+def _header(item: str) -> str:
+    # lines up to the one with the item's url ("POST 2: https://...", "URL: https://...")
+    lines = item.strip().splitlines()
+    for n, line in enumerate(lines):
+        if "http" in line:
+            return "\n".join(lines[:n + 1])
+    return lines[0] if lines else ""
+
+
+def dedupe_platform_content(content: str, threshold: Optional[float] = None) -> Tuple[str, int]:
+    """
+    Drop reddit posts / transcripts whose text repeats an earlier one (crossposts,
+    re-uploads). The duplicate's header line (with its url) stays, pointing at
+    the copy that was kept. Returns (content, tokens saved).
+    """
+    parts = PLATFORM_DIVIDER.split(content or "")
+    items = parts[::2]
+    groups = [g for g in near_duplicate_groups(items, threshold) if len(g) > 1]
+    if not groups:
+        return content, 0
+
+    saved = 0
+    for group in groups:
+        first = _header(items[group[0]]).splitlines()[-1]
+        for i in group[1:]:
+            saved += count_tokens(items[i])
+            items[i] = f"{_header(items[i])}\n(same content as {first[:120]} - omitted)"
+    parts[::2] = items
+    logger.info(f"Dropped {sum(len(g) - 1 for g in groups)} duplicate platform items, saving ~{saved} tokens")
+    return "".join(parts), saved
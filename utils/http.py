@@ -0,0 +1,179 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import logging
+import weakref
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# one transport for every tool: keep-alive pools shared by all calls, a cap on concurrent
+# requests per host, retries with jittered backoff and the same timeouts everywhere.
+# session() is the sync side (requests), async_client() the async side (httpx).
+
+TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 30))  # seconds to wait on a response (read / write / pool)
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+RETRIES = int(os.getenv("HTTP_RETRIES", 2))  # extra attempts after a failed one
+BACKOFF = float(os.getenv("HTTP_BACKOFF", 0.5))  # first retry waits up to this, doubling after
+MAX_BACKOFF = 30.0  # never wait longer than this, whatever Retry-After says
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 32))  # keep-alive connections kept open
+HOST_CONCURRENCY = int(os.getenv("HTTP_HOST_CONCURRENCY", 8))  # requests in flight per host
+# overrides per host ("www.reddit.com=4,api.exa.ai=16")
+HOST_LIMITS: Dict[str, int] = {}
+for _item in os.getenv("HTTP_HOST_LIMITS", "").split(","):
+    if "=" in _item:
+        _host, _limit = _item.split("=", 1)
+        HOST_LIMITS[_host.strip().lower()] = int(_limit)
+
+# worth another try: rate limits and server-side trouble, not client errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "deep-research-agent/0.1"
+
+
+def host_limit(host: str) -> int:
+    return HOST_LIMITS.get(host.lower().split(":")[0], HOST_CONCURRENCY)
+
+
+def backoff_delay(attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+    """
+    Seconds to wait before retry number attempt + 1: what the server asked for
+    (Retry-After, or X-Ratelimit-Reset once X-Ratelimit-Remaining hits 0), else
+    full jitter over an exponential window so retries from many callers spread out.
+    """
+    if headers is not None:
+        asked = headers.get("Retry-After")
+        if asked is None and headers.get("X-Ratelimit-Remaining") not in (None, "") and float(headers["X-Ratelimit-Remaining"]) < 1:
+            asked = headers.get("X-Ratelimit-Reset")
+        try:
+            if asked is not None:
+                return min(float(asked), MAX_BACKOFF)
+        except ValueError:
+            pass  # an http date; fall back to our own backoff
+    return random.uniform(0, min(MAX_BACKOFF, BACKOFF * 2 ** attempt))
+
+
+# --- sync: requests.Session ---
+
+class PooledAdapter(HTTPAdapter):
+    """
+    requests adapter with the transport policy: per-host concurrency caps,
+    retries on connection errors, timeouts and RETRY_STATUSES, and a default
+    timeout for calls that don't pass one. A slot is held only while a request
+    is on the wire, not while it waits to retry.
+    """
+
+    def __init__(self):
+        super().__init__(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(host_limit(host))
+            return self._semaphores[host]
+
+    def send(self, request, timeout=None, **kwargs):
+        timeout = timeout if timeout is not None else (CONNECT_TIMEOUT, TIMEOUT)
+        host = urlparse(request.url).netloc
+        semaphore = self._semaphore(host)
+        for attempt in range(RETRIES + 1):
+            try:
+                with semaphore:
+                    response = super().send(request, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+                reason = type(e).__name__
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == RETRIES:
+                    return response
+                delay = backoff_delay(attempt, response.headers)
+                reason = f"http {response.status_code}"
+                response.close()
+            logger.warning(f"{request.method} {host}: {reason}, retrying in {delay:.1f}s ({attempt + 1}/{RETRIES})")
+            time.sleep(delay)
+
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def session() -> requests.Session:
+    """The process-wide sync session (thread-safe, shared by every tool)."""
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                shared = requests.Session()
+                shared.headers["User-Agent"] = USER_AGENT
+                adapter = PooledAdapter()
+                shared.mount("https://", adapter)
+                shared.mount("http://", adapter)
+                _SESSION = shared
+    return _SESSION
+
+
+# --- async: httpx.AsyncClient ---
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """The async twin of PooledAdapter, wrapping httpx's connection pool."""
+
+    def __init__(self):
+        limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+        self._transport = httpx.AsyncHTTPTransport(limits=limits)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.netloc.decode("ascii")
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(host_limit(host))
+        semaphore = self._semaphores[host]
+        for attempt in range(RETRIES + 1):
+            try:
+                async with semaphore:
+                    response = await self._transport.handle_async_request(request)
+            except (httpx.TransportError,) as e:
+                if attempt == RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+                reason = type(e).__name__
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == RETRIES:
+                    return response
+                delay = backoff_delay(attempt, response.headers)
+                reason = f"http {response.status_code}"
+                await response.aclose()
+            logger.warning(f"{request.method} {host}: {reason}, retrying in {delay:.1f}s ({attempt + 1}/{RETRIES})")
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+# httpx connections belong to the event loop that opened them, so every loop gets its own
+# client (the api has one loop; asyncio.run() in scripts and tests makes new ones)
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def async_client() -> httpx.AsyncClient:
+    """The shared async client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            transport=PooledTransport(),
+            timeout=httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT),
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+        )
+        _ASYNC_CLIENTS[loop] = client
+    return client
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.value: Any = None
+        self.event = threading.Event()
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+
+class InFlight:
+    """
+    Keys (search queries, canonical urls) being fetched right now, so that a
+    caller asking for one while another caller is fetching it waits for that
+    fetch instead of repeating it. The caches dedupe fetches that have
+    finished; this dedupes the ones still on the wire, which is what a batch
+    of related queries running side by side mostly produces.
+
+    claim() splits keys into the ones the caller now owns (fetch them, then
+    resolve() every one, with None on failure) and the ones someone else is
+    fetching (wait() / await_() for their value). Threads and coroutines can
+    share one instance.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.shared = 0  # keys answered by someone else's fetch
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, keys: Iterable[str]) -> Tuple[List[str], Dict[str, _Call]]:
+        mine: List[str] = []
+        theirs: Dict[str, _Call] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                call = self._calls.get(key)
+                if call is None:
+                    self._calls[key] = _Call()
+                    mine.append(key)
+                else:
+                    theirs[key] = call
+        return mine, theirs
+
+    def resolve(self, key: str, value: Any) -> None:
+        """Hand the result for a claimed key to everyone waiting on it (None: fetch failed, fetch it yourself)."""
+        with self._lock:
+            call = self._calls.pop(key, None)
+            if call is None:
+                return
+            call.value = value
+            call.event.set()
+            waiters, call.waiters = call.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_set_result, future, value)
+
+    def resolve_all(self, keys: Iterable[str], values: Dict[str, Any]) -> None:
+        for key in keys:
+            self.resolve(key, values.get(key))
+
+    def wait(self, call: _Call, timeout: Optional[float] = None) -> Any:
+        if not call.event.wait(timeout):
+            return None
+        if call.value is not None:
+            self._count_shared()
+        return call.value
+
+    async def await_(self, call: _Call, timeout: Optional[float] = None) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if call.event.is_set():
+                future.set_result(call.value)
+            else:
+                call.waiters.append((loop, future))
+        try:
+            value = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        if value is not None:
+            self._count_shared()
+        return value
+
+    def _count_shared(self) -> None:
+        # waiters on different threads finish together; += alone would lose counts
+        with self._lock:
+            self.shared += 1
+
+
+def _set_result(future: asyncio.Future, value: Any) -> None:
+    if not future.done():
+        future.set_result(value)
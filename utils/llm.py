@@ -1,28 +1,294 @@
-from langchain_groq import ChatGroq
-from langchain_google_genai import ChatGoogleGenerativeAI
 import os
+import json
+import time
+import asyncio
+import threading
+import contextvars
+from typing import Any, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
+from utils.budget import count_tokens
+from utils.rate_limit import AdaptiveLimiter
+
 load_dotenv()
 
+# the provider sdks are imported on first use: together they take over a second to import,
+# and most imports of utils (tools, jobs, the api) never build a client
+
+# the providers' free-tier requests/min and tokens/min per model. not applied unless asked for:
+# paid keys allow far more, and the adaptive concurrency window finds the real limit from the 429s
+FREE_TIER_LIMITS: Dict[str, Tuple[float, float]] = {
+    "llama-3.1-8b-instant": (30, 6_000),
+    "llama-3.3-70b-versatile": (30, 12_000),
+    "openai/gpt-oss-120b": (30, 8_000),
+    "gemini-2.0-flash": (15, 1_000_000),
+    "gemini-2.5-flash": (10, 250_000),
+}
+
+
+def _parse_rate_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """'free' for FREE_TIER_LIMITS and/or 'model=rpm/tpm' items, comma separated; later items win."""
+    limits: Dict[str, Tuple[float, float]] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if item == "free":
+            limits.update(FREE_TIER_LIMITS)
+        elif "=" in item:
+            model, limits_ = item.split("=", 1)
+            rpm, _, tpm = limits_.partition("/")
+            limits[model.strip()] = (float(rpm or 0), float(tpm or 0))
+    return limits
+
+
+# static rpm/tpm caps, shared by every run in the process, are opt-in: LLM_RATE_LIMITS="free" or
+# "llama-3.1-8b-instant=30/6000,gemini-2.0-flash=2000/4000000". without them a model only gets
+# the adaptive concurrency window
+RATE_LIMITS = _parse_rate_limits(os.getenv("LLM_RATE_LIMITS", ""))
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))  # calls in flight per model, before any 429
+RETRIES = int(os.getenv("LLM_RETRIES", 4))  # 429s and transient errors retried through the limiter
+OUTPUT_ESTIMATE = 1024  # tokens reserved for an answer until the call reports its real usage
+
+_LIMITERS: Dict[str, AdaptiveLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def llm_limiter(model: str) -> AdaptiveLimiter:
+    """The process-wide limiter for one model."""
+    with _LIMITERS_LOCK:
+        if model not in _LIMITERS:
+            rpm, tpm = RATE_LIMITS.get(model, (0, 0))
+            _LIMITERS[model] = AdaptiveLimiter(model, rpm=rpm, tpm=tpm, max_concurrency=MAX_CONCURRENCY)
+        return _LIMITERS[model]
+
+
+def _model_of(llm) -> str:
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or llm._llm_type
+    return str(model).removeprefix("models/")
+
+
+def _estimate_tokens(llm, messages, kwargs: dict) -> int:
+    prompt = sum(count_tokens(m.content if isinstance(m.content, str) else str(m.content)) + 4 for m in messages)
+    if kwargs.get("tools"):
+        prompt += count_tokens(json.dumps(kwargs["tools"], default=str))
+    return prompt + (kwargs.get("max_tokens") or getattr(llm, "max_tokens", None) or OUTPUT_ESTIMATE)
+
+
+def _usage(message) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    # groq raises RateLimitError (status_code 429), google api core ResourceExhausted (code 429)
+    return (getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429
+            or type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests"))
+
+
+def _is_transient(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    return (isinstance(status, int) and status >= 500) or type(error).__name__ in (
+        "APIConnectionError", "APITimeoutError", "InternalServerError", "ServiceUnavailable")
+
+
+def _backoff(attempt: int, headers=None) -> float:
+    # utils.http brings requests and httpx, which nothing importing utils for the api needs yet
+    from utils.http import backoff_delay
+
+    return backoff_delay(attempt, headers)
+
+
+def _retry_after(error: Exception, attempt: int) -> float:
+    try:
+        if getattr(error, "retry_after", None) is not None:
+            return float(error.retry_after)
+    except (TypeError, ValueError):
+        pass
+    return _backoff(attempt, getattr(getattr(error, "response", None), "headers", None))
+
+
+# set while a limited call runs, so a model whose _generate calls its own _stream
+# (groq with streaming=True) or the default _agenerate -> _generate hop doesn't queue twice
+_IN_CALL = contextvars.ContextVar("llm_rate_limited_call", default=False)
+
+
+class _RateLimited:
+    """
+    Chat model mixin that sends every provider call through the model's
+    AdaptiveLimiter: invoke, batch, streams, tool-bound and structured-output
+    runnables all end up in one of these four methods. See rate_limited().
+    """
+
+    def _retry_wait(self, limiter: AdaptiveLimiter, error: Exception, attempt: int, started: float,
+                    streamed: bool = False) -> float:
+        # seconds to sleep before the next attempt; re-raises what we shouldn't retry
+        if streamed or attempt == RETRIES:
+            raise error
+        if _is_rate_limit(error):
+            limiter.throttled(started, _retry_after(error, attempt))
+            return 0.0  # the limiter's pause holds the next attempt back
+        if _is_transient(error):
+            return _backoff(attempt)
+        raise error
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        kwargs = {**_CALL_KWARGS.get(type(self), {}), **kwargs}
+        if _IN_CALL.get():
+            return super()._generate(messages, stop, run_manager, **kwargs)
+        limiter = llm_limiter(_model_of(self))
+        estimate = _estimate_tokens(self, messages, kwargs)
+        for attempt in range(RETRIES + 1):
+            started = limiter.acquire(estimate)
+            token = _IN_CALL.set(True)
+            try:
+                result = super()._generate(messages, stop, run_manager, **kwargs)
+            except Exception as e:
+                wait = self._retry_wait(limiter, e, attempt, started)
+            else:
+                limiter.succeeded()
+                limiter.settle(estimate, _usage(result.generations[0].message) if result.generations else None)
+                return result
+            finally:
+                _IN_CALL.reset(token)
+                limiter.release()
+            time.sleep(wait)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        kwargs = {**_CALL_KWARGS.get(type(self), {}), **kwargs}
+        if _IN_CALL.get():
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+        limiter = llm_limiter(_model_of(self))
+        estimate = _estimate_tokens(self, messages, kwargs)
+        for attempt in range(RETRIES + 1):
+            started = await limiter.aacquire(estimate)
+            token = _IN_CALL.set(True)
+            try:
+                result = await super()._agenerate(messages, stop, run_manager, **kwargs)
+            except Exception as e:
+                wait = self._retry_wait(limiter, e, attempt, started)
+            else:
+                limiter.succeeded()
+                limiter.settle(estimate, _usage(result.generations[0].message) if result.generations else None)
+                return result
+            finally:
+                _IN_CALL.reset(token)
+                limiter.release()
+            await asyncio.sleep(wait)
+
+    # streams only read the flag: a generator's context can change between chunks
+    # (the default _astream runs each next() of _stream in an executor), so it can't reset one
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        kwargs = {**_CALL_KWARGS.get(type(self), {}), **kwargs}
+        if _IN_CALL.get():
+            yield from super()._stream(messages, stop, run_manager, **kwargs)
+            return
+        limiter = llm_limiter(_model_of(self))
+        estimate = _estimate_tokens(self, messages, kwargs)
+        for attempt in range(RETRIES + 1):
+            started = limiter.acquire(estimate)
+            used: Optional[int] = None
+            streamed = False
+            try:
+                for chunk in super()._stream(messages, stop, run_manager, **kwargs):
+                    streamed = True
+                    # chunk usage is a delta (AIMessageChunk addition sums it)
+                    if _usage(chunk.message) is not None:
+                        used = (used or 0) + _usage(chunk.message)
+                    yield chunk
+            except Exception as e:
+                wait = self._retry_wait(limiter, e, attempt, started, streamed)
+            else:
+                limiter.succeeded()
+                limiter.settle(estimate, used)
+                return
+            finally:
+                limiter.release()
+            time.sleep(wait)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        kwargs = {**_CALL_KWARGS.get(type(self), {}), **kwargs}
+        if _IN_CALL.get():
+            async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+                yield chunk
+            return
+        limiter = llm_limiter(_model_of(self))
+        estimate = _estimate_tokens(self, messages, kwargs)
+        for attempt in range(RETRIES + 1):
+            started = await limiter.aacquire(estimate)
+            used: Optional[int] = None
+            streamed = False
+            try:
+                async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+                    streamed = True
+                    if _usage(chunk.message) is not None:
+                        used = (used or 0) + _usage(chunk.message)
+                    yield chunk
+            except Exception as e:
+                wait = self._retry_wait(limiter, e, attempt, started, streamed)
+            else:
+                limiter.succeeded()
+                limiter.settle(estimate, used)
+                return
+            finally:
+                limiter.release()
+            await asyncio.sleep(wait)
+
+
+_LIMITED_CLASSES: Dict[tuple, type] = {}
+# keyword arguments added to every provider call, per limited class (see init_gemini); kept out of
+# the class body, where pydantic would turn them into private attributes
+_CALL_KWARGS: Dict[type, Dict[str, Any]] = {}
+
+
+def rate_limited(cls: type, **call_kwargs) -> type:
+    """
+    A subclass of the chat model class `cls` whose calls go through the shared
+    per-model limiter (llm_limiter). Only the call paths `cls` implements itself
+    are wrapped, so langchain's checks for native streaming support still hold.
+    `call_kwargs` are passed to every provider call.
+    """
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+    key = (cls, tuple(sorted(call_kwargs.items())))
+    if key not in _LIMITED_CLASSES:
+        namespace: Dict[str, Any] = {
+            name: getattr(BaseChatModel, name)
+            for name in ("_generate", "_agenerate", "_stream", "_astream")
+            if getattr(cls, name) is getattr(BaseChatModel, name)
+        }
+        namespace["__module__"] = __name__
+        _LIMITED_CLASSES[key] = type(f"RateLimited{cls.__name__}", (_RateLimited, cls), namespace)
+        _CALL_KWARGS[_LIMITED_CLASSES[key]] = call_kwargs
+    return _LIMITED_CLASSES[key]
+
+
 def init_groq(model: str = "openai/gpt-oss-120b", temperature: float = 0.7):
     # init groq llm for fast research
-    return ChatGroq(
+    from langchain_groq import ChatGroq
+
+    return rate_limited(ChatGroq)(
         model=model,
         api_key=os.getenv("GROQ_API_KEY"),
         temperature=temperature,
         max_tokens=None,
         timeout=None,
-        max_retries=2,
+        max_retries=0,  # the limiter retries, so it sees every 429 and can back off for all runs
     )
 
 def init_gemini(model: str = "gemini-2.5-flash", temperature: float = 0.7):
     # init gemini for final report writing
-    return ChatGoogleGenerativeAI(
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    # the sdk ignores the model's max_retries: its _chat_with_retry reads them from the call kwargs
+    # (default 6, with backoff and retry-after sleeps inside our limiter slot). one attempt and no
+    # sleeping there, so every 429 reaches the limiter, which retries and backs off for all runs
+    limited = rate_limited(ChatGoogleGenerativeAI, max_retries=1, wait_exponential_max=0)
+    return limited(
         model=model,
         api_key=os.getenv("GOOGLE_API_KEY"),
         temperature=temperature,
         max_tokens=None,
         timeout=None,
-        max_retries=2,
+        max_retries=1,
     )
@@ -0,0 +1,221 @@
+import asyncio
+import functools
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+except ImportError:  # pip install prometheus-client
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    Counter = Gauge = Histogram = generate_latest = None
+
+METRICS_ENABLED = Histogram is not None
+
+# seconds; whole nodes run from milliseconds (url selection) to minutes (react planner, report)
+NODE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOOL_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 30, 50)
+
+
+class _Noop:
+    # stands in for every metric when prometheus-client isn't installed
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, *args) -> None:
+        pass
+
+    def inc(self, *args) -> None:
+        pass
+
+    def dec(self, *args) -> None:
+        pass
+
+    def set(self, *args) -> None:
+        pass
+
+
+def _metric(kind, name: str, doc: str, labels=(), **kwargs):
+    if not METRICS_ENABLED:
+        return _Noop()
+    return kind(name, doc, list(labels), **kwargs)
+
+
+NODE_SECONDS = _metric(Histogram, "research_node_duration_seconds", "Wall time of one graph node run",
+                       ["node"], buckets=NODE_BUCKETS)
+NODE_ERRORS = _metric(Counter, "research_node_errors_total", "Errors recorded or raised by a graph node", ["node"])
+TOOL_SECONDS = _metric(Histogram, "research_tool_duration_seconds", "Wall time of one tool call, cache hits included",
+                       ["tool"], buckets=TOOL_BUCKETS)
+TOOL_ERRORS = _metric(Counter, "research_tool_errors_total", "Tool calls that raised or returned an error", ["tool"])
+LLM_SECONDS = _metric(Histogram, "research_llm_duration_seconds", "Wall time of one llm call",
+                      ["model", "node"], buckets=LLM_BUCKETS)
+LLM_ERRORS = _metric(Counter, "research_llm_errors_total", "Llm calls that raised", ["model", "node"])
+LLM_WAIT_SECONDS = _metric(Histogram, "research_llm_rate_limit_wait_seconds",
+                           "Time an llm call waited in the rate limiter before it was sent", ["model"],
+                           buckets=TOOL_BUCKETS)
+LLM_THROTTLED = _metric(Counter, "research_llm_throttled_total", "Llm calls the provider answered with a 429", ["model"])
+LLM_CONCURRENCY = _metric(Gauge, "research_llm_concurrency_limit", "Current adaptive concurrency window per model",
+                          ["model"])
+RUNS_IN_FLIGHT = _metric(Gauge, "research_runs_in_flight", "Graph runs currently executing")
+RUNS = _metric(Counter, "research_runs_total", "Finished graph runs by outcome (completed, error, cancelled)", ["outcome"])
+COALESCED = _metric(Counter, "research_runs_coalesced_total",
+                    "Requests that joined an identical run already in flight instead of starting one", ["endpoint"])
+PLANNED_URLS = _metric(Histogram, "research_planned_urls", "Urls the planner picked per run, by kind",
+                       ["kind"], buckets=COUNT_BUCKETS)
+ARTICLES_CRAWLED = _metric(Histogram, "research_articles_crawled", "Articles the crawler fetched per run",
+                           buckets=COUNT_BUCKETS)
+
+
+def render() -> bytes:
+    """The prometheus text exposition of every metric in the default registry."""
+    if not METRICS_ENABLED:
+        return b""
+    return generate_latest()
+
+
+def _is_error(result: Any) -> bool:
+    # tools report failures as "Error: ..." strings (serper as {"error": ...} json)
+    return isinstance(result, str) and (result.startswith("Error") or result.startswith('{"error"'))
+
+
+def timed_tool(name: str):
+    """Record a tool function's latency and errors under `name`. Works on sync and async functions."""
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException:
+                    TOOL_ERRORS.labels(name).inc()
+                    raise
+                finally:
+                    TOOL_SECONDS.labels(name).observe(time.perf_counter() - start)
+                if _is_error(result):
+                    TOOL_ERRORS.labels(name).inc()
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                TOOL_ERRORS.labels(name).inc()
+                raise
+            finally:
+                TOOL_SECONDS.labels(name).observe(time.perf_counter() - start)
+            if _is_error(result):
+                TOOL_ERRORS.labels(name).inc()
+            return result
+        return wrapper
+    return decorate
+
+
+def _node_of(metadata: Optional[dict]) -> str:
+    # top-level node of a run, also for runs inside a subgraph (the react planner's "agent" step)
+    ns = (metadata or {}).get("langgraph_checkpoint_ns", "")
+    return ns.split("|")[0].split(":")[0] or (metadata or {}).get("langgraph_node", "") or "none"
+
+
+class MetricsCallback(BaseCallbackHandler):
+    """
+    Callback handler that feeds the graph metrics: in-flight runs, per-node wall
+    time and errors, per-llm-call latency, and the planner/crawler counts.
+
+    Pass it in the run config (config["callbacks"]); one instance serves every run.
+    Nodes catch their own exceptions and append to "errors", so a node counts as
+    failed when it raises or when its output has errors its input didn't.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs: Dict[UUID, float] = {}
+        self._nodes: Dict[UUID, tuple] = {}
+        self._llms: Dict[UUID, tuple] = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       metadata: Optional[dict] = None, **kwargs):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        with self._lock:
+            if parent_run_id is None:
+                self._runs[run_id] = time.perf_counter()
+                RUNS_IN_FLIGHT.inc()
+            elif node and kwargs.get("name") == node and "|" not in metadata.get("langgraph_checkpoint_ns", ""):
+                seen = set(inputs.get("errors") or []) if isinstance(inputs, dict) else set()
+                self._nodes[run_id] = (node, time.perf_counter(), seen)
+
+    def _end_chain(self, run_id: UUID, outputs: Any, outcome: str) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+            node_run = self._nodes.pop(run_id, None)
+        if run is not None:
+            RUNS_IN_FLIGHT.dec()
+            RUNS.labels(outcome).inc()
+        if node_run is None or outcome == "cancelled":
+            return
+        error = outcome == "error"
+        node, start, seen = node_run
+        NODE_SECONDS.labels(node).observe(time.perf_counter() - start)
+        output = outputs if isinstance(outputs, dict) else {}
+        new_errors = [e for e in output.get("errors") or [] if e not in seen]
+        if error or new_errors:
+            NODE_ERRORS.labels(node).inc(max(1, len(new_errors)))
+        if error:
+            return
+        if node == "planner":
+            PLANNED_URLS.labels("articles").observe(len(output.get("selected_urls") or []))
+            for name, urls in (output.get("extractor_urls") or {}).items():
+                PLANNED_URLS.labels(name).observe(len(urls))
+        elif node == "crawler":
+            ARTICLES_CRAWLED.observe(len([a for a in output.get("articles") or [] if not a.get("error")]))
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._end_chain(run_id, outputs, "completed")
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs):
+        # a client that disconnects from a stream cancels the run; that's not a node failure
+        cancelled = isinstance(error, (asyncio.CancelledError, GeneratorExit))
+        self._end_chain(run_id, None, "cancelled" if cancelled else "error")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs):
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or (kwargs.get("invocation_params") or {}).get("model") or "unknown"
+        with self._lock:
+            self._llms[run_id] = (str(model).split("/")[-1], _node_of(metadata), time.perf_counter())
+
+    def _end_llm(self, run_id: UUID, error: bool) -> None:
+        with self._lock:
+            llm_run = self._llms.pop(run_id, None)
+        if llm_run is None:
+            return
+        model, node, start = llm_run
+        LLM_SECONDS.labels(model, node).observe(time.perf_counter() - start)
+        if error:
+            LLM_ERRORS.labels(model, node).inc()
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        self._end_llm(run_id, error=False)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        self._end_llm(run_id, error=True)
+
+
+_CALLBACK = MetricsCallback()
+
+
+def metrics_callback() -> MetricsCallback:
+    return _CALLBACK
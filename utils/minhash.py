@@ -0,0 +1,70 @@
+import hashlib
+import re
+from typing import Iterable, List, Set
+
+import numpy as np
+
+# signature length; similarity estimates are within ~0.05 of the true jaccard at 128
+NUM_PERM = 128
+# lsh: NUM_PERM = BANDS * rows; two texts become candidates if any band matches
+BANDS = 32
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# a < 2**29 and 32-bit shingle hashes keep a*h + b below 2**62, so uint64 math never wraps
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, 1 << 29, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 1 << 29, size=NUM_PERM).astype(np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+
+def char_shingles(text: str, k: int = 3) -> Set[str]:
+    """Overlapping k-char pieces, good for short texts like queries."""
+    text = " ".join(text.lower().split())
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def word_shingles(text: str, k: int = 5) -> Set[str]:
+    """Overlapping k-word pieces, good for documents."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def _hash32(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def signature(shingles: Iterable[str]) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint64 values) of a shingle set."""
+    hashes = np.fromiter((_hash32(s) for s in shingles), dtype=np.uint64)
+    if hashes.size == 0:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % np.uint64(_PRIME)
+    return (permuted & _MAX_HASH).min(axis=1)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated jaccard similarity of the sets behind two signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+def bands(sig: np.ndarray, n_bands: int = BANDS) -> List[str]:
+    """LSH band keys for a signature; equal keys mark candidate near-duplicates."""
+    rows = len(sig) // n_bands
+    return [
+        f"{i}:" + hashlib.blake2b(sig[i * rows:(i + 1) * rows].tobytes(), digest_size=8).hexdigest()
+        for i in range(n_bands)
+    ]
+
+
+def to_bytes(sig: np.ndarray) -> bytes:
+    return sig.astype(np.uint64).tobytes()
+
+
+def from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint64)
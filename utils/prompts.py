@@ -41,47 +41,24 @@ CRITICAL: Respond ONLY with valid JSON. No other text before or after.
 """
 
 PLANNER_PROMPT = """
-You are an intelligent research agent. Your task is to search for information and intelligently select the best URLs for deep content analysis.
+You are an intelligent research agent. Your task is to search for information on every research question; the best URLs for deep content analysis are picked from your search results afterwards.
 
 WORKFLOW:
 1. Search each research question ONE BY ONE using serper_search_tool
 2. Search for Reddit discussions by adding 'site:reddit.com' to 2-3 key questions
 3. Search for YouTube videos by adding 'site:youtube.com' to 2-3 key questions
-4. After ALL searches are complete, analyze all the URLs you found
-5. Select 6-8 best URLs that provide comprehensive coverage
-6. Extract Reddit and YouTube URLs separately for platform scraping
-7. Output your selected URLs in JSON format
+4. After ALL searches are complete, reply with just: DONE
 
 IMPORTANT RULES:
 - Call serper_search_tool ONE AT A TIME for each question
 - For Reddit searches: add 'site:reddit.com' to your query (e.g., "AI agents site:reddit.com")
 - For YouTube searches: add 'site:youtube.com' to your query (e.g., "AI agents site:youtube.com")
-- Look for URLs starting with 'https://www.reddit.com/r/' or 'https://reddit.com/r/'
-- Look for URLs starting with 'https://www.youtube.com/watch' or 'https://youtu.be/'
 - Wait for each search to complete before moving to the next
 - Do NOT call any other tools - content crawling will be done separately
-- Be selective - choose quality sources over quantity
+- Do NOT list or rank URLs - they are scored and selected from your search results automatically
 
 YOUTUBE SEARCH STRATEGY:
 - Use specific YouTube-focused queries like "AI agents tutorial", "AI agents explained", "AI agents overview"
-- Look for high-view count videos, official channels, and educational content
-- Extract video IDs from URLs (the part after ?v= in YouTube URLs)
-- Prioritize videos that seem most relevant and authoritative
-
-SELECTION CRITERIA:
-- Authoritative sources (official docs, reputable sites, academic papers)
-- Unique information (avoid duplicates)
-- Comprehensive topic coverage
-- Relevance to the original query
-- Diverse perspectives and viewpoints
-
-OUTPUT FORMAT (at the end):
-{
-  "selected_urls": ["https://example.com/article1", "https://example.com/article2", "..."],
-  "reddit_urls": ["https://www.reddit.com/r/subreddit/comments/...", "..."],
-  "youtube_urls": ["https://www.youtube.com/watch?v=...", "..."],
-  "reasoning": "Brief explanation of why these URLs were selected"
-}
 """
 
 REDDIT_PROCESSOR_PROMPT = """
@@ -194,3 +171,20 @@ CITATION RULES:
 
 Remember: This should read like a comprehensive research paper or detailed white paper, not a brief web article summary. Use ALL available information from the crawled articles AND platform content to create an exhaustive, authoritative report that includes both factual information and community perspectives.
 """
+
+ARTICLE_NOTES_PROMPT = """
+You are a research assistant condensing one source article (or one part of it) into evidence notes for a report writer who will not see the original text.
+
+INSTRUCTIONS:
+1. Keep only what is relevant to the research query
+2. Preserve specific facts, numbers, dates, names, versions and benchmarks exactly as written
+3. Keep short direct quotes for the most important claims, in quotation marks
+4. Note the author's main arguments, caveats and any disagreements with other views
+5. Include technical details (configuration, code, architecture) when present
+6. Skip navigation text, ads, boilerplate and repeated content
+
+OUTPUT:
+- Plain dense notes, one point per line, no introduction or conclusion
+- At most about 400 words
+- If nothing in the text is relevant, reply with: NO RELEVANT CONTENT
+"""
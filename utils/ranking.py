@@ -0,0 +1,156 @@
+import os
+import re
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from .text import terms
+from .urls import domain_of, normalize_url
+
+logger = logging.getLogger(__name__)
+
+# how much each signal counts towards a candidate's score (all signals are 0..1)
+WEIGHTS = {
+    "frequency": 0.35,  # share of the searches that returned the url (relative to the most returned one)
+    "rank": 0.30,       # mean reciprocal search position
+    "overlap": 0.20,    # question terms found in the result's title and snippet
+    "domain": 0.15,     # DOMAIN_QUALITY
+}
+
+# source quality per domain, 0..1. subdomains inherit (en.wikipedia.org -> wikipedia.org);
+# unlisted domains get DEFAULT_QUALITY. RANKING_DOMAIN_QUALITY ("example.com=0.9,spam.io=0")
+# adds or overrides entries
+DEFAULT_QUALITY = 0.5
+DOMAIN_QUALITY: Dict[str, float] = {
+    # reference, papers, standards
+    "wikipedia.org": 0.9, "arxiv.org": 0.9, "nature.com": 0.9, "science.org": 0.9, "acm.org": 0.85,
+    "ieee.org": 0.85, "nih.gov": 0.9, "who.int": 0.85, "w3.org": 0.85, "ietf.org": 0.85,
+    "semanticscholar.org": 0.8, "springer.com": 0.8, "sciencedirect.com": 0.8,
+    # docs and code
+    "github.com": 0.8, "developer.mozilla.org": 0.9, "python.org": 0.85, "readthedocs.io": 0.75,
+    "stackoverflow.com": 0.75, "huggingface.co": 0.75, "learn.microsoft.com": 0.8, "cloud.google.com": 0.8,
+    "aws.amazon.com": 0.8, "openai.com": 0.75, "anthropic.com": 0.75,
+    # news and analysis
+    "reuters.com": 0.8, "apnews.com": 0.8, "bbc.co.uk": 0.75, "bbc.com": 0.75, "nytimes.com": 0.75,
+    "theguardian.com": 0.7, "ft.com": 0.75, "economist.com": 0.75, "arstechnica.com": 0.7,
+    "technologyreview.com": 0.75, "theverge.com": 0.6, "techcrunch.com": 0.6, "wired.com": 0.65,
+    # blogs and aggregators
+    "medium.com": 0.45, "substack.com": 0.5, "dev.to": 0.5, "hashnode.dev": 0.45,
+    # social, thin or hard to crawl
+    "quora.com": 0.25, "pinterest.com": 0.05, "facebook.com": 0.15, "instagram.com": 0.1,
+    "tiktok.com": 0.1, "x.com": 0.2, "twitter.com": 0.2, "linkedin.com": 0.3, "scribd.com": 0.2,
+    "slideshare.net": 0.2, "coursehero.com": 0.1,
+}
+# by public suffix, when the domain itself isn't listed
+SUFFIX_QUALITY = {".gov": 0.85, ".edu": 0.8, ".mil": 0.8, ".ac.uk": 0.8, ".gov.uk": 0.85, ".int": 0.75}
+
+for _item in os.getenv("RANKING_DOMAIN_QUALITY", "").split(","):
+    if "=" in _item:
+        _domain, _quality = _item.split("=", 1)
+        DOMAIN_QUALITY[_domain.strip().lower()] = float(_quality)
+
+_SITE = re.compile(r"\bsite:\S+")
+
+
+@lru_cache(maxsize=4096)
+def domain_quality(domain: str) -> float:
+    labels = domain.split(".")
+    for i in range(len(labels) - 1):
+        quality = DOMAIN_QUALITY.get(".".join(labels[i:]))
+        if quality is not None:
+            return quality
+    for suffix, quality in SUFFIX_QUALITY.items():
+        if domain.endswith(suffix):
+            return quality
+    return DEFAULT_QUALITY
+
+
+def _terms(text: str) -> frozenset:
+    # case, stopwords and plurals don't matter
+    return frozenset(terms(_SITE.sub(" ", text)))
+
+
+def rank_candidates(candidates: Sequence[dict]) -> List[dict]:
+    """
+    Score search hits and return one entry per canonical url, best first.
+
+    A hit is {"url", "query", "rank", "title"?, "snippet"?}: one organic result
+    of one search, rank being its 0-based position. Entries are {"url",
+    "domain", "score", "searches", "signals"}. Neither the scores nor the
+    spelling kept for a url depend on the order of the hits, and ties break on
+    the url, so the same searches always give the same ranking. One pass over
+    the hits plus a sort, so thousands of candidates are fine.
+    """
+    query_terms: Dict[str, frozenset] = {}
+    keys: Dict[str, str] = {}  # url -> canonical url; the same urls come back from many searches
+    groups: Dict[str, dict] = {}
+    for hit in candidates:
+        url = hit.get("url")
+        if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+            continue
+        key = keys.get(url)
+        if key is None:
+            key = keys[url] = normalize_url(url)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {"url": url, "queries": set(), "reciprocal": [], "overlap": 0.0}
+        elif url < group["url"]:
+            group["url"] = url  # the same spelling whatever order the hits came in
+        query = hit.get("query") or ""
+        group["queries"].add(query)
+        group["reciprocal"].append(1.0 / (1 + max(0, int(hit.get("rank") or 0))))
+        if query not in query_terms:
+            query_terms[query] = _terms(query)
+        wanted = query_terms[query]
+        if wanted:
+            found = _terms(f"{hit.get('title') or ''} {hit.get('snippet') or ''}")
+            group["overlap"] = max(group["overlap"], len(wanted & found) / len(wanted))
+
+    if not groups:
+        return []
+    most_searches = max(len(g["queries"]) for g in groups.values())
+    ranked = []
+    for group in groups.values():
+        domain = domain_of(group["url"])
+        signals = {
+            "frequency": len(group["queries"]) / most_searches,
+            "rank": sum(sorted(group["reciprocal"])) / len(group["reciprocal"]),
+            "overlap": group["overlap"],
+            "domain": domain_quality(domain),
+        }
+        ranked.append({
+            "url": group["url"],
+            "domain": domain,
+            # rounded so float summation order can't reorder near-ties
+            "score": round(sum(WEIGHTS[name] * value for name, value in signals.items()), 6),
+            "searches": len(group["queries"]),
+            "signals": {name: round(value, 3) for name, value in signals.items()},
+        })
+    ranked.sort(key=lambda entry: (-entry["score"], entry["url"]))
+    return ranked
+
+
+def diversify(ranked: Sequence[dict], max_urls: int = 8, max_per_domain: int = 2,
+              domain_caps: Optional[Dict[str, int]] = None) -> List[str]:
+    """
+    Round-robin over domains: every domain's best url, then every domain's
+    second best, and so on up to max_per_domain (domain_caps overrides it per
+    domain), each round in score order, until max_urls are picked. `ranked`
+    comes from rank_candidates (best first).
+    """
+    by_domain: Dict[str, List[dict]] = {}
+    for entry in ranked:
+        by_domain.setdefault(entry["domain"], []).append(entry)
+    caps = domain_caps or {}
+    selected: List[str] = []
+    for depth in range(max([max_per_domain, *caps.values()])):
+        layer = [entries[depth] for domain, entries in by_domain.items()
+                 if depth < len(entries) and depth < caps.get(domain, max_per_domain)]
+        if not layer:
+            break
+        layer.sort(key=lambda entry: (-entry["score"], entry["url"]))
+        for entry in layer:
+            selected.append(entry["url"])
+            if len(selected) >= max_urls:
+                return selected
+    return selected
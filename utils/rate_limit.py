@@ -0,0 +1,218 @@
+import asyncio
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from utils.metrics import LLM_CONCURRENCY, LLM_THROTTLED, LLM_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class HostRateLimiter:
+    """
+    Spaces requests to the same host at least 1/rate seconds apart.
+
+    Callers reserve the next free slot for their host under a lock and then
+    sleep until it arrives, so waiters are served in arrival order. Works from
+    threads (acquire) and coroutines (aacquire) at the same time. When a server
+    says slow down (429 / rate limit headers), penalize() pushes the host's
+    next slot out.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _reserve(self, host: str) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.interval
+            return slot - now
+
+    def acquire(self, host: str) -> None:
+        delay = self._reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self, host: str) -> None:
+        delay = self._reserve(host)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def penalize(self, host: str, seconds: float) -> None:
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._next_slot.get(host, 0.0):
+                self._next_slot[host] = until
+                logger.warning(f"Rate limited by {host}, pausing requests for {seconds:.1f}s")
+
+
+class _Bucket:
+    # token bucket refilled continuously at `per_minute`; taking more than is left
+    # reserves future refill (the level goes negative) and returns how long to wait for it
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def take(self, amount: float, now: float) -> float:
+        if self.rate <= 0:
+            return 0.0  # unlimited
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+        self.level -= min(amount, self.capacity)  # one huge call waits a full minute, not forever
+        return max(0.0, -self.level / self.rate)
+
+    def give_back(self, amount: float) -> None:
+        if self.rate > 0:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class AdaptiveLimiter:
+    """
+    Admission control for one rate-limited api (an llm model), shared by every
+    thread and coroutine in the process.
+
+    Calls wait in one FIFO queue for a concurrency slot, then reserve from two
+    token buckets (requests/min and tokens/min) and sleep until the reservation
+    comes due. The concurrency window adapts AIMD-style: every success widens it
+    by 1/window (about +1 per window of calls), a 429 halves it and pauses new
+    calls for the server's retry-after. Calls that started before the last cut
+    don't cut again, so one burst of 429s halves the window once.
+    """
+
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0, max_concurrency: int = 8):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.window = float(self.max_concurrency)
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._in_flight = 0
+        self._waiters: Deque[Callable[[], None]] = deque()
+        self._paused_until = 0.0
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+
+    # --- concurrency slots, handed out in arrival order ---
+
+    def _take_slot(self, wake: Callable[[], None]) -> bool:
+        # under self._lock: take a free slot, or queue up behind everyone already waiting
+        if not self._waiters and self._in_flight < int(self.window):
+            self._in_flight += 1
+            return True
+        self._waiters.append(wake)
+        return False
+
+    def _admit_waiters(self) -> List[Callable[[], None]]:
+        # under self._lock: hand free slots to the oldest waiters; the caller wakes them after unlocking
+        woken = []
+        while self._waiters and self._in_flight < int(self.window):
+            self._in_flight += 1
+            woken.append(self._waiters.popleft())
+        return woken
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            woken = self._admit_waiters()
+        for wake in woken:
+            wake()
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            return max(
+                self._paused_until - now,
+                self._requests.take(1, now),
+                self._tokens.take(tokens, now),
+                0.0,
+            )
+
+    def acquire(self, tokens: float = 0) -> float:
+        """Block until the call may start; returns its start time for throttled()."""
+        start = time.monotonic()
+        event = threading.Event()
+        with self._lock:
+            granted = self._take_slot(event.set)
+        if not granted:
+            event.wait()
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        LLM_WAIT_SECONDS.labels(self.name).observe(time.monotonic() - start)
+        return time.monotonic()
+
+    async def aacquire(self, tokens: float = 0) -> float:
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        granted_fut = loop.create_future()
+
+        def grant() -> None:
+            if not granted_fut.done():
+                granted_fut.set_result(None)
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(grant)
+
+        with self._lock:
+            granted = self._take_slot(wake)
+        if not granted:
+            try:
+                await granted_fut
+            except asyncio.CancelledError:
+                # still queued: just leave; already handed a slot: give it back
+                with self._lock:
+                    queued = wake in self._waiters
+                    if queued:
+                        self._waiters.remove(wake)
+                if not queued:
+                    self._release_slot()
+                raise
+        try:
+            delay = self._reserve(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self._release_slot()
+            raise
+        LLM_WAIT_SECONDS.labels(self.name).observe(time.monotonic() - start)
+        return time.monotonic()
+
+    def release(self) -> None:
+        """Give back the slot taken by acquire() / aacquire(), however the call ended."""
+        self._release_slot()
+
+    # --- feedback ---
+
+    def settle(self, estimated: float, used: Optional[float]) -> None:
+        """Correct the tokens/min bucket once the real usage of a call is known."""
+        if used is None:
+            return
+        with self._lock:
+            self._tokens.give_back(estimated - used)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.window = min(float(self.max_concurrency), self.window + 1.0 / self.window)
+            LLM_CONCURRENCY.labels(self.name).set(int(self.window))
+            woken = self._admit_waiters()
+        for wake in woken:
+            wake()
+
+    def throttled(self, started: float, retry_after: float) -> None:
+        """A call that started at `started` got a 429: pause everyone, and shrink the window once per burst."""
+        LLM_THROTTLED.labels(self.name).inc()
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + retry_after)
+            if started >= self._last_cut:
+                self.window = max(1.0, self.window / 2)
+                self._last_cut = now
+                LLM_CONCURRENCY.labels(self.name).set(int(self.window))
+                logger.warning(f"Rate limited by {self.name}: concurrency cut to {int(self.window)}, "
+                               f"pausing for {retry_after:.1f}s")
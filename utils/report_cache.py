@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Optional
+
+from .cache import SQLiteCache, get_cache
+from .minhash import bands, char_shingles, from_bytes, signature, similarity, to_bytes
+from .text import STOPWORDS, words
+
+logger = logging.getLogger(__name__)
+
+# the exact key only drops these: "how does X work" and "why does X work" are different questions
+FILLER = {"a", "an", "the", "please"}
+# words that say what kind of answer is wanted; a near match must ask with the same ones
+INTENT_WORDS = {"what", "how", "why", "when", "where", "which", "who", "explain", "guide", "research", "compare", "vs"}
+
+
+def exact_query(query: str) -> str:
+    """Lowercase, drop punctuation and articles, fold plurals: 'How do MCP servers work?' -> 'how do mcp server work'."""
+    return " ".join(word for word in words(query) if word not in FILLER)
+
+
+def normalize_query(query: str) -> str:
+    """exact_query without stopwords, for near matches: 'MCP servers for AI agents' -> 'mcp server ai agent'."""
+    return _content(exact_query(query))
+
+
+def _content(exact: str) -> str:
+    return " ".join(token for token in exact.split() if token not in STOPWORDS)
+
+
+# near matches also need this much word overlap: "react state management" and "vue state
+# management" share most character shingles but ask about different things
+MIN_WORD_OVERLAP = 0.6
+
+
+def _numbers(normalized: str) -> set:
+    # "python 3.12" and "python 3.13" look alike but are different questions
+    return {token for token in normalized.split() if any(c.isdigit() for c in token)}
+
+
+def _intent(exact: str) -> set:
+    return {token for token in exact.split() if token in INTENT_WORDS}
+
+
+def _same_question(a: str, b: str) -> bool:
+    # a and b are exact_query forms
+    if _intent(a) != _intent(b):
+        return False
+    a, b = _content(a), _content(b)
+    words_a, words_b = set(a.split()), set(b.split())
+    if not words_a or not words_b or _numbers(a) != _numbers(b):
+        return False
+    return len(words_a & words_b) / len(words_a | words_b) >= MIN_WORD_OVERLAP
+
+
+class ReportCache:
+    """
+    Finished reports keyed by exact_query, with near-duplicate lookup.
+
+    Report bodies live in a SQLiteCache (ttl, lru, compression, counters); next
+    to it a small table keeps every query's MinHash signature and LSH band keys,
+    so "MCP servers in ai agents" finds the report written for "MCP servers for
+    AI agents" and "MCP servers used in AI agents" the same one. A near match
+    needs estimated jaccard >= `threshold` on the queries' character shingles,
+    MIN_WORD_OVERLAP of their words, the same numbers and the same INTENT_WORDS
+    in both. Signatures of reports the store evicts or expires are dropped on
+    the next write.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, threshold: Optional[float] = None, max_entries: Optional[int] = None):
+        self.threshold = threshold if threshold is not None else float(os.getenv("REPORT_CACHE_SIMILARITY", 0.7))
+        self.store: SQLiteCache = get_cache(
+            "reports",
+            ttl=ttl if ttl is not None else float(os.getenv("REPORT_CACHE_TTL", 86400)),  # 0 disables
+            max_entries=max_entries or int(os.getenv("REPORT_CACHE_MAX_ENTRIES", 5000)),
+            compress=True,
+        )
+        self.near_hits = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.store.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS report_signatures ("
+            " key TEXT PRIMARY KEY,"
+            " normalized TEXT NOT NULL,"
+            " signature BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS report_bands (band TEXT NOT NULL, key TEXT NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS report_bands_band ON report_bands(band)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS report_bands_key ON report_bands(key)")
+
+    @property
+    def enabled(self) -> bool:
+        return self.store.enabled
+
+    @staticmethod
+    def _key(exact: str) -> str:
+        return hashlib.sha256(exact.encode("utf-8")).hexdigest()
+
+    def _load(self, key: str) -> Optional[dict]:
+        hit = self.store.get(key)
+        return json.loads(hit) if hit is not None else None
+
+    def get(self, query: str) -> Optional[dict]:
+        """{"report", "query", "created_at", "match", "similarity"} for a fresh cached report, else None."""
+        if not self.enabled:
+            return None
+        exact = exact_query(query)
+        entry = self._load(self._key(exact))
+        if entry is not None:
+            return {**entry, "match": "exact", "similarity": 1.0}
+
+        sig = signature(char_shingles(_content(exact)))
+        with self._lock:
+            placeholders = ",".join("?" * len(bands(sig)))
+            rows = self._conn.execute(
+                f"SELECT DISTINCT s.key, s.normalized, s.signature FROM report_bands b"
+                f" JOIN report_signatures s ON s.key = b.key WHERE b.band IN ({placeholders})",
+                bands(sig),
+            ).fetchall()
+
+        best = None
+        for key, other, other_sig in rows:
+            score = similarity(sig, from_bytes(other_sig))
+            if score >= self.threshold and _same_question(exact, other):
+                if best is None or score > best[1]:
+                    best = (key, score)
+        if best is None:
+            return None
+        entry = self._load(best[0])
+        if entry is None:
+            # body expired or was evicted: forget its signature too
+            self._forget(best[0])
+            return None
+        self.near_hits += 1
+        logger.info(f"Report cache near match ({best[1]:.2f}) for '{query}': '{entry['query']}'")
+        return {**entry, "match": "near", "similarity": round(best[1], 3)}
+
+    def set(self, query: str, report: str) -> None:
+        if not self.enabled:
+            return
+        exact = exact_query(query)
+        key = self._key(exact)
+        sig = signature(char_shingles(_content(exact)))
+        entry = {"query": query, "report": report, "created_at": time.time()}
+        self.store.set(key, json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute("DELETE FROM report_bands WHERE key = ?", (key,))
+            # the "normalized" column holds the exact_query form
+            self._conn.execute(
+                "INSERT OR REPLACE INTO report_signatures (key, normalized, signature) VALUES (?, ?, ?)",
+                (key, exact, to_bytes(sig)),
+            )
+            self._conn.executemany("INSERT INTO report_bands (band, key) VALUES (?, ?)", [(band, key) for band in bands(sig)])
+            self._prune()
+
+    def store_result(self, query: str, result: dict, report: str) -> bool:
+        """Cache `report` if the graph run behind `result` finished without node failures."""
+        # a run where the planner or scraper failed still writes a (thinner) report; don't pin that for a day
+        if result.get("step_info") != "Summarizer" or result.get("errors"):
+            return False
+        self.set(query, report)
+        return True
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM report_bands WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM report_signatures WHERE key = ?", (key,))
+
+    def _prune(self) -> None:
+        # the store's set() just evicted expired and least recently used reports; drop their signatures
+        # (same database file, so this is one query per table)
+        self._conn.execute("DELETE FROM report_signatures WHERE key NOT IN (SELECT key FROM entries)")
+        self._conn.execute("DELETE FROM report_bands WHERE key NOT IN (SELECT key FROM report_signatures)")
+
+    def stats(self) -> dict:
+        return {**self.store.stats(), "near_hits": self.near_hits}
+
+
+_REPORT_CACHE: Optional[ReportCache] = None
+_REPORT_CACHE_LOCK = threading.Lock()
+
+
+def get_report_cache() -> ReportCache:
+    global _REPORT_CACHE
+    with _REPORT_CACHE_LOCK:
+        if _REPORT_CACHE is None:
+            _REPORT_CACHE = ReportCache()
+        return _REPORT_CACHE
@@ -0,0 +1,170 @@
+import os
+import re
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .budget import allocate, count_tokens, split_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# what the summarizer puts in the report prompt:
+# "passages" - the best bm25 passages of every article, up to RETRIEVAL_TOKENS (default)
+# "notes"    - whole articles, condensed with parallel llm calls when they don't fit
+SUMMARIZER_CONTEXT = os.getenv("SUMMARIZER_CONTEXT", "passages")
+# article passages sent to the report model (it may get less if the prompt budget is smaller)
+RETRIEVAL_TOKENS = int(os.getenv("RETRIEVAL_TOKENS", 12000))
+# with passage retrieval the crawler keeps this much of every page: depth is cheap, the
+# index decides what gets sent
+RETRIEVAL_PAGE_TOKENS = int(os.getenv("RETRIEVAL_PAGE_TOKENS", 12000))
+# passages are packed from whole paragraphs up to about this size
+PASSAGE_TOKENS = 200
+
+# bm25 parameters (the usual defaults)
+K1 = 1.5
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# marks the gap between two non-adjacent passages of one article
+GAP = "\n[...]\n"
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 1]
+
+
+def split_passages(text: str, max_tokens: int = PASSAGE_TOKENS) -> List[str]:
+    """Consecutive paragraphs packed into passages of about max_tokens."""
+    passages, current, size = [], [], 0
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = count_tokens(paragraph)
+        if tokens > max_tokens:
+            pieces = split_tokens(paragraph, max_tokens)
+        else:
+            pieces = [paragraph]
+        for piece in pieces:
+            piece_tokens = tokens if len(pieces) == 1 else count_tokens(piece)
+            if current and size + piece_tokens > max_tokens:
+                passages.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += piece_tokens
+    if current:
+        passages.append("\n".join(current))
+    return passages
+
+
+class BM25Index:
+    """
+    In-memory BM25 over a list of passages.
+
+    Postings are flat numpy arrays sorted by term, with the length-normalized
+    term frequency precomputed per posting, so scoring a query is a gather
+    plus one bincount no matter how many passages there are.
+    """
+
+    def __init__(self, passages: Sequence[str]):
+        self.size = len(passages)
+        self.vocab: Dict[str, int] = {}
+        term_ids, doc_ids, tfs = [], [], []
+        lengths = np.zeros(self.size, dtype=np.float64)
+        for doc, passage in enumerate(passages):
+            counts = Counter(tokenize(passage))
+            lengths[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(self.vocab.setdefault(term, len(self.vocab)))
+                doc_ids.append(doc)
+                tfs.append(tf)
+
+        terms = np.array(term_ids, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")
+        self._docs = np.array(doc_ids, dtype=np.int64)[order]
+        tf = np.array(tfs, dtype=np.float64)[order]
+        df = np.bincount(terms, minlength=len(self.vocab)).astype(np.float64)
+        self._offsets = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+        self._idf = np.log1p((self.size - df + 0.5) / (df + 0.5))
+
+        avg = lengths.mean() if self.size and lengths.mean() > 0 else 1.0
+        norm = K1 * (1 - B + B * lengths[self._docs] / avg)
+        self._weights = tf * (K1 + 1) / (tf + norm)
+
+    def score(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float64)
+        ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not ids:
+            return scores
+        slices = [np.arange(self._offsets[i], self._offsets[i + 1]) for i in ids]
+        postings = np.concatenate(slices)
+        idf = np.repeat(self._idf[ids], [len(s) for s in slices])
+        return np.bincount(self._docs[postings], weights=self._weights[postings] * idf, minlength=self.size)
+
+
+def select_passages(texts: Sequence[str], queries: Sequence[str], max_tokens: int,
+                    weights: Optional[Sequence[float]] = None) -> List[str]:
+    """
+    Cut every text into passages, rank them against `queries` and keep the best
+    ones up to max_tokens in total, in reading order.
+
+    Each query's scores are scaled to its best passage and a passage counts with
+    its best query, so every follow-up question gets its evidence in. Every text
+    keeps at least its top passage (it's still a cited source): those are set
+    aside first, cut to an even share of max_tokens if they don't all fit, and
+    the rest compete for what's left. `weights` scale a whole text's passages
+    (article relevance).
+    """
+    owners, passages = [], []
+    for i, text in enumerate(texts):
+        for passage in split_passages(text):
+            owners.append(i)
+            passages.append(passage)
+    if not passages:
+        return ["" for _ in texts]
+
+    index = BM25Index(passages)
+    scores = np.zeros(len(passages))
+    for query in queries:
+        query_scores = index.score(query)
+        top = query_scores.max()
+        if top > 0:
+            scores = np.maximum(scores, query_scores / top)
+    owners_arr = np.array(owners)
+    if weights is not None:
+        scores = scores * np.asarray(weights, dtype=np.float64)[owners_arr]
+    sizes = [count_tokens(p) for p in passages]
+
+    # the best passage of every text is reserved, then the rest go by score (earlier passages win ties)
+    firsts = [int(np.flatnonzero(owners_arr == i)[np.argmax(scores[owners_arr == i])]) for i in sorted(set(owners))]
+    if sum(sizes[j] for j in firsts) > max_tokens:
+        for j, grant in zip(firsts, allocate(max_tokens, [sizes[j] for j in firsts])):
+            if grant < sizes[j]:
+                passages[j] = truncate_tokens(passages[j], grant)
+                sizes[j] = count_tokens(passages[j])
+    chosen = set(firsts)
+    used = sum(sizes[j] for j in firsts)
+    for j in np.lexsort((np.arange(len(passages)), -scores)):
+        j = int(j)
+        if j in chosen or used + sizes[j] > max_tokens:
+            continue
+        chosen.add(j)
+        used += sizes[j]
+
+    selected = []
+    for i in range(len(texts)):
+        picks = sorted(j for j in chosen if owners[j] == i)
+        parts, last = [], None
+        for j in picks:
+            if last is not None and j != last + 1:
+                parts.append(GAP)
+            elif last is not None:
+                parts.append("\n")
+            parts.append(passages[j])
+            last = j
+        selected.append("".join(parts))
+    total = sum(sizes)
+    logger.info(f"Retrieved {len(chosen)} of {len(passages)} passages ({used} of {total} tokens) for {len(queries)} queries")
+    return selected
@@ -0,0 +1,42 @@
+import re
+from typing import List
+
+# words that don't change what a text is about; relevance compares what's left
+STOPWORDS = {
+    "a", "an", "the", "in", "on", "for", "of", "to", "and", "with", "about", "into", "from", "by",
+    "what", "how", "why", "is", "are", "do", "does", "explain", "tell", "me", "research", "guide",
+}
+# words ending in s that aren't plurals (or whose singular is another word: news/new, windows/window)
+NOT_PLURAL = {
+    "news", "series", "species", "does", "has", "was", "this", "always", "perhaps", "windows", "macos", "postgres",
+    "kubernetes", "physics", "ethics", "analytics", "economics", "mathematics", "statistics", "graphics", "robotics",
+    "bias", "alias", "atlas", "canvas", "chaos", "lens",
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-+#][a-z0-9]+)*")
+_PUNCTUATION = re.compile(r"[^\w\s+#]")
+
+
+def fold(token: str) -> str:
+    """Singular of a lowercase token: 'servers' -> 'server', 'news' stays."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")) and token not in NOT_PLURAL:
+        return token[:-1]
+    return token
+
+
+def words(text: str) -> List[str]:
+    """Lowercase words with plurals folded, punctuation dropped: 'Node.js servers?' -> ['node.js', 'server']."""
+    return [fold(token) for token in _TOKEN.findall(text.lower())]
+
+
+def terms(text: str) -> List[str]:
+    """words() without STOPWORDS: what relevance scoring compares ('how do MCP servers work' -> mcp server work)."""
+    return [word for word in words(text) if word not in STOPWORDS]
+
+
+def strict_key(text: str) -> str:
+    """
+    Casefolded, punctuation dropped, whitespace collapsed: 'How does  X work?' -> 'how does x work'.
+    For telling the same query typed twice apart from a similar one ("c++" and "c#" keep their marks).
+    """
+    return " ".join(_PUNCTUATION.sub(" ", text.casefold()).split())
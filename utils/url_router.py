@@ -0,0 +1,69 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+# urls inside free text (an llm answer, a json blob): stops at whitespace, quotes and brackets
+URL_IN_TEXT = re.compile(r"https?://[^\s<>\"'`()\[\]{}]+")
+_TRAILING = ".,;:!?*"
+
+
+class UrlRouter:
+    """
+    Sorts urls by the source that should fetch them, in one pass.
+
+    Routes are added with their regex patterns (anchored at the start of the
+    url); all of them are compiled into a single alternation of named groups,
+    so classifying a url is one match whatever the number of routes. The
+    first route added wins when several match; urls no route matches go to
+    `default`.
+    """
+
+    def __init__(self, default: str = "web"):
+        self.default = default
+        self._routes: Dict[str, List[str]] = {}
+        self._pattern: Optional[re.Pattern] = None
+        self._lock = threading.Lock()
+
+    @property
+    def routes(self) -> List[str]:
+        return list(self._routes)
+
+    def add(self, name: str, *patterns: str) -> None:
+        if not name.isidentifier() or name == self.default:
+            raise ValueError(f"bad route name: {name!r}")
+        with self._lock:
+            self._routes.setdefault(name, []).extend(patterns)
+            self._pattern = None
+
+    def _compiled(self) -> Optional[re.Pattern]:
+        if self._pattern is None and self._routes:
+            with self._lock:
+                self._pattern = re.compile("|".join(
+                    f"(?P<{name}>{'|'.join(f'(?:{p})' for p in patterns)})"
+                    for name, patterns in self._routes.items()
+                ), re.IGNORECASE)
+        return self._pattern
+
+    def classify(self, url: str) -> str:
+        pattern = self._compiled()
+        match = pattern.match(url) if pattern is not None else None
+        return match.lastgroup if match else self.default
+
+    def route(self, urls: Iterable[str], limits: Optional[Dict[str, int]] = None) -> Dict[str, List[str]]:
+        """{route: urls} in input order, exact repeats dropped; `limits` caps routes by name."""
+        limits = limits or {}
+        routed: Dict[str, List[str]] = {}
+        seen = set()
+        for url in urls:
+            if url in seen:
+                continue
+            seen.add(url)
+            name = self.classify(url)
+            group = routed.setdefault(name, [])
+            if len(group) < limits.get(name, len(group) + 1):
+                group.append(url)
+        return routed
+
+    def find(self, text: str, limits: Optional[Dict[str, int]] = None) -> Dict[str, List[str]]:
+        """route() over every url in free text."""
+        return self.route((url.rstrip(_TRAILING) for url in URL_IN_TEXT.findall(text or "")), limits)
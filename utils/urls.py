@@ -0,0 +1,27 @@
+import re
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+_HOST = re.compile(r"[a-zA-Z][a-zA-Z0-9+.-]*://(?:[^@/?#]*@)?(\[[^\]/]*\]|[^:/?#]*)")
+
+def normalize_url(url: str) -> str:
+    """Normalize URL by removing tracking parameters and fragments."""
+    try:
+        parsed = urlparse(url)
+        # Remove common tracking parameters
+        tracking_params = {'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 
+                          'fbclid', 'gclid', 'ref', 'source', 'campaign_id'}
+        query_params = parse_qs(parsed.query)
+        filtered_params = {k: v for k, v in query_params.items() if k not in tracking_params}
+        clean_query = urlencode(filtered_params, doseq=True)
+        
+        # Remove fragment and rebuild URL
+        return urlunparse((parsed.scheme, parsed.netloc, parsed.path, parsed.params, clean_query, ''))
+    except Exception:
+        return url
+
+def domain_of(url: str) -> str:
+    """Lowercased host without 'www.': what the planner diversifies over."""
+    # a regex rather than urlparse: the planner calls this for every search hit
+    match = _HOST.match(url)
+    domain = match.group(1).lower() if match else ""
+    return domain[4:] if domain.startswith("www.") else domain